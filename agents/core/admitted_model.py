@@ -0,0 +1,66 @@
+from typing import Any, AsyncIterator, Dict, List, Optional
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from pydantic import ConfigDict
+from .scheduler import AdmissionController, current_priority
+
+class AdmittedChatModel(BaseChatModel):
+    """Chat model that takes an admission slot for each call it makes.
+
+    Slots are held only while the wrapped model is generating, so a request
+    that routes, dispatches experts and synthesizes their answers queues for
+    each LLM call, at the priority of the request (see admission_priority).
+    Cache hits never queue. Synchronous calls, which run outside the event
+    loop, are passed straight through.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    llm: BaseChatModel
+    scheduler: AdmissionController
+
+    @property
+    def _llm_type(self) -> str:
+        return self.llm._llm_type
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return self.llm._identifying_params
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        return self.llm._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        async with self.scheduler.slot(current_priority()):
+            return await self.llm._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        async with self.scheduler.slot(current_priority()):
+            if type(self.llm)._astream is BaseChatModel._astream and type(self.llm)._stream is BaseChatModel._stream:
+                # The wrapped model can't stream; return its reply as one chunk
+                result = await self.llm._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+                message = result.generations[0].message
+                yield ChatGenerationChunk(message=AIMessageChunk(content=message.content))
+                return
+            async for chunk in self.llm._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                yield chunk
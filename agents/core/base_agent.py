@@ -1,24 +1,50 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, AsyncIterator, Tuple
 from langchain.llms.base import BaseLLM
 from langchain.prompts import PromptTemplate
-from langchain.memory import ConversationBufferMemory
+from langchain_core.memory import BaseMemory
 from langchain.chains import LLMChain
+from langchain_core.caches import BaseCache
+from langchain_core.language_models import BaseChatModel
+from langchain_core.load import dumps
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, Generation
+from .context_budget import ContextBudget
+from .token_memory import TokenBudgetMemory
 import asyncio
 
 class BaseAgent:
-    def __init__(self, llm: BaseLLM, memory: Optional[ConversationBufferMemory] = None):
+    # Tokens of recent conversation sent verbatim; older turns are summarized
+    memory_token_limit = 1000
+
+    def __init__(
+        self,
+        llm: BaseLLM,
+        memory: Optional[BaseMemory] = None,
+        memory_token_limit: Optional[int] = None
+    ):
         """Initialize the base agent."""
         self.llm = llm
-        self.memory = memory or ConversationBufferMemory()
+        self.memory = memory or TokenBudgetMemory(
+            llm=llm,
+            max_token_limit=memory_token_limit or self.memory_token_limit
+        )
         self.chain = None
+        # Extra per-call LLM arguments, e.g. server-specific request fields
+        self.llm_kwargs: Dict[str, Any] = {}
+        # Sized for the model's context window by the multi-agent system
+        self.context_budget = ContextBudget()
         self._initialize_chain()
 
     def _initialize_chain(self) -> None:
         """Initialize the LLM chain with default prompt."""
         prompt = PromptTemplate(
             input_variables=["input", "history"],
+            # Static instructions first, then the append-only history, then
+            # the new input, so the server can reuse the cached prompt prefix
             template="""
-            Based on the conversation history:
+            You are a helpful assistant. Answer the latest message using the conversation so far.
+
+            Conversation history:
             {history}
             
             Human: {input}
@@ -32,6 +58,20 @@ class BaseAgent:
             verbose=True
         )
 
+    def set_server_options(self, options: Optional[Dict[str, Any]]) -> None:
+        """Send extra request fields to the LLM server (e.g. llama.cpp's cache_prompt, id_slot)."""
+        self.llm_kwargs = {"extra_body": dict(options)} if options else {}
+        self.chain.llm_kwargs = self.llm_kwargs
+
+    def _budget_parts(self, user_input: str) -> Dict[str, str]:
+        """Get the prompt parts that share the context window with retrieved content."""
+        prompt = self.chain.prompt
+        return {
+            "instructions": prompt.format(**{key: "" for key in prompt.input_variables}),
+            "history": self.memory.load_memory_variables({}).get("history", ""),
+            "input": user_input
+        }
+
     async def process(self, user_input: str) -> str:
         """Process user input and return response."""
         try:
@@ -43,6 +83,68 @@ class BaseAgent:
         except Exception as e:
             return f"Error processing request: {str(e)}"
 
+    async def _prepare_inputs(self, user_input: str) -> Dict[str, Any]:
+        """Build the chain inputs for a user request."""
+        return {"input": user_input}
+
+    async def process_stream(self, user_input: str) -> AsyncIterator[str]:
+        """Process user input and yield the response as it is generated."""
+        try:
+            inputs = await self._prepare_inputs(user_input)
+            async for chunk in self._stream_chain(inputs):
+                yield chunk
+        except Exception as e:
+            yield f"Error processing request: {str(e)}"
+
+    def _cache_entry(self, prompt_value: Any) -> Optional[Tuple[BaseCache, str, str]]:
+        """Get the LLM's cache and the key langchain would use for this prompt."""
+        cache = getattr(self.llm, "cache", None)
+        if not isinstance(cache, BaseCache):
+            return None
+        if isinstance(self.llm, BaseChatModel):
+            return cache, dumps(prompt_value.to_messages()), self.llm._get_llm_string(**self.llm_kwargs)
+        params = {**self.llm.dict(), "stop": None}
+        return cache, prompt_value.to_string(), str(sorted(params.items()))
+
+    async def _stream_chain(self, inputs: Dict[str, Any]) -> AsyncIterator[str]:
+        """Stream the chain's completion token by token and record it in memory."""
+        prompt = self.chain.prompt
+        variables = {**self.memory.load_memory_variables({}), **inputs}
+        prompt_value = prompt.format_prompt(
+            **{key: variables.get(key, "") for key in prompt.input_variables}
+        )
+
+        # Streaming bypasses langchain's cache, so consult it directly
+        cache_entry = self._cache_entry(prompt_value)
+        cached = await cache_entry[0].alookup(*cache_entry[1:]) if cache_entry else None
+
+        chunks = []
+        if cached:
+            chunks.append(cached[0].text)
+            yield cached[0].text
+        else:
+            async for chunk in self.llm.astream(prompt_value, **self.llm_kwargs):
+                text = getattr(chunk, "content", chunk)
+                if not text:
+                    continue
+                chunks.append(text)
+                yield text
+
+            if cache_entry:
+                text = "".join(chunks)
+                generation = (
+                    ChatGeneration(message=AIMessage(content=text))
+                    if isinstance(self.llm, BaseChatModel) else Generation(text=text)
+                )
+                await cache_entry[0].aupdate(*cache_entry[1:], [generation])
+
+        # Only the primary input goes into memory, matching the buffer's single-key contract
+        input_key = next(iter(inputs))
+        self.memory.save_context(
+            {input_key: inputs[input_key]},
+            {self.chain.output_key: "".join(chunks)}
+        )
+
     def get_memory(self) -> Dict[str, Any]:
         """Get current memory state."""
         try:
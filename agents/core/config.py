@@ -1,10 +1,11 @@
 import os
 import json
-from typing import Dict, Any, Optional
-from dataclasses import dataclass
+from typing import Dict, Any, Optional, Callable, List
+from dataclasses import dataclass, field
 import subprocess
 import time
-import requests
+import asyncio
+import aiohttp
 import logging
 import signal
 
@@ -15,6 +16,63 @@ class LLMEndpoint:
     api_key: str
     model: str
     type: str  # 'openai', 'llama', 'custom'
+    weight: int = 1  # relative share of requests when load balancing
+    max_concurrent: int = 2  # generations the server handles at once
+    context_window: int = 2048  # prompt plus reply tokens the model accepts
+
+@dataclass
+class ServerStatus:
+    stage: str  # 'starting', 'downloading', 'loading', 'ready', 'failed'
+    message: str
+    progress: Optional[float] = None
+    details: Dict[str, Any] = field(default_factory=dict)
+
+class LogTail:
+    """Read only the part of a log file written since the last read."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.offset = 0
+
+    def read_new(self) -> str:
+        """Return text appended to the log since the previous call."""
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(0, os.SEEK_END)
+                size = f.tell()
+                if size < self.offset:
+                    # Log was truncated or replaced; start over
+                    self.offset = 0
+                f.seek(self.offset)
+                data = f.read()
+                self.offset = f.tell()
+        except FileNotFoundError:
+            return ""
+        return data.decode("utf-8", errors="replace")
+
+async def probe_server(api_base: str, session: aiohttp.ClientSession, api_key: Optional[str] = None) -> bool:
+    """Check whether an OpenAI-compatible server is ready to serve requests.
+
+    A server that answers but has no /health route, or wants a different
+    key, is reachable; only a 503 (still loading) or no answer is not.
+    """
+    root = api_base.rstrip("/")
+    if root.endswith("/v1"):
+        root = root[:-3]
+    headers = {"Authorization": f"Bearer {api_key}"} if api_key else None
+    answered = False
+    # llama.cpp answers /health with 503 while the model is still loading
+    for url in (f"{root}/health", f"{root}/v1/models"):
+        try:
+            async with session.get(url, headers=headers) as response:
+                if response.status in (200, 401, 403):
+                    return True
+                if response.status == 503:
+                    return False
+                answered = answered or response.status == 404
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return False
+    return answered
 
 class Config:
     def __init__(self, config_path: str = "config.json"):
@@ -67,6 +125,19 @@ class Config:
         endpoint = self.config["endpoints"][active]
         return LLMEndpoint(**endpoint)
 
+    def get_pool_endpoints(self) -> List[LLMEndpoint]:
+        """Get the endpoints requests are balanced across.
+
+        Uses the "pool" list of endpoint names when configured, otherwise
+        just the active endpoint.
+        """
+        names = self.config.get("pool") or [self.config["active_endpoint"]]
+        return [
+            LLMEndpoint(**self.config["endpoints"][name])
+            for name in names
+            if name in self.config["endpoints"]
+        ]
+
     def set_active_endpoint(self, name: str) -> None:
         """Set the active endpoint by name."""
         if name in self.config["endpoints"]:
@@ -80,7 +151,10 @@ class Config:
             "api_base": endpoint.api_base,
             "api_key": endpoint.api_key,
             "model": endpoint.model,
-            "type": endpoint.type
+            "type": endpoint.type,
+            "weight": endpoint.weight,
+            "max_concurrent": endpoint.max_concurrent,
+            "context_window": endpoint.context_window
         }
         self.save_config()
 
@@ -93,36 +167,109 @@ class Config:
             self.save_config()
 
     def wait_for_model_download(self) -> bool:
-        """Wait for the model to be downloaded."""
+        """Wait for the model to be downloaded (blocking)."""
+        return asyncio.run(self.wait_for_model_download_async())
+
+    async def wait_for_model_download_async(
+        self,
+        on_progress: Optional[Callable[[ServerStatus], None]] = None,
+        timeout: float = 300,
+        poll_interval: float = 5
+    ) -> bool:
+        """Wait for the model to be downloaded without blocking the event loop."""
         model_file = "TinyLlama-1.1B-Chat-v1.0.Q5_K_M.llamafile"
-        for _ in range(60):  # Wait up to 5 minutes
-            if os.path.exists(model_file):
-                if os.path.getsize(model_file) > 900_000_000:  # ~900MB
-                    self.logger.info("Model download completed")
-                    return True
-            time.sleep(5)
-            self.logger.info("Waiting for model download...")
+        expected_size = 900_000_000  # ~900MB
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            size = os.path.getsize(model_file) if os.path.exists(model_file) else 0
+            if size > expected_size:
+                self.logger.info("Model download completed")
+                return True
+            if on_progress:
+                on_progress(ServerStatus(
+                    "downloading",
+                    "Waiting for model download...",
+                    progress=min(size / expected_size, 1.0)
+                ))
+            await asyncio.sleep(poll_interval)
         return False
 
-    def start_llama_server(self) -> bool:
-        """Start the Llama server using start_llama_server.sh."""
+    async def wait_for_server_ready(
+        self,
+        api_base: str,
+        log_path: Optional[str] = None,
+        on_progress: Optional[Callable[[ServerStatus], None]] = None,
+        timeout: float = 60,
+        initial_delay: float = 0.25,
+        max_delay: float = 5
+    ) -> bool:
+        """Probe the server with exponential backoff until it is ready.
+
+        If `log_path` is given, only newly written log output is scanned
+        for errors on each attempt.
+        """
+        log_tail = LogTail(log_path) if log_path else None
+        delay = initial_delay
+        attempt = 0
+        deadline = time.monotonic() + timeout
+        probe_timeout = aiohttp.ClientTimeout(total=min(max_delay, 5))
+        async with aiohttp.ClientSession(timeout=probe_timeout) as session:
+            while True:
+                attempt += 1
+                if await probe_server(api_base, session):
+                    return True
+
+                if log_tail:
+                    new_output = log_tail.read_new()
+                    if "error" in new_output.lower():
+                        self.logger.error(f"Server error: {new_output}")
+                        if on_progress:
+                            on_progress(ServerStatus("failed", "Llama server reported an error",
+                                                     details={"log": new_output}))
+                        return False
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                if on_progress:
+                    on_progress(ServerStatus(
+                        "loading",
+                        f"Waiting for server... (attempt {attempt})",
+                        details={"attempt": attempt}
+                    ))
+                await asyncio.sleep(min(delay, remaining))
+                delay = min(delay * 2, max_delay)
+
+    async def start_llama_server_async(
+        self,
+        on_progress: Optional[Callable[[ServerStatus], None]] = None
+    ) -> bool:
+        """Start the Llama server and wait for it without blocking.
+
+        Progress is reported through `on_progress` as ServerStatus events.
+        """
+        def report(status: ServerStatus) -> None:
+            if on_progress:
+                on_progress(status)
+
+        api_base = self.config["endpoints"].get("llama", {}).get("api_base", "http://localhost:8080")
         try:
             # Check if script exists
             if not os.path.exists("start_llama_server.sh"):
                 self.logger.error("start_llama_server.sh not found")
+                report(ServerStatus("failed", "start_llama_server.sh not found"))
                 return False
 
             # Check if server is already running
-            try:
-                response = requests.get("http://localhost:8080")
-                if response.status_code == 200:
+            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=5)) as session:
+                if await probe_server(api_base, session):
                     self.logger.info("Llama server is already running")
+                    report(ServerStatus("ready", "Llama server is already running", progress=1.0))
                     return True
-            except requests.exceptions.RequestException:
-                pass
 
             # Start the server script with output redirection
             self.logger.info("Starting Llama server...")
+            report(ServerStatus("starting", "Starting Llama server..."))
             with open("llama_server.log", "w") as log_file:
                 self.llama_server_process = subprocess.Popen(
                     ["./start_llama_server.sh"],
@@ -132,36 +279,32 @@ class Config:
                 )
 
             # Wait for model download if needed
-            if not self.wait_for_model_download():
+            if not await self.wait_for_model_download_async(report):
                 self.logger.error("Model download timeout")
+                report(ServerStatus("failed", "Model download timeout"))
                 self.stop_llama_server()
                 return False
 
-            # Wait for server to start (max 30 seconds)
-            for i in range(15):
-                try:
-                    response = requests.get("http://localhost:8080")
-                    if response.status_code == 200:
-                        self.logger.info("Llama server started successfully")
-                        return True
-                except requests.exceptions.RequestException:
-                    time.sleep(2)
-                    # Check server log for errors
-                    if os.path.exists("llama_server.log"):
-                        with open("llama_server.log", "r") as f:
-                            log_content = f.read()
-                            if "error" in log_content.lower():
-                                self.logger.error(f"Server error: {log_content}")
-                                return False
-                    self.logger.info(f"Waiting for server... ({i+1}/15)")
-                    continue
+            if await self.wait_for_server_ready(api_base, "llama_server.log", report):
+                self.logger.info("Llama server started successfully")
+                report(ServerStatus("ready", "Llama server started successfully", progress=1.0))
+                return True
 
             self.logger.error("Timeout waiting for Llama server")
+            report(ServerStatus("failed", "Timeout waiting for Llama server"))
             return False
+        except asyncio.CancelledError:
+            self.stop_llama_server()
+            raise
         except Exception as e:
             self.logger.error(f"Error starting Llama server: {e}")
+            report(ServerStatus("failed", f"Error starting Llama server: {e}"))
             return False
 
+    def start_llama_server(self) -> bool:
+        """Start the Llama server using start_llama_server.sh (blocking)."""
+        return asyncio.run(self.start_llama_server_async())
+
     def stop_llama_server(self) -> None:
         """Stop the Llama server if it's running."""
         try:
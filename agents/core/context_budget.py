@@ -0,0 +1,114 @@
+import re
+import logging
+from typing import Any, Dict, Optional, Sequence
+from .tokens import DEFAULT_ENCODING, count_tokens, truncate_tokens
+
+logger = logging.getLogger("smolit")
+
+_WORD = re.compile(r"\w{3,}")
+
+class ContextBudget:
+    """Fit retrieved or fetched content into what is left of a model's context window.
+
+    The window is split between the prompt's fixed parts (instructions,
+    history and the user's input, counted as they are) and the reply
+    (`max_output_tokens`); the context gets the rest, but at least
+    `min_context_tokens`. Content is given as chunks; the most relevant ones
+    that fit are kept, in their original order.
+    """
+
+    def __init__(
+        self,
+        context_window: int = 2048,
+        max_output_tokens: int = 256,
+        encoding_name: str = DEFAULT_ENCODING,
+        min_context_tokens: int = 128,
+        # Headroom for the server's chat template and tokenizer differences
+        safety_margin: float = 0.1
+    ):
+        self.context_window = context_window
+        self.max_output_tokens = max_output_tokens
+        self.encoding_name = encoding_name
+        self.min_context_tokens = min_context_tokens
+        self.safety_margin = safety_margin
+        self.stats = {"calls": 0, "trimmed": 0, "tokens_in": 0, "tokens_kept": 0}
+
+    def count(self, text: str) -> int:
+        """Count tokens with the model's encoding."""
+        return count_tokens(text, self.encoding_name)
+
+    def allocate(self, parts: Dict[str, str]) -> Dict[str, int]:
+        """Get each fixed part's tokens and the tokens left for "context"."""
+        allocation = {name: self.count(text) for name, text in parts.items()}
+        usable = int(self.context_window * (1 - self.safety_margin)) - self.max_output_tokens
+        allocation["context"] = max(usable - sum(allocation.values()), self.min_context_tokens)
+        return allocation
+
+    @staticmethod
+    def relevance(chunk: str, query: str) -> float:
+        """Score a chunk by the share of the query's words it contains."""
+        terms = set(_WORD.findall(query.lower()))
+        if not terms:
+            return 0.0
+        return len(terms & set(_WORD.findall(chunk.lower()))) / len(terms)
+
+    def select(
+        self,
+        chunks: Sequence[str],
+        budget: int,
+        query: str = "",
+        scores: Optional[Sequence[float]] = None,
+        separator: str = "\n"
+    ) -> str:
+        """Join the most relevant chunks that fit in `budget` tokens.
+
+        Chunks are ranked by `scores` (higher first) or by relevance to
+        `query`; ties keep document order. The first chunk that doesn't fit
+        is cut to the remaining space; everything after it is dropped.
+        """
+        if scores is None:
+            scores = [self.relevance(chunk, query) for chunk in chunks]
+        ranked = sorted(range(len(chunks)), key=lambda i: (-scores[i], i))
+        separator_tokens = self.count(separator)
+        kept: Dict[int, str] = {}
+        remaining = budget
+        for i in ranked:
+            tokens = self.count(chunks[i])
+            if tokens <= remaining:
+                kept[i] = chunks[i]
+                remaining -= tokens + separator_tokens
+                continue
+            if remaining > 0:
+                kept[i] = truncate_tokens(chunks[i], remaining, self.encoding_name)
+            break
+        return separator.join(kept[i] for i in sorted(kept))
+
+    def fit(
+        self,
+        agent: str,
+        parts: Dict[str, str],
+        chunks: Sequence[str],
+        query: str = "",
+        scores: Optional[Sequence[float]] = None,
+        separator: str = "\n"
+    ) -> str:
+        """Select content for the space left by the prompt's fixed parts."""
+        budget = self.allocate(parts)["context"]
+        full = self.count(separator.join(chunks))
+        context = self.select(chunks, budget, query, scores, separator)
+        kept = self.count(context)
+        self.stats["calls"] += 1
+        self.stats["tokens_in"] += full
+        self.stats["tokens_kept"] += kept
+        if kept < full:
+            self.stats["trimmed"] += 1
+            logger.info(f"{agent}: context trimmed from {full} to {kept} tokens (saved {full - kept})")
+        return context
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get how much content was trimmed across calls."""
+        return {
+            **self.stats,
+            "tokens_saved": self.stats["tokens_in"] - self.stats["tokens_kept"],
+            "context_window": self.context_window
+        }
@@ -0,0 +1,274 @@
+import time
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+import aiohttp
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from pydantic import ConfigDict
+from .config import LLMEndpoint, probe_server
+
+logger = logging.getLogger("smolit")
+
+class NoHealthyEndpointError(RuntimeError):
+    """Raised when every endpoint in the pool is unavailable."""
+
+class EndpointState:
+    """Load and circuit-breaker state for one endpoint."""
+
+    def __init__(self, endpoint: LLMEndpoint, client: Any):
+        self.endpoint = endpoint
+        self.client = client
+        self.outstanding = 0
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.requests = 0
+
+    @property
+    def is_open(self) -> bool:
+        """Whether the circuit is open (endpoint ejected)."""
+        return self.opened_at is not None
+
+class EndpointPool:
+    """Spread LLM requests over several endpoints.
+
+    Each request goes to the available endpoint with the fewest outstanding
+    requests relative to its weight. Endpoints that fail `failure_threshold`
+    times in a row are ejected (circuit open) until a health check succeeds
+    or `reset_timeout` passes, after which a single trial request is let
+    through.
+    """
+
+    def __init__(
+        self,
+        endpoints: List[LLMEndpoint],
+        client_factory: Callable[[LLMEndpoint], Any],
+        failure_threshold: int = 3,
+        reset_timeout: float = 30.0
+    ):
+        if not endpoints:
+            raise ValueError("EndpointPool needs at least one endpoint")
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.states = [EndpointState(endpoint, client_factory(endpoint)) for endpoint in endpoints]
+        self._lock = threading.Lock()
+        self._health_task: Optional[asyncio.Task] = None
+
+    def _is_available(self, state: EndpointState, now: float) -> bool:
+        """Closed circuits are available; open ones only once reset_timeout passed."""
+        if not state.is_open:
+            return True
+        return now - state.opened_at >= self.reset_timeout and state.outstanding == 0
+
+    def _select(self, exclude: List[EndpointState]) -> EndpointState:
+        """Pick the least loaded available endpoint."""
+        now = time.monotonic()
+        with self._lock:
+            candidates = [
+                state for state in self.states
+                if state not in exclude and self._is_available(state, now)
+            ]
+            if not candidates:
+                raise NoHealthyEndpointError("No healthy LLM endpoint available")
+            # Prefer endpoints below their concurrency limit, then the least loaded
+            state = min(
+                candidates,
+                key=lambda s: (
+                    s.outstanding >= s.endpoint.max_concurrent,
+                    s.outstanding / max(s.endpoint.weight, 1),
+                    s.requests
+                )
+            )
+            state.outstanding += 1
+            state.requests += 1
+            return state
+
+    def record_success(self, state: EndpointState) -> None:
+        """Close the endpoint's circuit after a successful call or probe."""
+        with self._lock:
+            if state.is_open:
+                logger.info(f"Endpoint {state.endpoint.name} is healthy again")
+            state.failures = 0
+            state.opened_at = None
+
+    def record_failure(self, state: EndpointState, probe: bool = False) -> None:
+        """Count a failure and eject the endpoint once the threshold is hit.
+
+        A failed trial request re-arms an open circuit; a failed health
+        `probe` doesn't, or probes more frequent than reset_timeout would
+        keep the endpoint from ever getting its trial request.
+        """
+        with self._lock:
+            state.failures += 1
+            if state.is_open and probe:
+                return
+            if state.is_open or state.failures >= self.failure_threshold:
+                if not state.is_open:
+                    logger.warning(f"Ejecting endpoint {state.endpoint.name} after {state.failures} failures")
+                state.opened_at = time.monotonic()
+
+    @contextmanager
+    def lease(self, exclude: Optional[List[EndpointState]] = None) -> Iterator[EndpointState]:
+        """Reserve an endpoint for one request."""
+        state = self._select(exclude or [])
+        try:
+            yield state
+        finally:
+            with self._lock:
+                state.outstanding -= 1
+
+    async def check_health(self, timeout: float = 5.0) -> Dict[str, bool]:
+        """Probe every endpoint once and update its circuit."""
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+            results = await asyncio.gather(
+                *(
+                    probe_server(state.endpoint.api_base, session, state.endpoint.api_key)
+                    for state in self.states
+                )
+            )
+        for state, healthy in zip(self.states, results):
+            if healthy:
+                self.record_success(state)
+            else:
+                self.record_failure(state, probe=True)
+        return {state.endpoint.name: healthy for state, healthy in zip(self.states, results)}
+
+    async def run_health_checks(self, interval: float = 15.0) -> None:
+        """Probe all endpoints every `interval` seconds until cancelled."""
+        while True:
+            try:
+                await self.check_health()
+            except Exception as e:
+                logger.error(f"Error checking endpoint health: {e}")
+            await asyncio.sleep(interval)
+
+    def start_health_checks(self, interval: float = 15.0) -> asyncio.Task:
+        """Start periodic health checks on the running event loop."""
+        if self._health_task is None or self._health_task.done():
+            self._health_task = asyncio.get_running_loop().create_task(
+                self.run_health_checks(interval)
+            )
+        return self._health_task
+
+    def stop_health_checks(self) -> None:
+        """Stop periodic health checks."""
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get load and health per endpoint."""
+        with self._lock:
+            return {
+                state.endpoint.name: {
+                    'api_base': state.endpoint.api_base,
+                    'outstanding': state.outstanding,
+                    'requests': state.requests,
+                    'failures': state.failures,
+                    'ejected': state.is_open
+                }
+                for state in self.states
+            }
+
+class PooledChatModel(BaseChatModel):
+    """Chat model that routes each call through an EndpointPool.
+
+    A call that fails is retried on the next endpoint, so a dead endpoint
+    fails over transparently. Streams only fail over before the first chunk.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    pool: EndpointPool
+
+    @property
+    def _llm_type(self) -> str:
+        return "endpoint-pool"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        # Cached responses must not be shared across generation settings
+        return {
+            "endpoints": [
+                {"api_base": state.endpoint.api_base, **state.client._identifying_params}
+                for state in self.pool.states
+            ]
+        }
+
+    def _attempts(self) -> int:
+        return len(self.pool.states)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        tried: List[EndpointState] = []
+        while True:
+            with self.pool.lease(tried) as state:
+                tried.append(state)
+                try:
+                    result = state.client._generate(messages, stop=stop, **kwargs)
+                except Exception as e:
+                    self.pool.record_failure(state)
+                    logger.warning(f"Endpoint {state.endpoint.name} failed: {e}")
+                    if len(tried) >= self._attempts():
+                        raise
+                    continue
+            self.pool.record_success(state)
+            return result
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        tried: List[EndpointState] = []
+        while True:
+            with self.pool.lease(tried) as state:
+                tried.append(state)
+                try:
+                    result = await state.client._agenerate(messages, stop=stop, **kwargs)
+                except Exception as e:
+                    self.pool.record_failure(state)
+                    logger.warning(f"Endpoint {state.endpoint.name} failed: {e}")
+                    if len(tried) >= self._attempts():
+                        raise
+                    continue
+            self.pool.record_success(state)
+            return result
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        tried: List[EndpointState] = []
+        while True:
+            started = False
+            with self.pool.lease(tried) as state:
+                tried.append(state)
+                try:
+                    async for chunk in state.client._astream(messages, stop=stop, **kwargs):
+                        started = True
+                        if run_manager:
+                            await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                        yield chunk
+                except Exception as e:
+                    self.pool.record_failure(state)
+                    logger.warning(f"Endpoint {state.endpoint.name} failed: {e}")
+                    if started or len(tried) >= self._attempts():
+                        raise
+                    continue
+            self.pool.record_success(state)
+            return
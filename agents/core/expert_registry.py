@@ -0,0 +1,54 @@
+from typing import Any, Callable, Dict, Iterator, MutableMapping
+
+class ExpertRegistry(MutableMapping):
+    """Mapping of expert names to agents that builds each agent on first use.
+
+    Experts are registered as zero-argument factories; the agent (and any
+    heavy imports its module pulls in) is only created when it is looked up.
+    Ready-made agents can also be assigned directly.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._agents: Dict[str, Any] = {}
+
+    def register(self, name: str, factory: Callable[[], Any]) -> None:
+        """Register a factory that builds the expert on first use."""
+        self._agents.pop(name, None)
+        self._factories[name] = factory
+
+    def is_loaded(self, name: str) -> bool:
+        """Check whether an expert has already been built."""
+        return name in self._agents
+
+    def loaded(self) -> Dict[str, Any]:
+        """Get the experts that have been built so far."""
+        return dict(self._agents)
+
+    def __getitem__(self, name: str) -> Any:
+        if name not in self._agents:
+            if name not in self._factories:
+                raise KeyError(name)
+            self._agents[name] = self._factories[name]()
+        return self._agents[name]
+
+    def __setitem__(self, name: str, agent: Any) -> None:
+        self._factories.pop(name, None)
+        self._agents[name] = agent
+
+    def __delitem__(self, name: str) -> None:
+        if name not in self._agents and name not in self._factories:
+            raise KeyError(name)
+        self._agents.pop(name, None)
+        self._factories.pop(name, None)
+
+    def __iter__(self) -> Iterator[str]:
+        # Keep registration order, then any directly assigned experts
+        yield from self._factories
+        yield from (name for name in self._agents if name not in self._factories)
+
+    def __len__(self) -> int:
+        return len(self._factories.keys() | self._agents.keys())
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._factories or name in self._agents
@@ -1,50 +1,318 @@
-from typing import Dict, Any, Optional
-from langchain_community.chat_models import ChatOpenAI
-from .supervisor import SupervisorAgent
-from ..experts.command_agent import CommandExecutionAgent
-from ..experts.rag_agent import RAGAgent
-from ..experts.web_agent import WebAgent
+from typing import Dict, Any, Optional, AsyncIterator, Union, List, TYPE_CHECKING
+from .expert_registry import ExpertRegistry
+from .scheduler import AdmissionController, Priority, admission_priority
 import json
 import os
 from .logging_config import setup_logger
 
+# langchain, chromadb and the expert modules are imported on first use so
+# that importing this module (and starting the desktop app) stays cheap
+if TYPE_CHECKING:
+    from .config import Config, LLMEndpoint
+    from .response_cache import ResponseCache
+    from .semantic_cache import SemanticCache
+
 logger = setup_logger()
 
+# Reply length requested from the LLM, reserved in each agent's context budget
+MAX_OUTPUT_TOKENS = 256
+
+DEFAULT_MODEL = "TinyLlama-1.1B-Chat-v1.0.Q5_K_M.llamafile"
+
 class MultiAgentSystem:
-    def __init__(self, api_key: Optional[str] = None, api_base: Optional[str] = None):
-        """Initialize the multi-agent system."""
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        api_base: Optional[str] = None,
+        temperature: float = 0.7,
+        cache: Union[bool, "ResponseCache", None] = None,
+        semantic_cache: Union[bool, "SemanticCache"] = False,
+        semantic_threshold: float = 0.95,
+        endpoints: Optional[List["LLMEndpoint"]] = None,
+        memory_token_limits: Optional[Dict[str, int]] = None,
+        server_options: Optional[Dict[str, Any]] = None,
+        agent_slots: Optional[Dict[str, int]] = None,
+        max_concurrent: Optional[int] = None,
+        max_queue: int = 32,
+        queue_timeout: float = 30.0,
+        max_sessions: int = 256,
+        max_session_tokens: Optional[int] = None,
+        session_idle_timeout: Optional[float] = 3600.0,
+        session_store: Optional[str] = None,
+        context_window: Optional[int] = None,
+        embedding_backend: str = "openai",
+        embedding_options: Optional[Dict[str, Any]] = None,
+        dispatch_mode: str = "merge"
+    ):
+        """Initialize the multi-agent system.
+
+        Responses are cached when `cache` is True or a ResponseCache, and by
+        default for deterministic (temperature 0) generation. Setting
+        `semantic_cache` also answers paraphrased queries from earlier
+        responses. Passing `endpoints` balances requests across all of them
+        with failover instead of using the single `api_base`.
+        `memory_token_limits` sets the conversation memory budget per agent
+        ("supervisor" or an expert name). Within a session all agents record
+        the conversation in one shared TurnStore. `server_options` are extra request fields
+        for the LLM server, e.g. {"cache_prompt": True} for llama.cpp (pool
+        endpoints only get them if they are of type "llama"); `agent_slots`
+        pins each agent to its own llama.cpp slot so its prompt prefix stays
+        cached. At most `max_concurrent` LLM calls (default: the sum of the
+        endpoints' max_concurrent) run at once; the rest queue by their
+        request's priority for up to `queue_timeout` seconds, and calls beyond
+        `max_queue` waiting ones are shed. Expert agents are built the first
+        time they are used.
+
+        Conversation memory is kept per session; agents, chains and the
+        knowledge base are shared by all sessions. At most `max_sessions`
+        sessions (holding at most `max_session_tokens` tokens) stay in
+        memory, and sessions idle for `session_idle_timeout` seconds are
+        evicted; with a `session_store` path they are kept in SQLite and
+        restored when used again.
+
+        Retrieved documents and web pages are trimmed to fit
+        `context_window` (default: the smallest of the endpoints' windows),
+        counting tokens with the model's tiktoken encoding.
+
+        The knowledge base embeds with `embedding_backend` ("openai" for LM
+        Studio, "local" for an in-process CPU model, or "hashing") configured
+        by `embedding_options`, caching vectors on disk.
+
+        Requests needing several experts either merge all their answers
+        (`dispatch_mode` "merge") or take the first good one ("first").
+        """
         try:
-            # Initialize LLM with local or OpenAI settings
-            self.llm = ChatOpenAI(
-                model="TinyLlama-1.1B-Chat-v1.0.Q5_K_M.llamafile",
-                openai_api_key=api_key or "sk-dummy-key",
-                openai_api_base=api_base or "http://localhost:8080/v1",
-                max_tokens=256
+            from langchain_community.chat_models import ChatOpenAI
+            from .supervisor import SupervisorAgent
+            from .sessions import SessionManager
+
+            api_base = api_base or "http://localhost:8080/v1"
+            if endpoints:
+                api_base = ",".join(endpoint.api_base for endpoint in endpoints)
+
+            # Set up the response cache, scoped to this endpoint
+            if cache is None:
+                cache = temperature == 0
+            if cache is True:
+                from .response_cache import ResponseCache
+                cache = ResponseCache(namespace=api_base)
+            self.response_cache = cache or None
+
+            from .tokens import encoding_for_model
+            model = endpoints[0].model if endpoints else DEFAULT_MODEL
+            self.encoding_name = encoding_for_model(model)
+            if context_window is None:
+                context_window = min(e.context_window for e in endpoints) if endpoints else 2048
+            self.context_window = context_window
+
+            self.server_options = server_options or {}
+            self.embedding_backend = embedding_backend
+            self.embedding_options = embedding_options or {}
+            self.agent_slots = agent_slots or {}
+
+            # Admission control in front of the LLM endpoint(s); with one slot
+            # per call, and the pool preferring endpoints below their own
+            # max_concurrent, no endpoint gets more than it can serve
+            if max_concurrent is None:
+                max_concurrent = sum(e.max_concurrent for e in endpoints) if endpoints else 2
+            self.scheduler = AdmissionController(max_concurrent, max_queue, queue_timeout)
+
+            self.endpoint_pool = None
+            if endpoints:
+                # Balance across the given endpoints with health-based failover
+                from .endpoint_pool import EndpointPool, PooledChatModel
+                self.endpoint_pool = EndpointPool(
+                    endpoints,
+                    lambda endpoint: ChatOpenAI(
+                        model=endpoint.model,
+                        openai_api_key=endpoint.api_key or "sk-dummy-key",
+                        openai_api_base=endpoint.api_base,
+                        max_tokens=MAX_OUTPUT_TOKENS,
+                        temperature=temperature,
+                        # The pool retries on another endpoint instead
+                        max_retries=0,
+                        model_kwargs=(
+                            {"extra_body": self.server_options}
+                            if self.server_options and endpoint.type == "llama" else {}
+                        )
+                    )
+                )
+                llm = PooledChatModel(pool=self.endpoint_pool, cache=False)
+            else:
+                # Initialize LLM with local or OpenAI settings
+                llm = ChatOpenAI(
+                    model=DEFAULT_MODEL,
+                    openai_api_key=api_key or "sk-dummy-key",
+                    openai_api_base=api_base,
+                    max_tokens=MAX_OUTPUT_TOKENS,
+                    temperature=temperature,
+                    cache=False,
+                    model_kwargs={"extra_body": self.server_options} if self.server_options else {}
+                )
+            # Each LLM call (not each request) takes an admission slot, and
+            # cache hits don't take one at all
+            from .admitted_model import AdmittedChatModel
+            self.llm = AdmittedChatModel(llm=llm, scheduler=self.scheduler, cache=self.response_cache)
+
+            self.memory_token_limits = memory_token_limits or {}
+            # Each session has one conversation log shared by its agents' memories
+            self.sessions = SessionManager(
+                self._build_memory,
+                max_sessions=max_sessions,
+                max_tokens=max_session_tokens,
+                idle_timeout=session_idle_timeout,
+                path=session_store,
+                on_evict=self._release_session
             )
-            
+
             # Load system prompts
             self.prompts = self._load_prompts()
+
+            # Semantic cache reuses the knowledge base's embeddings, which are
+            # only set up once the knowledge expert is first needed
+            if semantic_cache is True:
+                from .semantic_cache import SemanticCache
+                semantic_cache = SemanticCache(
+                    lambda texts: self.rag_agent.knowledge_base.embedding_function(texts),
+                    threshold=semantic_threshold
+                )
+            self.semantic_cache = semantic_cache or None
             
-            # Initialize expert agents
-            self.command_agent = CommandExecutionAgent(self.llm)
-            self.rag_agent = RAGAgent(self.llm)
-            self.web_agent = WebAgent(self.llm)
-            
-            # Create expert agents dictionary
-            self.experts = {
-                "command": self.command_agent,
-                "knowledge": self.rag_agent,
-                "web": self.web_agent
-            }
+            # Register expert agents; each is built on first use
+            self.experts = ExpertRegistry()
+            self.experts.register("command", self._create_command_agent)
+            self.experts.register("knowledge", self._create_rag_agent)
+            self.experts.register("web", self._create_web_agent)
             
-            # Initialize supervisor
-            self.supervisor = SupervisorAgent(self.llm, self.experts)
+            # Initialize supervisor; its router shares the knowledge base's
+            # embeddings for similarity routing
+            self.supervisor = SupervisorAgent(
+                self.llm,
+                self.experts,
+                expert_descriptions=self._expert_descriptions(),
+                embedding_function=lambda texts: self.rag_agent.knowledge_base.embedding_function(texts),
+                memory=self._create_memory("supervisor", SupervisorAgent),
+                dispatch_mode=dispatch_mode
+            )
+            self._configure_agent("supervisor", self.supervisor)
             logger.info("Multi-agent system initialized successfully")
             
         except Exception as e:
             logger.error(f"Error initializing multi-agent system: {e}")
             raise
 
+    @classmethod
+    def from_config(cls, config: "Config", **kwargs: Any) -> "MultiAgentSystem":
+        """Build the system for the configured active endpoint (or pool)."""
+        endpoint = config.get_active_endpoint()
+        pool_endpoints = config.get_pool_endpoints()
+        embeddings = dict(config.config.get("embeddings", {}))
+        kwargs.setdefault("embedding_backend", embeddings.pop("backend", "openai"))
+        kwargs.setdefault("embedding_options", embeddings)
+        return cls(
+            api_key=endpoint.api_key,
+            api_base=endpoint.api_base,
+            endpoints=pool_endpoints if len(pool_endpoints) > 1 else None,
+            context_window=min(e.context_window for e in pool_endpoints or [endpoint]),
+            # Let llama.cpp reuse the KV cache of the shared prompt prefix
+            server_options={"cache_prompt": True} if endpoint.type == "llama" else None,
+            **kwargs
+        )
+
+    def _create_command_agent(self) -> Any:
+        """Build the command execution expert."""
+        from ..experts.command_agent import CommandExecutionAgent
+        logger.debug("Creating command expert")
+        return self._configure_agent(
+            "command",
+            CommandExecutionAgent(self.llm, self._create_memory("command", CommandExecutionAgent))
+        )
+
+    def _create_rag_agent(self) -> Any:
+        """Build the knowledge expert and hook it up to the semantic cache."""
+        from ..experts.rag_agent import RAGAgent
+        logger.debug("Creating knowledge expert")
+        agent = self._configure_agent(
+            "knowledge",
+            RAGAgent(
+                self.llm,
+                memory=self._create_memory("knowledge", RAGAgent),
+                embedding_backend=self.embedding_backend,
+                embedding_options=self.embedding_options
+            )
+        )
+        if self.semantic_cache is not None:
+            # Cached answers may be stale once the knowledge base changes
+            agent.knowledge_base.add_change_listener(self._invalidate_knowledge_answers)
+        return agent
+
+    def _create_web_agent(self) -> Any:
+        """Build the web browsing expert."""
+        from ..experts.web_agent import WebAgent
+        logger.debug("Creating web expert")
+        return self._configure_agent("web", WebAgent(self.llm, self._create_memory("web", WebAgent)))
+
+    def _configure_agent(self, name: str, agent: Any) -> Any:
+        """Size an agent's context budget and pin it to its configured server slot."""
+        from .context_budget import ContextBudget
+        agent.context_budget = ContextBudget(
+            self.context_window,
+            max_output_tokens=MAX_OUTPUT_TOKENS,
+            encoding_name=self.encoding_name
+        )
+        # Slots are per server, so they only apply to a single endpoint
+        if name in self.agent_slots and self.endpoint_pool is None:
+            agent.set_server_options({**self.server_options, "id_slot": self.agent_slots[name]})
+        return agent
+
+    def _create_memory(self, name: str, agent_class: type) -> Any:
+        """Build an agent's memory, which resolves to the current session's."""
+        from .sessions import SessionMemory
+        return SessionMemory(
+            sessions=self.sessions,
+            agent=name,
+            max_token_limit=self.memory_token_limits.get(name, agent_class.memory_token_limit)
+        )
+
+    def _build_memory(self, name: str, max_token_limit: int, turn_store: Any) -> Any:
+        """Build a session's memory for an agent as a view onto its turn store."""
+        from .token_memory import TokenBudgetMemory
+        # Experts see each other's replies but not the supervisor's routing
+        hidden_agents = () if name == "supervisor" else ("supervisor",)
+        return TokenBudgetMemory(
+            llm=self.llm,
+            max_token_limit=max_token_limit,
+            chat_memory=turn_store.view(name, hidden_agents)
+        )
+
+    @property
+    def turn_store(self) -> Any:
+        """The default session's conversation log."""
+        return self.sessions.get().turn_store
+
+    @property
+    def command_agent(self) -> Any:
+        """The command execution expert."""
+        return self.experts["command"]
+
+    @property
+    def rag_agent(self) -> Any:
+        """The knowledge (RAG) expert."""
+        return self.experts["knowledge"]
+
+    @property
+    def web_agent(self) -> Any:
+        """The web browsing expert."""
+        return self.experts["web"]
+
+    def _expert_descriptions(self) -> Dict[str, str]:
+        """Get each expert's description from its system prompt."""
+        return {
+            name: self.prompts[f"{name}_expert"]["content"]
+            for name in self.experts
+            if f"{name}_expert" in self.prompts
+        }
+
     def _load_prompts(self) -> Dict[str, Any]:
         """Load system prompts from JSON file."""
         prompts_path = os.path.join(
@@ -60,18 +328,169 @@ class MultiAgentSystem:
             logger.error(f"Error loading prompts from {prompts_path}: {e}")
             return {}
 
-    async def process_input(self, user_input: str) -> str:
+    async def process_input(
+        self,
+        user_input: str,
+        priority: Priority = Priority.INTERACTIVE,
+        session_id: Optional[str] = None
+    ) -> str:
         """Process user input through the multi-agent system."""
+        with self.sessions.use(session_id):
+            return await self._process_input(user_input, priority)
+
+    async def _process_input(self, user_input: str, priority: Priority) -> str:
         try:
             logger.info(f"Processing user input: {user_input}")
+            # Cheap routing first so cached answers are scoped per expert
+            decision = await self._route(user_input)
+            scope = self._cache_scope(decision.expert or "supervisor")
+            cached = await self._semantic_lookup(user_input, scope)
+            if cached is not None:
+                return cached
+
             # Let supervisor analyze and route the request
-            response = await self.supervisor.process(user_input)
+            with admission_priority(priority):
+                response = await self.supervisor.process(user_input, decision)
             logger.debug(f"Response generated: {response}")
+            await self._semantic_update(user_input, response, scope)
             return response
         except Exception as e:
             error_msg = f"Error processing request: {str(e)}"
             logger.error(error_msg)
             return error_msg
+        finally:
+            self._discard_speculation(user_input)
+
+    async def process_input_stream(
+        self,
+        user_input: str,
+        priority: Priority = Priority.INTERACTIVE,
+        session_id: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Process user input and yield response chunks as they are generated."""
+        with self.sessions.use(session_id):
+            async for chunk in self._process_input_stream(user_input, priority):
+                yield chunk
+
+    async def _process_input_stream(self, user_input: str, priority: Priority) -> AsyncIterator[str]:
+        try:
+            logger.info(f"Streaming user input: {user_input}")
+            decision = await self._route(user_input)
+            scope = self._cache_scope(decision.expert or "supervisor")
+            cached = await self._semantic_lookup(user_input, scope)
+            if cached is not None:
+                yield cached
+                return
+
+            chunks = []
+            with admission_priority(priority):
+                async for chunk in self.supervisor.process_stream(user_input, decision):
+                    chunks.append(chunk)
+                    yield chunk
+            response = "".join(chunks)
+            logger.debug(f"Response generated: {response}")
+            await self._semantic_update(user_input, response, scope)
+        except Exception as e:
+            error_msg = f"Error processing request: {str(e)}"
+            logger.error(error_msg)
+            yield error_msg
+        finally:
+            self._discard_speculation(user_input)
+
+    async def _route(self, user_input: str) -> Any:
+        """Route a request with the cheap tiers, speculating on retrieval meanwhile."""
+        decision = self.supervisor.route_rules(user_input)
+        if decision is not None:
+            # Shell commands and URLs never need the knowledge base
+            return decision
+        # Retrieval runs while the request is routed; it is only kept if
+        # the knowledge expert ends up handling the request
+        self._speculate(user_input)
+        decision = await self.supervisor.route(user_input)
+        if decision.expert is not None and decision.expert != "knowledge":
+            self._discard_speculation(user_input)
+        return decision
+
+    def _speculate(self, user_input: str) -> None:
+        """Start knowledge retrieval before routing has picked an expert."""
+        if "knowledge" not in self.experts:
+            return
+        try:
+            speculate = getattr(self.rag_agent, "speculate", None)
+            if speculate is not None:
+                speculate(user_input)
+        except Exception as e:
+            logger.warning(f"Speculative retrieval failed to start: {e}")
+
+    def _discard_speculation(self, user_input: str) -> None:
+        """Drop unused speculative retrieval for a request."""
+        if "knowledge" in self.experts and self.experts.is_loaded("knowledge"):
+            discard = getattr(self.rag_agent, "discard_speculation", None)
+            if discard is not None:
+                discard(user_input)
+
+    def get_speculation_stats(self) -> Dict[str, Any]:
+        """Get how often speculative knowledge retrieval was used."""
+        if "knowledge" in self.experts and self.experts.is_loaded("knowledge"):
+            get_stats = getattr(self.rag_agent, "get_speculation_stats", None)
+            if get_stats is not None:
+                return get_stats()
+        return {"started": 0, "used": 0, "discarded": 0, "use_rate": 0.0}
+
+    def _cache_scope(self, expert: str) -> str:
+        """Scope cached answers by session too; they may depend on its history."""
+        return f"{self.sessions.current().session_id}/{expert}"
+
+    def _invalidate_knowledge_answers(self) -> None:
+        """Drop cached answers that may rest on the knowledge base, in every session."""
+        # Answers routed by the supervisor LLM may have come from the knowledge expert
+        for expert in ("knowledge", "supervisor"):
+            self.semantic_cache.invalidate_suffix(f"/{expert}")
+
+    def _release_session(self, session_id: str) -> None:
+        """Drop the cached answers of a session leaving memory."""
+        if self.semantic_cache is not None:
+            self.semantic_cache.invalidate_prefix(f"{session_id}/")
+
+    def drop_session(self, session_id: str) -> None:
+        """Forget a session's conversation and its cached answers."""
+        self.sessions.drop(session_id)
+
+    async def _semantic_lookup(self, user_input: str, scope: str) -> Optional[str]:
+        """Look up a cached response for a near-duplicate query."""
+        if self.semantic_cache is None:
+            return None
+        cached = await self.semantic_cache.lookup(user_input, scope)
+        if cached is not None:
+            logger.info(f"Semantic cache hit for scope {scope}")
+        return cached
+
+    async def _semantic_update(self, user_input: str, response: str, scope: str) -> None:
+        """Cache a successful response for future near-duplicate queries."""
+        if self.semantic_cache is None or not response or response.startswith("Error"):
+            return
+        await self.semantic_cache.update(user_input, response, scope)
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get response cache hit/miss statistics."""
+        stats = {"enabled": self.response_cache is not None}
+        if self.response_cache is not None:
+            stats.update(self.response_cache.get_stats())
+        if self.semantic_cache is not None:
+            stats["semantic"] = self.semantic_cache.get_stats()
+        return stats
+
+    def get_scheduler_stats(self) -> Dict[str, Any]:
+        """Get admission queue depth, concurrency and wait times."""
+        return self.scheduler.get_stats()
+
+    def get_session_stats(self) -> Dict[str, Any]:
+        """Get resident sessions, their size and eviction counts."""
+        return self.sessions.get_stats()
+
+    def get_routing_stats(self) -> Dict[str, Any]:
+        """Get per-tier routing hit rates and latency."""
+        return self.supervisor.get_routing_stats()
 
     def add_expert(self, name: str, agent: Any) -> None:
         """Add a new expert agent to the system."""
@@ -98,11 +517,22 @@ class MultiAgentSystem:
         """Add documents to the RAG agent's knowledge base."""
         try:
             logger.info(f"Adding {len(documents)} documents to knowledge base")
+            # Embedding and storing make no LLM calls, so take no LLM slot
             return await self.rag_agent.add_documents(documents)
         except Exception as e:
             logger.error(f"Error adding documents to knowledge base: {e}")
             return []
 
+    async def add_knowledge_files(self, paths: List[str], chunk_size: int = 1000,
+                                  chunk_overlap: int = 200) -> Dict[str, Any]:
+        """Chunk text files into the RAG agent's knowledge base."""
+        try:
+            logger.info(f"Adding {len(paths)} files to knowledge base")
+            return await self.rag_agent.add_files(paths, chunk_size, chunk_overlap)
+        except Exception as e:
+            logger.error(f"Error adding files to knowledge base: {e}")
+            return {"error": f"Error adding files: {str(e)}"}
+
     async def browse_url(self, url: str) -> Dict[str, Any]:
         """Browse a URL using the web agent."""
         try:
@@ -0,0 +1,178 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Sequence, Tuple
+from langchain_core.caches import BaseCache
+from langchain_core.outputs import Generation
+from langchain_core.load import dumps, loads
+
+class ResponseCache(BaseCache):
+    """Content-addressed LLM response cache.
+
+    Entries are keyed on a sha256 of the endpoint namespace, the LLM string
+    (model and sampling parameters) and the rendered prompt. Recent entries
+    live in an in-memory LRU; all entries are persisted to SQLite with a
+    TTL and a total size cap enforced by evicting the least recently used.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = "./cache/responses.sqlite",
+        namespace: str = "",
+        max_entries: int = 256,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl: Optional[float] = 7 * 24 * 3600
+    ):
+        self.path = path
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, Tuple[float, Sequence[Generation]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL
+                )"""
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)"
+            )
+            self._conn.commit()
+
+    def make_key(self, prompt: str, llm_string: str) -> str:
+        """Build the content address for a prompt and LLM configuration."""
+        payload = json.dumps([self.namespace, llm_string, prompt])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _expired(self, created: float, now: float) -> bool:
+        """Check whether an entry created at `created` has outlived the TTL."""
+        return self.ttl is not None and now - created > self.ttl
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        """Look up cached generations for a prompt."""
+        key = self.make_key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created, generations = entry
+                if not self._expired(created, now):
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return generations
+                del self._memory[key]
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT value, created FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, created = row
+                    if not self._expired(created, now):
+                        self._conn.execute(
+                            "UPDATE responses SET accessed = ? WHERE key = ?", (now, key)
+                        )
+                        self._conn.commit()
+                        generations = [loads(item) for item in json.loads(value)]
+                        self._remember(key, created, generations)
+                        self.hits += 1
+                        return generations
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+
+            self.misses += 1
+            return None
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        """Store generations for a prompt."""
+        key = self.make_key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, list(return_val))
+            if self._conn is None:
+                return
+            value = json.dumps([dumps(generation) for generation in return_val])
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _remember(self, key: str, created: float, generations: Sequence[Generation]) -> None:
+        """Put an entry into the in-memory LRU."""
+        self._memory[key] = (created, generations)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self) -> None:
+        """Drop expired entries, then least recently used ones over the size cap."""
+        if self.ttl is not None:
+            self._conn.execute(
+                "DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,)
+            )
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY accessed ASC"
+        ).fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._memory.pop(key, None)
+            total -= size
+
+    def clear(self, **kwargs: Any) -> None:
+        """Remove all cached responses."""
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM responses")
+                self._conn.commit()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and cache size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'memory_entries': len(self._memory)
+            }
+            if self._conn is not None:
+                count, size = self._conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+                ).fetchone()
+                stats['disk_entries'] = count
+                stats['disk_bytes'] = size
+            return stats
+
+    def close(self) -> None:
+        """Close the SQLite store."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,164 @@
+import re
+import time
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import numpy as np
+
+logger = logging.getLogger("smolit")
+
+URL_PATTERN = re.compile(r"(https?://|www\.)\S+", re.IGNORECASE)
+
+# Words that mark input starting with a command name ("find me a recipe")
+# as plain language rather than a shell command
+PROSE_WORDS = frozenset(
+    "a an the me my i you your we us our it is are was be to of for in on at "
+    "and or with about some any all what which who how why when where please "
+    "can could would should do does this that these those".split()
+)
+
+def find_url(text: str) -> Optional[str]:
+    """Get the first URL in a text, with a scheme added if it had none."""
+    match = URL_PATTERN.search(text)
+    if not match:
+        return None
+    url = match.group(0).rstrip(".,;:!?)]}'\"")
+    return url if url.lower().startswith(("http://", "https://")) else f"https://{url}"
+
+@dataclass
+class RouteDecision:
+    expert: Optional[str]
+    tier: str  # 'rules', 'embedding', 'llm'
+    confidence: float
+    latency: float = 0.0
+
+class ExpertRouter:
+    """Cheap, tiered routing of user requests to expert agents.
+
+    Tier 1 applies deterministic rules (URLs go to the web expert, shell-like
+    input to the command expert; `command_validator`, if given, must accept
+    it too). Tier 2 compares the request's embedding to
+    the experts' descriptions. Requests neither tier is confident about are
+    left for the supervisor LLM.
+    """
+
+    TIERS = ("rules", "embedding", "llm")
+
+    def __init__(
+        self,
+        expert_descriptions: Dict[str, str],
+        embedding_function: Optional[Callable[[List[str]], List[List[float]]]] = None,
+        shell_commands: Iterable[str] = (),
+        command_validator: Optional[Callable[[str], bool]] = None,
+        threshold: float = 0.5,
+        margin: float = 0.05,
+        error_cooldown: float = 60.0
+    ):
+        self.expert_descriptions = expert_descriptions
+        self.embedding_function = embedding_function
+        self.shell_commands = set(shell_commands)
+        self.command_validator = command_validator
+        self.threshold = threshold
+        self.margin = margin
+        self.error_cooldown = error_cooldown
+        self._description_vectors: Dict[str, np.ndarray] = {}
+        self._embedding_disabled_until = 0.0
+        self.hits = {tier: 0 for tier in self.TIERS}
+        self.total_latency = {tier: 0.0 for tier in self.TIERS}
+
+    def route_rules(self, user_input: str, experts: Iterable[str]) -> Optional[RouteDecision]:
+        """Route on unambiguous surface features of the request."""
+        experts = set(experts)
+        text = user_input.strip()
+        if "web" in experts and URL_PATTERN.search(text):
+            return RouteDecision("web", "rules", 1.0)
+        if "command" in experts and text:
+            if text.startswith("$ "):
+                return RouteDecision("command", "rules", 1.0)
+            if self._is_shell_command(text):
+                return RouteDecision("command", "rules", 1.0)
+        return None
+
+    def _is_shell_command(self, text: str) -> bool:
+        """Whether input is shaped like a shell command, not a sentence."""
+        words = text.split()
+        if words[0] not in self.shell_commands:
+            return False
+        if any(word.lower() in PROSE_WORDS for word in words[1:]) or text.endswith("?"):
+            return False
+        return self.command_validator is None or self.command_validator(text)
+
+    async def _embed(self, texts: List[str]) -> np.ndarray:
+        """Embed texts and normalize them for cosine similarity."""
+        vectors = np.asarray(
+            await asyncio.to_thread(self.embedding_function, texts), dtype=np.float32
+        )
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return vectors / norms
+
+    async def route_embedding(self, user_input: str, experts: Iterable[str]) -> Optional[RouteDecision]:
+        """Route by similarity between the request and expert descriptions."""
+        if self.embedding_function is None or time.monotonic() < self._embedding_disabled_until:
+            return None
+        names = [name for name in experts if name in self.expert_descriptions]
+        if len(names) < 1:
+            return None
+        try:
+            missing = [name for name in names if name not in self._description_vectors]
+            if missing:
+                vectors = await self._embed([self.expert_descriptions[name] for name in missing])
+                self._description_vectors.update(zip(missing, vectors))
+            query = (await self._embed([user_input]))[0]
+        except Exception as e:
+            # Don't retry a broken embedding backend on every message
+            logger.warning(f"Embedding routing unavailable: {e}")
+            self._embedding_disabled_until = time.monotonic() + self.error_cooldown
+            return None
+
+        scores = sorted(
+            ((float(self._description_vectors[name] @ query), name) for name in names),
+            reverse=True
+        )
+        best_score, best = scores[0]
+        runner_up = scores[1][0] if len(scores) > 1 else -1.0
+        if best_score < self.threshold or best_score - runner_up < self.margin:
+            return None
+        return RouteDecision(best, "embedding", best_score)
+
+    async def route(self, user_input: str, experts: Iterable[str]) -> Optional[RouteDecision]:
+        """Try the cheap tiers in order; None means the LLM should decide."""
+        start = time.perf_counter()
+        experts = list(experts)
+        decision = self.route_rules(user_input, experts)
+        if decision is None:
+            decision = await self.route_embedding(user_input, experts)
+        if decision is not None:
+            decision.latency = time.perf_counter() - start
+            self.record(decision)
+        return decision
+
+    def record(self, decision: RouteDecision) -> None:
+        """Count a routing decision and its latency."""
+        self.hits[decision.tier] += 1
+        self.total_latency[decision.tier] += decision.latency
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-tier hit rates and average routing latency."""
+        total = sum(self.hits.values())
+        return {
+            'total': total,
+            'tiers': {
+                tier: {
+                    'hits': self.hits[tier],
+                    'hit_rate': self.hits[tier] / total if total else 0.0,
+                    'avg_latency_ms': (
+                        self.total_latency[tier] / self.hits[tier] * 1000
+                        if self.hits[tier] else 0.0
+                    )
+                }
+                for tier in self.TIERS
+            },
+            'avg_latency_ms': sum(self.total_latency.values()) / total * 1000 if total else 0.0
+        }
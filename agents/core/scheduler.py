@@ -0,0 +1,164 @@
+import time
+import heapq
+import asyncio
+import itertools
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+class Priority(IntEnum):
+    """Request classes; lower values are admitted first."""
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+class AdmissionRejected(RuntimeError):
+    """Raised when a request is shed or waits past its deadline."""
+
+# Priority of the request being processed, for the LLM calls it makes
+_current_priority: ContextVar[Priority] = ContextVar("smolit_priority", default=Priority.INTERACTIVE)
+
+def current_priority() -> Priority:
+    """Get the priority of the running request."""
+    return _current_priority.get()
+
+@contextmanager
+def admission_priority(priority: Priority) -> Iterator[None]:
+    """Admit the block's LLM calls with the given priority."""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        try:
+            _current_priority.reset(token)
+        except ValueError:
+            # Closed from another context (e.g. an abandoned stream)
+            pass
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "future", "enqueued")
+
+    def __init__(self, priority: Priority, seq: int, future: asyncio.Future):
+        self.priority = priority
+        self.seq = seq
+        self.future = future
+        self.enqueued = time.monotonic()
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+class AdmissionController:
+    """Bound the number of concurrent LLM requests, queueing the rest by priority.
+
+    At most `max_concurrent` requests run at once. Others wait in a priority
+    queue (interactive before background, FIFO within a class) until a slot
+    frees up or their deadline passes. When `max_queue` requests are already
+    waiting, a new request is shed, unless it outranks the lowest-priority
+    waiter, which is shed in its place.
+    """
+
+    def __init__(self, max_concurrent: int = 2, max_queue: int = 32, queue_timeout: float = 30.0):
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent must be at least 1")
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self._queue: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._stats = {
+            priority: {"admitted": 0, "shed": 0, "timed_out": 0, "total_wait": 0.0, "max_wait": 0.0}
+            for priority in Priority
+        }
+
+    def _queued(self) -> List[_Waiter]:
+        return [waiter for waiter in self._queue if not waiter.future.done()]
+
+    def _record_admission(self, priority: Priority, waited: float) -> None:
+        stats = self._stats[priority]
+        stats["admitted"] += 1
+        stats["total_wait"] += waited
+        stats["max_wait"] = max(stats["max_wait"], waited)
+
+    def _shed(self, priority: Priority) -> None:
+        """Make room in a full queue, or reject the new request."""
+        queued = self._queued()
+        if len(queued) < self.max_queue:
+            return
+        lowest = max(queued, default=None)
+        if lowest is not None and lowest.priority > priority:
+            lowest.future.set_exception(AdmissionRejected("Request shed for higher-priority work"))
+            self._stats[lowest.priority]["shed"] += 1
+            return
+        self._stats[priority]["shed"] += 1
+        raise AdmissionRejected("Too many requests queued; try again later")
+
+    async def acquire(self, priority: Priority = Priority.INTERACTIVE, timeout: Optional[float] = None) -> None:
+        """Wait for a slot; raises AdmissionRejected if shed or past the deadline."""
+        if self.active < self.max_concurrent and not self._queued():
+            self.active += 1
+            self._record_admission(priority, 0.0)
+            return
+
+        self._shed(priority)
+        waiter = _Waiter(priority, next(self._seq), asyncio.get_running_loop().create_future())
+        heapq.heappush(self._queue, waiter)
+        timeout = self.queue_timeout if timeout is None else timeout
+        try:
+            # Shield so a timeout doesn't cancel a slot that was just handed over
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+        except asyncio.TimeoutError:
+            if waiter.future.done() and not waiter.future.exception():
+                # Admitted just as the deadline passed; give the slot back
+                self.release()
+            else:
+                waiter.future.cancel()
+            self._stats[priority]["timed_out"] += 1
+            raise AdmissionRejected(f"Waited more than {timeout}s for a free slot")
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled() and not waiter.future.exception():
+                self.release()
+            else:
+                waiter.future.cancel()
+            raise
+        self._record_admission(priority, time.monotonic() - waiter.enqueued)
+
+    def release(self) -> None:
+        """Free a slot, handing it to the next waiter in priority order."""
+        while self._queue:
+            waiter = heapq.heappop(self._queue)
+            if not waiter.future.done():
+                # The slot passes straight to the waiter; active is unchanged
+                waiter.future.set_result(None)
+                return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority = Priority.INTERACTIVE,
+                   timeout: Optional[float] = None) -> AsyncIterator[None]:
+        """Hold a slot for the duration of the block."""
+        await self.acquire(priority, timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue depth, concurrency and wait times per priority."""
+        queued = self._queued()
+        return {
+            "active": self.active,
+            "max_concurrent": self.max_concurrent,
+            "queue_depth": len(queued),
+            "priorities": {
+                priority.name.lower(): {
+                    "queued": sum(1 for waiter in queued if waiter.priority == priority),
+                    "admitted": stats["admitted"],
+                    "shed": stats["shed"],
+                    "timed_out": stats["timed_out"],
+                    "avg_wait_ms": stats["total_wait"] / stats["admitted"] * 1000 if stats["admitted"] else 0.0,
+                    "max_wait_ms": stats["max_wait"] * 1000
+                }
+                for priority, stats in self._stats.items()
+            }
+        }
@@ -0,0 +1,129 @@
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Callable, List, Optional
+import numpy as np
+
+logger = logging.getLogger("smolit")
+
+class SemanticCache:
+    """Embedding-similarity cache for near-duplicate user queries.
+
+    Entries are grouped by scope (the expert that produced the answer) and a
+    lookup hits when the cosine similarity between the new query and a cached
+    one reaches `threshold`.
+    """
+
+    def __init__(
+        self,
+        embedding_function: Callable[[List[str]], List[List[float]]],
+        threshold: float = 0.95,
+        max_entries: int = 512
+    ):
+        self.embedding_function = embedding_function
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._scopes: Dict[str, Dict[str, Any]] = {}
+        # Embeddings of recent lookups, so a miss followed by update embeds once
+        self._recent: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+    async def _embed(self, text: str) -> np.ndarray:
+        """Embed a query and normalize it for cosine similarity."""
+        if text in self._recent:
+            self._recent.move_to_end(text)
+            return self._recent[text]
+        vectors = await asyncio.to_thread(self.embedding_function, [text])
+        vector = np.asarray(vectors[0], dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector = vector / norm
+        self._recent[text] = vector
+        while len(self._recent) > 32:
+            self._recent.popitem(last=False)
+        return vector
+
+    async def lookup(self, query: str, scope: str = "default") -> Optional[str]:
+        """Return a cached response for a sufficiently similar query."""
+        entries = self._scopes.get(scope)
+        if not entries or not entries["responses"]:
+            self.misses += 1
+            return None
+        try:
+            vector = await self._embed(query)
+        except Exception as e:
+            logger.warning(f"Semantic cache lookup failed: {e}")
+            self.misses += 1
+            return None
+
+        similarities = entries["vectors"] @ vector
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.threshold:
+            self.misses += 1
+            return None
+
+        entries["last_used"][best] = time.monotonic()
+        self.hits += 1
+        logger.debug(f"Semantic cache hit ({similarities[best]:.3f}) in scope {scope}")
+        return entries["responses"][best]
+
+    async def update(self, query: str, response: str, scope: str = "default") -> None:
+        """Cache the response for a query."""
+        try:
+            vector = await self._embed(query)
+        except Exception as e:
+            logger.warning(f"Semantic cache update failed: {e}")
+            return
+
+        entries = self._scopes.setdefault(scope, {
+            "vectors": np.empty((0, vector.shape[0]), dtype=np.float32),
+            "responses": [],
+            "last_used": []
+        })
+        if entries["vectors"].shape[1] != vector.shape[0]:
+            # The embedding model changed; old vectors are not comparable
+            self.invalidate(scope)
+            await self.update(query, response, scope)
+            return
+
+        if len(entries["responses"]) >= self.max_entries:
+            oldest = int(np.argmin(entries["last_used"]))
+            entries["vectors"] = np.delete(entries["vectors"], oldest, axis=0)
+            del entries["responses"][oldest]
+            del entries["last_used"][oldest]
+
+        entries["vectors"] = np.vstack([entries["vectors"], vector])
+        entries["responses"].append(response)
+        entries["last_used"].append(time.monotonic())
+
+    def invalidate(self, scope: Optional[str] = None) -> None:
+        """Drop cached responses for one scope, or for all scopes."""
+        if scope is None:
+            self._scopes.clear()
+        else:
+            self._scopes.pop(scope, None)
+
+    def invalidate_prefix(self, prefix: str) -> None:
+        """Drop cached responses for every scope starting with `prefix`."""
+        for scope in [scope for scope in self._scopes if scope.startswith(prefix)]:
+            del self._scopes[scope]
+
+    def invalidate_suffix(self, suffix: str) -> None:
+        """Drop cached responses for every scope ending with `suffix`."""
+        for scope in [scope for scope in self._scopes if scope.endswith(suffix)]:
+            del self._scopes[scope]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and entries per scope."""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': {
+                scope: len(entries["responses"])
+                for scope, entries in self._scopes.items()
+            }
+        }
@@ -0,0 +1,306 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from langchain_core.memory import BaseMemory
+from .tokens import count_tokens
+from .turn_store import TurnStore
+
+logger = logging.getLogger("smolit")
+
+DEFAULT_SESSION = "default"
+
+# The session the running request belongs to; copied into worker threads
+# and tasks, so agent memories resolve to it wherever they are called from
+_current_session: ContextVar[str] = ContextVar("smolit_session", default=DEFAULT_SESSION)
+
+# Builds an agent's memory: (agent name, token limit, session turn store)
+MemoryFactory = Callable[[str, int, TurnStore], BaseMemory]
+
+class Session:
+    """One conversation: its turn store and each agent's memory over it."""
+
+    def __init__(self, session_id: str, turn_store: Optional[TurnStore] = None):
+        self.session_id = session_id
+        self.turn_store = turn_store if turn_store is not None else TurnStore()
+        self.memories: Dict[str, BaseMemory] = {}
+        self.last_used = time.monotonic()
+        # Requests in flight; a session in use is never evicted
+        self.active = 0
+
+    def memory(self, agent: str, max_token_limit: int, factory: MemoryFactory) -> BaseMemory:
+        """Get an agent's memory, building it on first use."""
+        memory = self.memories.get(agent)
+        if memory is None:
+            memory = self.memories[agent] = factory(agent, max_token_limit, self.turn_store)
+        return memory
+
+    @property
+    def tokens(self) -> int:
+        """Tokens held by the session's turns and summary."""
+        turns = sum(turn.tokens for turn in self.turn_store.since(self.turn_store.first_seq))
+        return turns + count_tokens(self.turn_store.summary)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the conversation for spilling to disk."""
+        return {
+            "first_seq": self.turn_store.first_seq,
+            "summary": self.turn_store.summary,
+            "turns": [
+                [turn.agent, turn.role, turn.content]
+                for turn in self.turn_store.since(self.turn_store.first_seq)
+            ],
+            "memories": {
+                agent: {
+                    "max_token_limit": getattr(memory, "max_token_limit", 0),
+                    "start": memory.chat_memory.start
+                }
+                for agent, memory in self.memories.items()
+            }
+        }
+
+    @classmethod
+    def from_dict(cls, session_id: str, data: Dict[str, Any], factory: MemoryFactory) -> "Session":
+        """Restore a spilled session."""
+        turn_store = TurnStore.from_turns(data["turns"], data["first_seq"], data.get("summary", ""))
+        session = cls(session_id, turn_store)
+        for agent, state in data["memories"].items():
+            memory = session.memory(agent, state["max_token_limit"], factory)
+            memory.chat_memory.start = state["start"]
+        return session
+
+class SessionManager:
+    """Per-session agent memory, keeping recently used sessions resident.
+
+    Sessions are created on first use. When more than `max_sessions` are
+    resident, their turns and summaries exceed `max_tokens`, or a session has
+    been idle for `idle_timeout` seconds, the least recently used sessions
+    are evicted: written to the SQLite store at `path` (and restored from it
+    when used again), or dropped if there is no store. The default session
+    and sessions with requests in flight are never evicted. `on_evict` is
+    called with the id of each session evicted or dropped, to release state
+    kept for it elsewhere.
+    """
+
+    def __init__(
+        self,
+        memory_factory: MemoryFactory,
+        max_sessions: int = 256,
+        max_tokens: Optional[int] = None,
+        idle_timeout: Optional[float] = 3600.0,
+        path: Optional[str] = None,
+        on_evict: Optional[Callable[[str], None]] = None
+    ):
+        self.memory_factory = memory_factory
+        self.max_sessions = max_sessions
+        self.max_tokens = max_tokens
+        self.idle_timeout = idle_timeout
+        self.path = path
+        self.on_evict = on_evict
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._conn = None
+        self._stats = {"created": 0, "evicted": 0, "spilled": 0, "restored": 0}
+
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS sessions (
+                    id TEXT PRIMARY KEY,
+                    state TEXT NOT NULL,
+                    updated REAL NOT NULL
+                )"""
+            )
+            self._conn.commit()
+
+    def get(self, session_id: str = DEFAULT_SESSION) -> Session:
+        """Get a session, restoring or creating it as needed."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._load(session_id)
+                if session is None:
+                    session = Session(session_id)
+                    self._stats["created"] += 1
+                self._sessions[session_id] = session
+            self._sessions.move_to_end(session_id)
+            session.last_used = time.monotonic()
+            self._evict(keep=session_id)
+            return session
+
+    def current(self) -> Session:
+        """Get the session of the running request."""
+        session_id = _current_session.get()
+        # Requests hold their session resident, so this is usually a plain lookup
+        session = self._sessions.get(session_id)
+        return session if session is not None else self.get(session_id)
+
+    @contextmanager
+    def use(self, session_id: Optional[str] = None) -> Iterator[Session]:
+        """Run the block as part of a session's request."""
+        session = self.get(session_id or DEFAULT_SESSION)
+        session.active += 1
+        token = _current_session.set(session.session_id)
+        try:
+            yield session
+        finally:
+            try:
+                _current_session.reset(token)
+            except ValueError:
+                # Closed from another context (e.g. an abandoned stream)
+                pass
+            session.active -= 1
+            session.last_used = time.monotonic()
+
+    def memory(self, agent: str, max_token_limit: int) -> BaseMemory:
+        """Get an agent's memory in the current session."""
+        return self.current().memory(agent, max_token_limit, self.memory_factory)
+
+    def _evictable(self, keep: str) -> List[Session]:
+        return [
+            session for session_id, session in self._sessions.items()
+            if session_id not in (keep, DEFAULT_SESSION) and not session.active
+        ]
+
+    def _evict(self, keep: str) -> None:
+        """Evict idle sessions, then least recently used ones over the caps."""
+        if self.idle_timeout is not None:
+            cutoff = time.monotonic() - self.idle_timeout
+            for session in self._evictable(keep):
+                if session.last_used < cutoff:
+                    self._spill(session)
+        candidates = iter(self._evictable(keep))
+        tokens = self.resident_tokens() if self.max_tokens is not None else 0
+        while len(self._sessions) > self.max_sessions or (
+            self.max_tokens is not None and tokens > self.max_tokens
+        ):
+            session = next(candidates, None)
+            if session is None:
+                break
+            tokens -= session.tokens
+            self._spill(session)
+
+    def _released(self, session_id: str) -> None:
+        """Tell the eviction listener a session left memory."""
+        if self.on_evict is None:
+            return
+        try:
+            self.on_evict(session_id)
+        except Exception as e:
+            logger.error(f"Error in session eviction listener for {session_id}: {e}")
+
+    def _spill(self, session: Session) -> None:
+        """Move a session out of memory, persisting it if there is a store."""
+        del self._sessions[session.session_id]
+        self._stats["evicted"] += 1
+        self._released(session.session_id)
+        if self._conn is None:
+            return
+        try:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (id, state, updated) VALUES (?, ?, ?)",
+                (session.session_id, json.dumps(session.to_dict()), time.time())
+            )
+            self._conn.commit()
+            self._stats["spilled"] += 1
+        except Exception as e:
+            logger.error(f"Error spilling session {session.session_id}: {e}")
+
+    def _load(self, session_id: str) -> Optional[Session]:
+        """Restore a spilled session, if there is one."""
+        if self._conn is None:
+            return None
+        row = self._conn.execute("SELECT state FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None:
+            return None
+        try:
+            session = Session.from_dict(session_id, json.loads(row[0]), self.memory_factory)
+        except Exception as e:
+            logger.error(f"Error restoring session {session_id}: {e}")
+            return None
+        self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+        self._conn.commit()
+        self._stats["restored"] += 1
+        return session
+
+    def drop(self, session_id: str) -> None:
+        """Forget a session, in memory and on disk."""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+                self._conn.commit()
+            self._released(session_id)
+
+    def resident_tokens(self) -> int:
+        """Tokens held by all sessions in memory."""
+        return sum(session.tokens for session in self._sessions.values())
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get resident sessions, their size and eviction counters."""
+        with self._lock:
+            stats = {
+                "resident": len(self._sessions),
+                "resident_tokens": self.resident_tokens(),
+                **self._stats
+            }
+            if self._conn is not None:
+                stats["on_disk"] = self._conn.execute(
+                    "SELECT COUNT(*) FROM sessions"
+                ).fetchone()[0]
+            return stats
+
+    def close(self) -> None:
+        """Close the SQLite store."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+class SessionMemory(BaseMemory):
+    """An agent's memory that resolves to the current session's memory.
+
+    Agents and their chains are shared by every session; only the memory
+    behind this proxy is allocated per session.
+    """
+
+    sessions: Any
+    agent: str
+    max_token_limit: int = 1000
+    memory_key: str = "history"
+
+    @property
+    def memory_variables(self) -> List[str]:
+        return [self.memory_key]
+
+    @property
+    def current(self) -> BaseMemory:
+        """The memory of the current session."""
+        return self.sessions.memory(self.agent, self.max_token_limit)
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        return self.current.load_memory_variables(inputs)
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        self.current.save_context(inputs, outputs)
+
+    async def asave_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        await self.current.asave_context(inputs, outputs)
+
+    def clear(self) -> None:
+        self.current.clear()
@@ -1,26 +1,67 @@
-from typing import List, Dict, Any
-from langchain.prompts import ChatPromptTemplate
+from typing import List, Dict, Any, AsyncIterator, Callable, Optional
+from langchain.prompts import ChatPromptTemplate, PromptTemplate
 from langchain.llms.base import BaseLLM
+from langchain_core.memory import BaseMemory
 from langchain.chains import LLMChain
 from .base_agent import BaseAgent
+from .router import ExpertRouter, RouteDecision
+from ..tools.command_executor import CommandExecutor
 import asyncio
+import re
+import time
+
+DELEGATION_PREFIX = "EXPERT:"
 
 class SupervisorAgent(BaseAgent):
-    def __init__(self, llm: BaseLLM, expert_agents: Dict[str, BaseAgent]):
-        """Initialize the supervisor agent."""
-        super().__init__(llm)
+    # Routing only needs the gist of the conversation
+    memory_token_limit = 500
+
+    def __init__(
+        self,
+        llm: BaseLLM,
+        expert_agents: Dict[str, BaseAgent],
+        expert_descriptions: Optional[Dict[str, str]] = None,
+        embedding_function: Optional[Callable[[List[str]], List[List[float]]]] = None,
+        memory: Optional[BaseMemory] = None,
+        dispatch_mode: str = "merge"
+    ):
+        """Initialize the supervisor agent.
+
+        Requests are routed by cheap rules and embedding similarity first;
+        the LLM is only asked when neither is confident. Requests needing
+        several experts are dispatched in `dispatch_mode` ("merge" or "first").
+        """
+        if dispatch_mode not in ("merge", "first"):
+            raise ValueError(f"Unknown dispatch mode: {dispatch_mode}")
+        super().__init__(llm, memory)
         self.expert_agents = expert_agents
+        # Shared deadline for experts dispatched in parallel
+        self.dispatch_timeout = 60.0
+        self.dispatch_mode = dispatch_mode
+        self.expert_descriptions = expert_descriptions or {}
+        executor = CommandExecutor()
+        self.router = ExpertRouter(
+            self.expert_descriptions,
+            embedding_function=embedding_function,
+            shell_commands=executor.allowed_commands,
+            command_validator=executor.is_safe_command
+        )
         self._initialize_chain()
 
     def _initialize_chain(self) -> None:
         """Initialize the supervisor chain with routing logic."""
         prompt = ChatPromptTemplate.from_messages([
             ("system", """You are a friendly AI assistant supervisor that helps users by routing their requests to the appropriate expert agent.
-            When responding to greetings or casual conversation, use the knowledge expert to provide a friendly response.
             For system commands or operations, use the command expert.
-            For internet searches or web information, use the web expert."""),
-            ("human", "{text}"),
-            ("assistant", """Hello! I'm here to help. Let me analyze your request and provide an appropriate response.""")
+            For internet searches or web information, use the web expert.
+            For questions about stored knowledge, use the knowledge expert.
+            To hand a request to an expert, reply with only "EXPERT: <name>".
+            If it needs several experts, list them all, e.g. "EXPERT: knowledge, web".
+            When responding to greetings or casual conversation, reply to the user directly.
+
+            Available expert agents:
+            {experts}"""),
+            ("human", "{input}")
         ])
         
         self.chain = LLMChain(
@@ -30,31 +71,234 @@ class SupervisorAgent(BaseAgent):
             verbose=True
         )
 
-    async def process(self, user_input: str) -> str:
+        # Merges the answers of experts dispatched in parallel
+        self.synthesis_chain = LLMChain(
+            llm=self.llm,
+            prompt=PromptTemplate(
+                input_variables=["input", "answers"],
+                template="""
+            Several experts answered the following request.
+
+            Request: {input}
+
+            {answers}
+
+            Combine their answers into one coherent response for the user.
+            """
+            ),
+            verbose=True
+        )
+
+    def set_server_options(self, options: Optional[Dict[str, Any]]) -> None:
+        """Send extra request fields to the LLM server, for synthesis calls too."""
+        super().set_server_options(options)
+        self.synthesis_chain.llm_kwargs = self.llm_kwargs
+
+    async def _prepare_inputs(self, user_input: str) -> Dict[str, Any]:
+        """Build the supervisor chain inputs."""
+        # The expert list is a prompt variable of its own, so memory records
+        # only the user's message and experts don't see it a second time
+        experts_list = "\n".join(
+            f"- {name}: {self.expert_descriptions.get(name, '').split('.')[0]}"
+            for name in self.expert_agents.keys()
+        )
+        return {"input": user_input, "experts": experts_list}
+
+    def route_rules(self, user_input: str) -> Optional[RouteDecision]:
+        """Route with the rules tier alone; None if the rules don't decide."""
+        start = time.perf_counter()
+        decision = self.router.route_rules(user_input, list(self.expert_agents.keys()))
+        if decision is not None:
+            decision.latency = time.perf_counter() - start
+            self.router.record(decision)
+        return decision
+
+    async def route(self, user_input: str) -> RouteDecision:
+        """Route with the cheap tiers; an expert of None leaves it to the LLM."""
+        decision = await self.router.route(user_input, list(self.expert_agents.keys()))
+        return decision or RouteDecision(None, "llm", 0.0)
+
+    def _parse_delegation(self, response: str) -> List[str]:
+        """Get the experts named by an "EXPERT: <name>, ..." reply, if any."""
+        match = re.match(rf"\s*{DELEGATION_PREFIX}(.*)", response, re.IGNORECASE | re.DOTALL)
+        if not match:
+            return []
+        names = re.findall(r"[\w-]+", match.group(1).lower())
+        return list(dict.fromkeys(name for name in names if name in self.expert_agents))
+
+    @staticmethod
+    def _is_good_answer(response: Any) -> bool:
+        """Whether an expert produced a usable (non-error) answer."""
+        return isinstance(response, str) and bool(response.strip()) and not response.startswith("Error")
+
+    async def dispatch(
+        self,
+        user_input: str,
+        experts: List[str],
+        mode: str = "merge",
+        timeout: Optional[float] = None
+    ) -> str:
+        """Run several experts concurrently under one shared deadline.
+
+        In "merge" mode every answer that arrives before the deadline is
+        combined by a single synthesis call. In "first" mode the first good
+        answer is returned and the slower experts are cancelled.
+        """
+        if mode not in ("merge", "first"):
+            raise ValueError(f"Unknown dispatch mode: {mode}")
+        timeout = self.dispatch_timeout if timeout is None else timeout
+        if len(experts) == 1:
+            return await asyncio.wait_for(self.expert_agents[experts[0]].process(user_input), timeout)
+
+        tasks = {
+            asyncio.ensure_future(self.expert_agents[name].process(user_input)): name
+            for name in experts
+        }
+        answers: Dict[str, str] = {}
+        deadline = asyncio.get_running_loop().time() + timeout
+        pending = set(tasks)
+        try:
+            while pending:
+                remaining = deadline - asyncio.get_running_loop().time()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=remaining,
+                    return_when=asyncio.FIRST_COMPLETED if mode == "first" else asyncio.ALL_COMPLETED
+                )
+                for task in done:
+                    if not task.cancelled() and task.exception() is None and self._is_good_answer(task.result()):
+                        answers[tasks[task]] = task.result()
+                if mode == "first" and answers:
+                    break
+        finally:
+            # Don't leave slower (or timed out) experts running
+            for task in pending:
+                task.cancel()
+
+        if not answers:
+            return f"Error in supervisor processing: no expert answered in time ({', '.join(experts)})"
+        if mode == "first" or len(answers) == 1:
+            return next(iter(answers.values()))
+
+        ordered = [(name, answers[name]) for name in experts if name in answers]
+        response = await self.synthesis_chain.arun(
+            input=user_input,
+            answers="\n\n".join(f"{name} expert:\n{answer}" for name, answer in ordered)
+        )
+        return response.replace("</s>", "").strip()
+
+    def _record_llm_route(self, expert: Optional[str], start: float) -> None:
+        """Count a routing decision made by the LLM tier."""
+        self.router.record(RouteDecision(expert, "llm", 0.0, time.perf_counter() - start))
+
+    async def process(self, user_input: str, decision: Optional[RouteDecision] = None) -> str:
         """Process user input by routing to appropriate expert(s)."""
         try:
-            # Get available experts list
-            experts_list = ", ".join(self.expert_agents.keys())
-            
-            # Format the input text
-            text = f"""Based on the conversation history:
-            Available expert agents: {experts_list}
-            
-            Human: {user_input}"""
+            start = time.perf_counter()
+            if decision is None:
+                decision = await self.route(user_input)
+            if decision.expert is not None:
+                return await self.expert_agents[decision.expert].process(user_input)
+
+            inputs = await self._prepare_inputs(user_input)
             
             # Get supervisor's decision
-            response = await self.chain.arun(text=text)
+            response = await self.chain.arun(**inputs)
             
             # Clean up response
             response = response.replace("</s>", "").strip()
             
-            # TODO: Implement proper response parsing and expert routing
-            # For now, return supervisor's analysis
+            experts = self._parse_delegation(response)
+            self._record_llm_route(experts[0] if experts else None, start)
+            if len(experts) > 1:
+                return await self.dispatch(user_input, experts, mode=self.dispatch_mode)
+            if experts:
+                return await self.expert_agents[experts[0]].process(user_input)
+            # No delegation: the supervisor answered directly
             return response
             
         except Exception as e:
             return f"Error in supervisor processing: {str(e)}"
 
+    async def _stream_expert(self, expert: str, user_input: str) -> AsyncIterator[str]:
+        """Stream an expert's response, if it supports streaming."""
+        agent = self.expert_agents[expert]
+        if hasattr(agent, "process_stream"):
+            async for chunk in agent.process_stream(user_input):
+                yield chunk
+        else:
+            yield await agent.process(user_input)
+
+    async def _stream_clean(self, inputs: Dict[str, Any]) -> AsyncIterator[str]:
+        """Stream the supervisor chain with "</s>" and leading space removed."""
+        started = False
+        pending = ""
+        async for chunk in self._stream_chain(inputs):
+            pending = (pending + chunk).replace("</s>", "")
+            # Hold back a tail that may be the start of a split "</s>"
+            held = next(
+                (i for i in range(3, 0, -1) if pending.endswith("</s>"[:i])),
+                0
+            )
+            chunk, pending = pending[:len(pending) - held], pending[len(pending) - held:]
+            if not started:
+                # Mirror the strip() applied to non-streamed responses
+                chunk = chunk.lstrip()
+                started = bool(chunk)
+            if chunk:
+                yield chunk
+        if not started:
+            pending = pending.lstrip()
+        if pending:
+            yield pending
+
+    async def process_stream(self, user_input: str, decision: Optional[RouteDecision] = None) -> AsyncIterator[str]:
+        """Process user input and yield the routed response as it streams."""
+        try:
+            start = time.perf_counter()
+            if decision is None:
+                decision = await self.route(user_input)
+            if decision.expert is not None:
+                async for chunk in self._stream_expert(decision.expert, user_input):
+                    yield chunk
+                return
+
+            inputs = await self._prepare_inputs(user_input)
+            stream = self._stream_clean(inputs)
+            # Buffer only until the reply can no longer be a delegation
+            buffer = ""
+            async for chunk in stream:
+                buffer += chunk
+                probe = buffer.upper()
+                if probe.startswith(DELEGATION_PREFIX):
+                    async for rest in stream:
+                        buffer += rest
+                    break
+                if not DELEGATION_PREFIX.startswith(probe):
+                    break
+
+            experts = self._parse_delegation(buffer)
+            self._record_llm_route(experts[0] if experts else None, start)
+            if len(experts) > 1:
+                yield await self.dispatch(user_input, experts, mode=self.dispatch_mode)
+                return
+            if experts:
+                async for chunk in self._stream_expert(experts[0], user_input):
+                    yield chunk
+                return
+            if buffer:
+                yield buffer
+            async for chunk in stream:
+                yield chunk
+        except Exception as e:
+            yield f"Error in supervisor processing: {str(e)}"
+
+    def get_routing_stats(self) -> Dict[str, Any]:
+        """Get per-tier routing hit rates and latency."""
+        return self.router.get_stats()
+
     def add_expert(self, name: str, agent: BaseAgent) -> None:
         """Add a new expert agent to the supervisor."""
         try:
@@ -73,12 +317,14 @@ class SupervisorAgent(BaseAgent):
     async def get_expert_status(self) -> Dict[str, Any]:
         """Get status of all expert agents."""
         try:
+            # Don't build lazily registered experts just to report on them
+            loaded = getattr(self.expert_agents, "is_loaded", lambda name: True)
             return {
                 name: {
                     "available": True,
-                    "memory": agent.get_memory()
+                    "memory": self.expert_agents[name].get_memory() if loaded(name) else {}
                 }
-                for name, agent in self.expert_agents.items()
+                for name in self.expert_agents
             }
         except Exception as e:
             return {"error": f"Error getting expert status: {str(e)}"}
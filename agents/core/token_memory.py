@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+from langchain.memory.chat_memory import BaseChatMemory
+from langchain.memory.prompt import SUMMARY_PROMPT
+from langchain_core.language_models import BaseLanguageModel
+from langchain_core.messages import get_buffer_string
+from pydantic import Field, PrivateAttr
+from .scheduler import AdmissionRejected, Priority, admission_priority
+from .turn_store import Turn, TurnStoreHistory
+
+logger = logging.getLogger("smolit")
+
+class TokenBudgetMemory(BaseChatMemory):
+    """Conversation memory that keeps recent turns within a token budget.
+
+    Messages live in a TurnStoreHistory, which may be a view onto a store
+    shared by all agents. The store keeps as many turns as the largest
+    budget of the memories reading it; turns compacted out of it are folded
+    into the store's summary by the `llm` in the background, once for all
+    agents, so summarizing never delays a request. Each memory shows the
+    summary and the newest turns of its window that fit its own budget.
+    Without an `llm` the memory is a plain sliding window.
+    """
+
+    chat_memory: TurnStoreHistory = Field(default_factory=TurnStoreHistory)
+
+    llm: Optional[BaseLanguageModel] = None
+    max_token_limit: int = 1000
+    # Once over budget, evict down to this fraction of it, so the history
+    # (and the server's cached prompt prefix) stays stable for a few turns
+    low_water_ratio: float = 0.75
+    human_prefix: str = "Human"
+    ai_prefix: str = "AI"
+    memory_key: str = "history"
+
+    # Where this memory's history starts within the window; moved forward in
+    # steps (not one turn at a time) when over budget
+    _trim_from: int = PrivateAttr(default=0)
+    _task: Optional[asyncio.Task] = PrivateAttr(default=None)
+    _thread: Optional[threading.Thread] = PrivateAttr(default=None)
+
+    def model_post_init(self, __context: Any) -> None:
+        super().model_post_init(__context)
+        self.chat_memory.store.require(self.max_token_limit)
+        if self.llm is not None:
+            self.chat_memory.store.summarized = True
+
+    @property
+    def memory_variables(self) -> List[str]:
+        return [self.memory_key]
+
+    @property
+    def summary(self) -> str:
+        """Summary of the conversation before this memory's window."""
+        return self.chat_memory.summary
+
+    def _get_input_output(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> tuple:
+        # Expert chains take extra inputs (context, web content...); the
+        # user's message is the one worth remembering
+        if self.input_key is None and "input" in inputs:
+            return super()._get_input_output({"input": inputs["input"]}, outputs)
+        return super()._get_input_output(inputs, outputs)
+
+    def _window(self) -> List[Turn]:
+        return [turn for turn in self.chat_memory.window() if turn.seq >= self._trim_from]
+
+    def _recent(self) -> List[Turn]:
+        """The newest turns of the window that fit the budget."""
+        window = self._window()
+        total = 0
+        for index in range(len(window) - 1, -1, -1):
+            total += window[index].tokens
+            if total > self.max_token_limit:
+                return window[index + 1:]
+        return window
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """Return the summary of older turns followed by the recent turns."""
+        # Other agents may have added turns since this memory last pruned
+        history = get_buffer_string(
+            [turn.to_message() for turn in self._recent()],
+            human_prefix=self.human_prefix,
+            ai_prefix=self.ai_prefix
+        )
+        if self.summary:
+            history = f"Summary of earlier conversation: {self.summary}\n{history}".rstrip()
+        return {self.memory_key: history}
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        """Save a turn and evict the oldest turns beyond the token budget."""
+        super().save_context(inputs, outputs)
+        self._prune()
+
+    async def asave_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        """Save a turn; summarizing evicted turns happens in the background."""
+        self.save_context(inputs, outputs)
+
+    def _prune(self) -> None:
+        """Compact the store, then trim this memory's history to the budget."""
+        store = self.chat_memory.store
+        store.compact()
+        window = self._window()
+        total = sum(turn.tokens for turn in window)
+        if total > self.max_token_limit:
+            for turn in window:
+                if total <= self.max_token_limit * self.low_water_ratio:
+                    break
+                self._trim_from = turn.seq + 1
+                total -= turn.tokens
+        if self.llm is None or not store.claim_summarizer():
+            return
+        try:
+            self._task = asyncio.get_running_loop().create_task(self._asummarize())
+        except RuntimeError:
+            # Saved from a worker thread (sync chain call); no loop to use
+            self._thread = threading.Thread(target=self._summarize, daemon=True)
+            self._thread.start()
+
+    def _summary_prompt(self, batch: List[Turn]) -> str:
+        new_lines = get_buffer_string(
+            [turn.to_message() for turn in batch],
+            human_prefix=self.human_prefix,
+            ai_prefix=self.ai_prefix
+        )
+        return SUMMARY_PROMPT.format(summary=self.chat_memory.store.summary, new_lines=new_lines)
+
+    @staticmethod
+    def _text(result: Any) -> str:
+        return str(getattr(result, "content", result)).replace("</s>", "").strip()
+
+    async def _asummarize(self) -> None:
+        """Fold compacted turns into the store's summary until none are queued."""
+        store = self.chat_memory.store
+        while batch := store.next_summary_batch():
+            epoch = store.epoch
+            try:
+                # Summaries queue behind interactive requests
+                with admission_priority(Priority.BACKGROUND):
+                    result = await self.llm.ainvoke(self._summary_prompt(batch))
+                if epoch == store.epoch:
+                    store.summary = self._text(result)
+            except AdmissionRejected as e:
+                # Too busy; keep the turns for the next summarization
+                logger.info(f"Deferring conversation summary: {e}")
+                store.defer_summary(batch)
+                return
+            except Exception as e:
+                logger.error(f"Error summarizing conversation history: {e}")
+
+    def _summarize(self) -> None:
+        """Thread counterpart of _asummarize."""
+        store = self.chat_memory.store
+        while batch := store.next_summary_batch():
+            epoch = store.epoch
+            try:
+                summary = self._text(self.llm.invoke(self._summary_prompt(batch)))
+                if epoch == store.epoch:
+                    store.summary = summary
+            except Exception as e:
+                logger.error(f"Error summarizing conversation history: {e}")
+
+    async def wait_for_summary(self) -> None:
+        """Wait for any background summarization this memory started to finish."""
+        if self._task is not None:
+            await self._task
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join)
+
+    def clear(self) -> None:
+        """Clear the recent turns; the shared summary no longer applies to them."""
+        super().clear()
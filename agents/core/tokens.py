@@ -0,0 +1,45 @@
+import logging
+from functools import lru_cache
+from typing import Any, Optional
+
+logger = logging.getLogger("smolit")
+
+DEFAULT_ENCODING = "cl100k_base"
+
+@lru_cache(maxsize=None)
+def get_encoding(name: str = DEFAULT_ENCODING) -> Optional[Any]:
+    """Load a tiktoken encoding, or None if it isn't available."""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(name)
+    except Exception as e:
+        # tiktoken downloads encodings on first use, which fails offline
+        logger.warning(f"Tokenizer {name} unavailable, estimating token counts: {e}")
+        return None
+
+def count_tokens(text: str, encoding_name: str = DEFAULT_ENCODING) -> int:
+    """Count the tokens in text, estimating ~4 characters per token without tiktoken."""
+    encoding = get_encoding(encoding_name)
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+def encoding_for_model(model: Optional[str]) -> str:
+    """Get the tiktoken encoding name for a model, defaulting for unknown (e.g. llama) models."""
+    if model:
+        try:
+            from tiktoken.model import encoding_name_for_model
+            return encoding_name_for_model(model)
+        except Exception:
+            pass
+    return DEFAULT_ENCODING
+
+def truncate_tokens(text: str, max_tokens: int, encoding_name: str = DEFAULT_ENCODING) -> str:
+    """Cut text down to at most max_tokens tokens."""
+    if max_tokens <= 0:
+        return ""
+    encoding = get_encoding(encoding_name)
+    if encoding is None:
+        return text[:max_tokens * 4]
+    tokens = encoding.encode(text, disallowed_special=())
+    return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
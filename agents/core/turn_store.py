@@ -0,0 +1,219 @@
+import threading
+import weakref
+from typing import Iterable, List, Optional, Sequence
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from .tokens import count_tokens
+
+# Rough per-message cost of the "Human: "/"AI: " prefix and separator
+MESSAGE_OVERHEAD_TOKENS = 3
+
+class Turn:
+    """One message in the conversation log."""
+
+    __slots__ = ("seq", "agent", "role", "content", "tokens")
+
+    def __init__(self, seq: int, agent: str, role: str, content: str):
+        self.seq = seq
+        self.agent = agent
+        self.role = role  # 'human' or 'ai'
+        self.content = content
+        self.tokens = count_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+
+    def to_message(self) -> BaseMessage:
+        if self.role == "human":
+            return HumanMessage(content=self.content)
+        return AIMessage(content=self.content)
+
+class TurnStore:
+    """Append-only conversation log shared by all agents.
+
+    Each message is stored once; agents read it through TurnStoreHistory
+    views. A user message handed from one agent to the next is recorded only
+    the first time. compact() drops turns no view can see any more, and the
+    oldest turns once the log holds more than `max_tokens`; those are folded
+    into one `summary` shared by every view.
+    """
+
+    def __init__(self, max_tokens: Optional[int] = None):
+        self._turns: List[Turn] = []
+        self._base_seq = 0  # seq of self._turns[0]
+        self._views: "weakref.WeakSet[TurnStoreHistory]" = weakref.WeakSet()
+        self._lock = threading.RLock()
+        self.max_tokens = max_tokens
+        # Once over max_tokens, drop down to this fraction of it
+        self.low_water_ratio = 0.75
+        # Summary of the turns before first_seq, kept if some reader summarizes
+        self.summarized = False
+        self.summary = ""
+        # Bumped when the summary is reset, so a summary in flight is discarded
+        self.epoch = 0
+        self._unsummarized: List[Turn] = []
+        self._summarizing = False
+
+    @classmethod
+    def from_turns(cls, turns: Iterable[Sequence[str]], first_seq: int = 0,
+                   summary: str = "") -> "TurnStore":
+        """Rebuild a store from (agent, role, content) triples starting at `first_seq`."""
+        store = cls()
+        store._base_seq = first_seq
+        store.summary = summary
+        for agent, role, content in turns:
+            store._turns.append(Turn(store.next_seq, agent, role, content))
+        return store
+
+    @property
+    def first_seq(self) -> int:
+        return self._base_seq
+
+    @property
+    def next_seq(self) -> int:
+        return self._base_seq + len(self._turns)
+
+    def append(self, agent: str, role: str, content: str) -> Turn:
+        """Record a message, reusing a user message another agent already recorded."""
+        with self._lock:
+            if role == "human":
+                for turn in reversed(self._turns):
+                    if turn.agent == agent:
+                        break
+                    if turn.role == "human":
+                        if turn.content == content:
+                            return turn
+                        break
+            turn = Turn(self.next_seq, agent, role, content)
+            self._turns.append(turn)
+            return turn
+
+    def since(self, seq: int) -> List[Turn]:
+        """Get the turns from `seq` on."""
+        with self._lock:
+            return self._turns[max(seq - self._base_seq, 0):]
+
+    def view(self, agent: str, hidden_agents: Iterable[str] = ()) -> "TurnStoreHistory":
+        """Create a message history view for an agent."""
+        return TurnStoreHistory(self, agent, hidden_agents)
+
+    def register(self, view: "TurnStoreHistory") -> None:
+        with self._lock:
+            self._views.add(view)
+
+    def require(self, tokens: int) -> None:
+        """Retain at least `tokens` worth of recent turns (a reader's budget)."""
+        with self._lock:
+            self.max_tokens = max(self.max_tokens or 0, tokens)
+
+    def compact(self) -> None:
+        """Drop turns before every view's window, then the oldest over max_tokens.
+
+        Turns every view has moved past are discarded, and with them the
+        summary, which no view sees any more. Turns dropped to stay within
+        max_tokens are moved past in every view, idle ones included, and
+        queued for the summary if it is kept (see claim_summarizer).
+        """
+        with self._lock:
+            views = list(self._views)
+            if not views:
+                return
+            keep_from = min(view.start for view in views)
+            if keep_from > self._base_seq:
+                del self._turns[:keep_from - self._base_seq]
+                self._base_seq = keep_from
+                self.summary = ""
+                self._unsummarized = []
+                self.epoch += 1
+
+            if self.max_tokens is None:
+                return
+            total = sum(turn.tokens for turn in self._turns)
+            if total <= self.max_tokens:
+                return
+            drop = 0
+            while drop < len(self._turns) and total > self.max_tokens * self.low_water_ratio:
+                total -= self._turns[drop].tokens
+                drop += 1
+            if self.summarized:
+                self._unsummarized.extend(self._turns[:drop])
+            del self._turns[:drop]
+            self._base_seq += drop
+            for view in views:
+                view.start = max(view.start, self._base_seq)
+
+    def claim_summarizer(self) -> bool:
+        """Whether the caller should start folding queued turns into the summary.
+
+        One summarizer runs per store at a time; turns queued while it runs
+        are picked up when it loops (see next_summary_batch).
+        """
+        with self._lock:
+            if self._summarizing or not self._unsummarized:
+                return False
+            self._summarizing = True
+            return True
+
+    def next_summary_batch(self) -> List[Turn]:
+        """Take the queued turns, ending the summarizer if there are none."""
+        with self._lock:
+            batch, self._unsummarized = self._unsummarized, []
+            if not batch:
+                self._summarizing = False
+            return batch
+
+    def defer_summary(self, batch: List[Turn]) -> None:
+        """Put back turns that couldn't be summarized yet and end the summarizer."""
+        with self._lock:
+            self._unsummarized = batch + self._unsummarized
+            self._summarizing = False
+
+    def __len__(self) -> int:
+        return len(self._turns)
+
+class TurnStoreHistory(BaseChatMessageHistory):
+    """One agent's window onto a TurnStore.
+
+    The view sees every user message and the replies of all agents except
+    `hidden_agents`. Its window starts at `start`; dropping messages from the
+    window or clearing it never touches other agents' views. Turns before
+    the window are covered by the store's summary unless the view has been
+    cleared since.
+    """
+
+    def __init__(self, store: Optional[TurnStore] = None, agent: str = "agent",
+                 hidden_agents: Iterable[str] = ()):
+        self.store = store if store is not None else TurnStore()
+        self.agent = agent
+        self.hidden_agents = frozenset(hidden_agents)
+        # New views (e.g. lazily built experts) see the retained history
+        self.start = self.store.first_seq
+        self.store.register(self)
+
+    def window(self) -> List[Turn]:
+        """Get the turns visible to this agent."""
+        return [
+            turn for turn in self.store.since(self.start)
+            if turn.role == "human" or turn.agent not in self.hidden_agents
+        ]
+
+    @property
+    def summary(self) -> str:
+        """The shared summary of the turns before this window, if it wants one."""
+        return self.store.summary if self.start <= self.store.first_seq else ""
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        return [turn.to_message() for turn in self.window()]
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        for message in messages:
+            role = "human" if isinstance(message, HumanMessage) else "ai"
+            self.store.append(self.agent, role, str(message.content))
+
+    def drop_oldest(self, turns: List[Turn]) -> None:
+        """Move the window past the given (oldest) turns."""
+        if turns:
+            self.start = max(self.start, turns[-1].seq + 1)
+            self.store.compact()
+
+    def clear(self) -> None:
+        self.start = self.store.next_seq
+        self.store.compact()
@@ -1,15 +1,16 @@
 import subprocess
 from typing import Optional, Dict, Any
 from langchain.llms.base import BaseLLM
+from langchain_core.memory import BaseMemory
 from langchain.prompts import PromptTemplate
 from langchain.chains import LLMChain
 from ..core.base_agent import BaseAgent
 from ..tools.command_executor import CommandExecutor
 
 class CommandExecutionAgent(BaseAgent):
-    def __init__(self, llm: BaseLLM):
+    def __init__(self, llm: BaseLLM, memory: Optional[BaseMemory] = None):
         """Initialize the command execution agent."""
-        super().__init__(llm)
+        super().__init__(llm, memory)
         self.executor = CommandExecutor()
         self._initialize_chain()
 
@@ -17,14 +18,10 @@ class CommandExecutionAgent(BaseAgent):
         """Initialize the command execution chain."""
         prompt = PromptTemplate(
             input_variables=["input", "history", "allowed_commands"],
+            # Static instructions (the allowed commands never change), then
+            # history, then the request
             template="""
-            Based on the conversation history:
-            {history}
-            
-            Allowed commands: {allowed_commands}
-            
-            Human: {input}
-            Assistant: Let me help you execute that command safely.
+            You are a command execution expert. For each request:
             
             1. Command Analysis:
             - Validate if the command is allowed
@@ -34,6 +31,14 @@ class CommandExecutionAgent(BaseAgent):
             2. Execution Plan:
             - Prepare command with proper arguments
             - Consider error handling
+
+            Allowed commands: {allowed_commands}
+
+            Conversation history:
+            {history}
+            
+            Human: {input}
+            Assistant: Let me help you execute that command safely.
             """
         )
         self.chain = LLMChain(
@@ -53,14 +58,18 @@ class CommandExecutionAgent(BaseAgent):
                 "command": command
             }
 
+    async def _prepare_inputs(self, user_input: str) -> Dict[str, Any]:
+        """Build the command chain inputs."""
+        return {
+            "input": user_input,
+            "allowed_commands": str(self.executor.get_allowed_commands())
+        }
+
     async def process(self, user_input: str) -> str:
         """Process user input and execute command if valid."""
         try:
             # Get chain's analysis
-            response = await self.chain.arun(
-                input=user_input,
-                allowed_commands=str(self.executor.get_allowed_commands())
-            )
+            response = await self.chain.arun(**await self._prepare_inputs(user_input))
             
             # TODO: Implement proper command extraction from chain response
             # For now, just return the analysis
@@ -1,29 +1,42 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import asyncio
 from langchain.llms.base import BaseLLM
+from langchain_core.memory import BaseMemory
 from langchain.prompts import PromptTemplate
 from langchain.chains import LLMChain
 from langchain_community.vectorstores import Chroma
 from langchain_community.embeddings import OpenAIEmbeddings
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from ..core.base_agent import BaseAgent
 from ..tools.knowledge_base import KnowledgeBase
 
 class RAGAgent(BaseAgent):
-    def __init__(self, llm: BaseLLM, knowledge_base_path: str = "./knowledge"):
+    def __init__(self, llm: BaseLLM, knowledge_base_path: str = "./knowledge",
+                 memory: Optional[BaseMemory] = None, embedding_backend: str = "openai",
+                 embedding_options: Optional[Dict[str, Any]] = None):
         """Initialize the RAG agent."""
-        super().__init__(llm)
-        self.knowledge_base = KnowledgeBase(knowledge_base_path)
+        super().__init__(llm, memory)
+        self.knowledge_base = KnowledgeBase(
+            knowledge_base_path,
+            embedding_backend=embedding_backend,
+            embedding_options=embedding_options
+        )
+        # Retrievals started before routing picked this expert, by input
+        self._speculative: Dict[str, asyncio.Task] = {}
+        self.speculation_stats = {"started": 0, "used": 0, "discarded": 0}
         self._initialize_chain()
 
     def _initialize_chain(self) -> None:
         """Initialize the RAG chain."""
         prompt = PromptTemplate(
             input_variables=["input", "history", "context"],
+            # Static instructions, then history, then per-request context
             template="""
-            Based on the conversation history:
+            You are a knowledge base expert. Answer using the relevant context where it helps.
+
+            Conversation history:
             {history}
             
-            And the following relevant context:
+            Relevant context:
             {context}
             
             Human: {input}
@@ -37,39 +50,85 @@ class RAGAgent(BaseAgent):
             verbose=True
         )
 
-    async def add_documents(self, documents: List[str]) -> List[str]:
-        """Add new documents to the knowledge base."""
+    async def add_documents(self, documents: List[str], batch_size: Optional[int] = None) -> List[str]:
+        """Add new documents to the knowledge base, embedding and storing them in batches."""
         try:
-            doc_ids = []
-            for doc in documents:
-                doc_id = await self.knowledge_base.add_document(doc)
-                doc_ids.append(doc_id)
-            return doc_ids
+            return await self.knowledge_base.add_documents(documents, batch_size)
         except Exception as e:
             print(f"Error adding documents: {e}")
             return []
 
+    async def add_files(self, paths: List[str], chunk_size: int = 1000,
+                        chunk_overlap: int = 200) -> Dict[str, Any]:
+        """Add text files to the knowledge base as overlapping chunks."""
+        try:
+            return await self.knowledge_base.ingest_files(paths, chunk_size, chunk_overlap)
+        except Exception as e:
+            return {"error": f"Error adding files: {str(e)}"}
+
+    def speculate(self, user_input: str) -> None:
+        """Start retrieving documents for a request that may be routed here."""
+        if user_input in self._speculative:
+            return
+        self._speculative[user_input] = asyncio.ensure_future(
+            self.knowledge_base.query(user_input, n_results=3)
+        )
+        self.speculation_stats["started"] += 1
+
+    def discard_speculation(self, user_input: str) -> None:
+        """Drop a speculative retrieval that turned out not to be needed."""
+        task = self._speculative.pop(user_input, None)
+        if task is not None:
+            task.cancel()
+            self.speculation_stats["discarded"] += 1
+
+    def get_speculation_stats(self) -> Dict[str, Any]:
+        """Get how often speculative retrievals were used."""
+        started = self.speculation_stats["started"]
+        return {
+            **self.speculation_stats,
+            "use_rate": self.speculation_stats["used"] / started if started else 0.0
+        }
+
+    async def _retrieve(self, user_input: str) -> List[Dict[str, Any]]:
+        """Get relevant documents, reusing a speculative retrieval if one exists."""
+        task = self._speculative.pop(user_input, None)
+        if task is not None:
+            self.speculation_stats["used"] += 1
+            return await task
+        return await self.knowledge_base.query(user_input, n_results=3)
+
+    async def _prepare_inputs(self, user_input: str) -> Dict[str, Any]:
+        """Retrieve relevant documents and build the RAG chain inputs."""
+        # Retrieve relevant documents
+        docs = await self._retrieve(user_input)
+        
+        # Format context from retrieved documents, keeping the closest
+        # matches that fit in the context window
+        chunks = [
+            f"Document {i+1}:\n{doc['content']}"
+            for i, doc in enumerate(docs)
+            if 'error' not in doc
+        ]
+        context = self.context_budget.fit(
+            "knowledge",
+            self._budget_parts(user_input),
+            chunks,
+            scores=[-i for i in range(len(chunks))]
+        )
+        
+        if not context:
+            context = "No relevant information found in knowledge base."
+
+        return {"input": user_input, "context": context}
+
     async def process(self, user_input: str) -> str:
         """Process user input using RAG."""
         try:
-            # Retrieve relevant documents
-            docs = await self.knowledge_base.query(user_input, n_results=3)
-            
-            # Format context from retrieved documents
-            context = "\n".join(
-                f"Document {i+1}:\n{doc['content']}"
-                for i, doc in enumerate(docs)
-                if 'error' not in doc
-            )
-            
-            if not context:
-                context = "No relevant information found in knowledge base."
+            inputs = await self._prepare_inputs(user_input)
             
             # Generate response using retrieved context
-            response = await self.chain.arun(
-                input=user_input,
-                context=context
-            )
+            response = await self.chain.arun(**inputs)
             
             return response
             
@@ -1,14 +1,16 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from langchain.llms.base import BaseLLM
+from langchain_core.memory import BaseMemory
 from langchain.prompts import PromptTemplate
 from langchain.chains import LLMChain
 from ..core.base_agent import BaseAgent
+from ..core.router import URL_PATTERN, find_url
 from ..tools.web_browser import WebBrowser
 
 class WebAgent(BaseAgent):
-    def __init__(self, llm: BaseLLM):
+    def __init__(self, llm: BaseLLM, memory: Optional[BaseMemory] = None):
         """Initialize the web browsing agent."""
-        super().__init__(llm)
+        super().__init__(llm, memory)
         self.browser = WebBrowser()
         self._initialize_chain()
 
@@ -16,15 +18,9 @@ class WebAgent(BaseAgent):
         """Initialize the web browsing chain."""
         prompt = PromptTemplate(
             input_variables=["input", "history", "web_content"],
+            # Static instructions, then history, then per-request content
             template="""
-            Based on the conversation history:
-            {history}
-            
-            And the following web content:
-            {web_content}
-            
-            Human: {input}
-            Assistant: Let me help you with that web content.
+            You are a web browsing expert. For each request:
             
             1. Content Analysis:
             - Extract key information
@@ -35,6 +31,15 @@ class WebAgent(BaseAgent):
             - Provide clear summary
             - Answer specific questions
             - Suggest related information
+
+            Conversation history:
+            {history}
+            
+            Web content:
+            {web_content}
+            
+            Human: {input}
+            Assistant: Let me help you with that web content.
             """
         )
         self.chain = LLMChain(
@@ -44,21 +49,43 @@ class WebAgent(BaseAgent):
             verbose=True
         )
 
+    async def _prepare_inputs(self, user_input: str) -> Dict[str, Any]:
+        """Fetch web content for the request and build the chain inputs."""
+        # Browse a URL anywhere in the request, e.g. "summarize https://..."
+        url = find_url(user_input)
+        if url:
+            web_result = await self.browser.browse(url)
+        else:
+            # Treat as search query
+            web_result = await self.browser.search(user_input)
+
+        return {"input": user_input, "web_content": self._fit_web_content(user_input, web_result)}
+
+    def _fit_web_content(self, user_input: str, web_result: Dict[str, Any]) -> str:
+        """Keep the page lines most relevant to the request that fit the context window."""
+        if 'content' not in web_result:
+            return str(web_result)
+        header = f"Title: {web_result.get('title', '')}\nURL: {web_result.get('url', '')}"
+        lines = [line for line in web_result['content'].split('\n') if line.strip()]
+        # The URL says nothing about relevance; a bare one keeps the page in order
+        query = URL_PATTERN.sub("", user_input).strip()
+        scores = [self.context_budget.relevance(line, query) for line in lines]
+        links = web_result.get('links') or []
+        if links:
+            # Links only fill whatever space the page text leaves
+            lines.append("Links:\n" + "\n".join(f"- {link['text']}: {link['url']}" for link in links))
+            scores.append(-1.0)
+        parts = {**self._budget_parts(user_input), "header": header}
+        body = self.context_budget.fit("web", parts, lines, scores=scores)
+        return f"{header}\n{body}"
+
     async def process(self, user_input: str) -> str:
         """Process user input using web browsing capabilities."""
         try:
-            # Check if input is a URL
-            if user_input.startswith(('http://', 'https://')):
-                web_result = await self.browser.browse(user_input)
-            else:
-                # Treat as search query
-                web_result = await self.browser.search(user_input)
+            inputs = await self._prepare_inputs(user_input)
             
             # Generate response using chain
-            response = await self.chain.arun(
-                input=user_input,
-                web_content=str(web_result)
-            )
+            response = await self.chain.arun(**inputs)
             
             return response
             
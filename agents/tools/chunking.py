@@ -0,0 +1,96 @@
+import os
+import asyncio
+from collections import deque
+from concurrent.futures import Executor
+from typing import Any, AsyncIterator, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Characters read from a file at a time; at most a few segments per file are
+# in memory at once, however large the file is
+SEGMENT_SIZE = 1 << 20
+
+# Split points tried, best first, when ending a segment
+_BOUNDARIES = ("\n\n", "\n", " ")
+
+def file_fingerprint(path: str) -> str:
+    """Identify a file's current version by its size and modification time."""
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+def read_segments(path: str, segment_size: int = SEGMENT_SIZE, overlap: int = 0) -> Iterator[Tuple[int, str]]:
+    """Read a text file incrementally as (character offset, text) segments.
+
+    Segments end at a paragraph, line or word break where possible, and each
+    one repeats the last `overlap` characters of the previous one, so chunks
+    spanning a segment boundary are not lost.
+    """
+    offset = 0
+    carry = ""
+    fresh = 0  # characters at the end of carry not yet yielded
+    with open(path, "r", encoding="utf-8", errors="replace", newline="") as f:
+        while True:
+            data = f.read(segment_size)
+            if not data:
+                if fresh and carry[-fresh:].strip():
+                    yield offset, carry
+                return
+            text = carry + data
+            cut = len(text)
+            for boundary in _BOUNDARIES:
+                position = text.rfind(boundary, len(text) // 2)
+                if position > overlap:
+                    cut = position + len(boundary)
+                    break
+            yield offset, text[:cut]
+            carry = text[cut - overlap:]
+            fresh = len(text) - cut
+            offset += cut - overlap
+
+def chunk_segment(text: str, offset: int, chunk_size: int, chunk_overlap: int) -> List[Tuple[str, int]]:
+    """Split a segment into (chunk, file offset) pairs; runs in a worker process."""
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        add_start_index=True
+    )
+    return [
+        (document.page_content, offset + document.metadata["start_index"])
+        for document in splitter.create_documents([text])
+    ]
+
+async def iter_file_chunks(
+    paths: Iterable[str],
+    chunk_size: int = 1000,
+    chunk_overlap: int = 200,
+    executor: Optional[Executor] = None,
+    max_pending: int = 4,
+    segment_size: int = SEGMENT_SIZE
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """Yield (chunk, metadata) pairs for files, splitting segments in `executor`.
+
+    Up to `max_pending` segments are split in parallel; the next one is only
+    read once the caller has taken the chunks of the oldest, which bounds
+    memory. Metadata records the source file, the chunk's character offset
+    in it and its index.
+    """
+    loop = asyncio.get_running_loop()
+    segment_size = max(segment_size, chunk_size * 4, chunk_overlap * 4)
+    for path in paths:
+        pending: Deque[asyncio.Future] = deque()
+        index = 0
+        segments = read_segments(path, segment_size, chunk_overlap)
+        while True:
+            while len(pending) < max_pending:
+                # Reading a segment is blocking file I/O; keep it off the loop
+                segment = await asyncio.to_thread(next, segments, None)
+                if segment is None:
+                    break
+                offset, text = segment
+                pending.append(loop.run_in_executor(
+                    executor, chunk_segment, text, offset, chunk_size, chunk_overlap
+                ))
+            if not pending:
+                break
+            for content, offset in await pending.popleft():
+                yield content, {"source": path, "offset": offset, "chunk": index}
+                index += 1
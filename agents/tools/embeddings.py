@@ -0,0 +1,294 @@
+import os
+import re
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from chromadb.api.types import EmbeddingFunction
+
+logger = logging.getLogger("smolit")
+
+# Dimensions of the dependency-free hashing embeddings
+HASHING_DIMENSIONS = 384
+
+_WORDS = re.compile(r"\w+", re.UNICODE)
+
+class HashingEmbeddingFunction(EmbeddingFunction):
+    """Embed text by feature hashing its words and word pairs.
+
+    Runs in-process with nothing to download. Vectors are L2-normalized and
+    the same in every process; similarity is lexical rather than semantic,
+    so this suits offline use and tests better than a real model.
+    """
+
+    def __init__(self, dimensions: int = HASHING_DIMENSIONS):
+        self.dimensions = dimensions
+
+    def _features(self, text: str) -> List[str]:
+        words = [word.lower() for word in _WORDS.findall(text)]
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def __call__(self, input: Sequence[str]) -> List[np.ndarray]:
+        vectors = []
+        for text in input:
+            vector = np.zeros(self.dimensions, dtype=np.float32)
+            for feature in self._features(text):
+                digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+                value = int.from_bytes(digest, "little")
+                vector[value % self.dimensions] += 1.0 if value >> 63 else -1.0
+            norm = np.linalg.norm(vector)
+            vectors.append(vector / norm if norm else vector)
+        return vectors
+
+def _local_model(model_name: str, device: str) -> EmbeddingFunction:
+    """Load a sentence-transformers model, or Chroma's bundled ONNX MiniLM."""
+    from chromadb.utils import embedding_functions
+    try:
+        return embedding_functions.SentenceTransformerEmbeddingFunction(
+            model_name=model_name, device=device, normalize_embeddings=True
+        )
+    except (ImportError, ValueError):
+        # onnxruntime ships with chromadb; the model is downloaded once
+        logger.info("sentence-transformers not installed, using ONNX all-MiniLM-L6-v2")
+        return embedding_functions.ONNXMiniLM_L6_V2(preferred_providers=["CPUExecutionProvider"])
+
+def create_embedding_function(
+    backend: str = "openai",
+    cache_directory: Optional[str] = None,
+    **options: Any
+) -> EmbeddingFunction:
+    """Create an embedding function for a backend, optionally cached on disk.
+
+    Backends:
+        "openai": an OpenAI-compatible /v1/embeddings server (default: LM
+            Studio); options api_key, api_base and model_name.
+        "local": an in-process CPU model; options model_name and device.
+        "hashing": feature hashing, no model needed; option dimensions.
+
+    With a `cache_directory`, vectors are kept in an EmbeddingCache there and
+    each text is only embedded once per model.
+    """
+    if backend == "openai":
+        from chromadb.utils import embedding_functions
+        api_base = options.get("api_base", "http://localhost:1234/v1")
+        model_name = options.get("model_name", "text-embedding-ada-002")
+        function = embedding_functions.OpenAIEmbeddingFunction(
+            api_key=options.get("api_key", "lm_studio"),
+            api_base=api_base,
+            model_name=model_name
+        )
+        # The same model name can mean different models on different servers
+        model = f"openai:{api_base}:{model_name}"
+    elif backend == "local":
+        model_name = options.get("model_name", "all-MiniLM-L6-v2")
+        function = _local_model(model_name, options.get("device", "cpu"))
+        model = f"local:{model_name}"
+    elif backend == "hashing":
+        dimensions = options.get("dimensions", HASHING_DIMENSIONS)
+        function = HashingEmbeddingFunction(dimensions)
+        model = f"hashing:{dimensions}"
+    else:
+        raise ValueError(f"Unknown embedding backend: {backend}")
+
+    if cache_directory:
+        return CachedEmbeddingFunction(function, EmbeddingCache(cache_directory, model))
+    return function
+
+class EmbeddingCache:
+    """Persistent embeddings for one model, keyed by content hash.
+
+    Vectors are rows of a memory-mapped .npy file, so looking them up only
+    pages in the rows needed; a SQLite index maps the sha256 of each text
+    (and the model) to its row. The file doubles in size when full.
+
+    Several caches (in one process or several) may share a directory: rows
+    are allocated in a SQLite write transaction, and a cache maps the file
+    again once another one has grown it.
+    """
+
+    def __init__(self, directory: str, model: str, initial_capacity: int = 1024):
+        self.directory = directory
+        self.model = model
+        self.initial_capacity = initial_capacity
+        os.makedirs(directory, exist_ok=True)
+        name = re.sub(r"[^A-Za-z0-9._-]+", "_", model)
+        self.path = os.path.join(directory, f"{name}-{hashlib.sha256(model.encode()).hexdigest()[:8]}.npy")
+        self._lock = threading.Lock()
+        # Autocommit; writes take the database lock with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(
+            os.path.join(directory, "index.db"),
+            timeout=30.0,
+            isolation_level=None,
+            check_same_thread=False
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, key TEXT NOT NULL, row INTEGER NOT NULL, "
+            "PRIMARY KEY (model, key))"
+        )
+        self._vectors: Optional[np.memmap] = None
+        # (inode, size) of the file self._vectors maps
+        self._mapped: Optional[tuple] = None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(text: str) -> str:
+        """Hash a text's exact content; any change needs a new embedding."""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    @property
+    def size(self) -> int:
+        """Number of vectors stored for this model."""
+        with self._lock:
+            return self._next_row()
+
+    def _next_row(self) -> int:
+        return self._conn.execute(
+            "SELECT COALESCE(MAX(row) + 1, 0) FROM embeddings WHERE model = ?", (self.model,)
+        ).fetchone()[0]
+
+    def _rows(self, keys: Sequence[str]) -> Dict[str, int]:
+        """Look up the rows of the given keys that are stored."""
+        rows: Dict[str, int] = {}
+        unique = list(dict.fromkeys(keys))
+        # Stay under SQLite's limit on query parameters
+        for start in range(0, len(unique), 500):
+            chunk = unique[start:start + 500]
+            rows.update(self._conn.execute(
+                f"SELECT key, row FROM embeddings WHERE model = ? "
+                f"AND key IN ({','.join('?' * len(chunk))})",
+                [self.model, *chunk]
+            ).fetchall())
+        return rows
+
+    def _sync(self) -> Optional[np.memmap]:
+        """Map the vector file again if another cache replaced or grew it."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._vectors = self._mapped = None
+            return None
+        if self._mapped != (stat.st_ino, stat.st_size):
+            self._vectors = np.load(self.path, mmap_mode="r+")
+            self._mapped = (stat.st_ino, stat.st_size)
+        return self._vectors
+
+    def get(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Get the cached vector for each text, or None where there is none."""
+        keys = [self.key(text) for text in texts]
+        with self._lock:
+            rows = self._rows(keys)
+            # Only after reading the index: a row it lists is in the file now
+            matrix = self._sync() if rows else self._vectors
+            vectors = [
+                np.array(matrix[rows[key]]) if key in rows and matrix is not None else None
+                for key in keys
+            ]
+            found = sum(vector is not None for vector in vectors)
+            self.hits += found
+            self.misses += len(vectors) - found
+            return vectors
+
+    def _reserve(self, size: int, rows: int, dimensions: int) -> np.memmap:
+        """Make room for `rows` vectors after the first `size`, growing the file if needed.
+
+        Called with the database write lock held, so no other cache grows
+        the file at the same time.
+        """
+        matrix = self._sync()
+        if matrix is None:
+            capacity = max(self.initial_capacity, rows)
+            matrix = np.lib.format.open_memmap(
+                self.path, mode="w+", dtype=np.float32, shape=(capacity, dimensions)
+            )
+        elif matrix.shape[1] != dimensions:
+            raise ValueError(
+                f"Embedding cache {self.path} holds {matrix.shape[1]}-dimensional "
+                f"vectors, got {dimensions}"
+            )
+        elif size + rows > matrix.shape[0]:
+            capacity = matrix.shape[0]
+            while capacity < size + rows:
+                capacity *= 2
+            temp_path = f"{self.path}.tmp.npy"
+            grown = np.lib.format.open_memmap(
+                temp_path, mode="w+", dtype=np.float32, shape=(capacity, dimensions)
+            )
+            grown[:size] = matrix[:size]
+            grown.flush()
+            del grown
+            self._vectors = matrix = None
+            os.replace(temp_path, self.path)
+        else:
+            return matrix
+        self._vectors = self._mapped = None
+        return self._sync()
+
+    def put(self, texts: Sequence[str], vectors: Sequence[Any]) -> None:
+        """Store vectors for texts not cached yet."""
+        pending: Dict[str, np.ndarray] = {}
+        for text, vector in zip(texts, vectors):
+            pending.setdefault(self.key(text), np.asarray(vector, dtype=np.float32))
+        if not pending:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Checked again under the lock; another cache may have added them
+                stored = self._rows(list(pending))
+                new = [(key, vector) for key, vector in pending.items() if key not in stored]
+                if new:
+                    start = self._next_row()
+                    matrix = self._reserve(start, len(new), new[0][1].shape[0])
+                    matrix[start:start + len(new)] = np.stack([vector for _, vector in new])
+                    # Vectors reach the file before the index points at them
+                    matrix.flush()
+                    self._conn.executemany(
+                        "INSERT INTO embeddings (model, key, row) VALUES (?, ?, ?)",
+                        [(self.model, key, start + i) for i, (key, _) in enumerate(new)]
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the model, stored vectors and hit rate."""
+        lookups = self.hits + self.misses
+        return {
+            "model": self.model,
+            "vectors": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+    def close(self) -> None:
+        """Flush the vectors and close the index."""
+        with self._lock:
+            if self._vectors is not None:
+                self._vectors.flush()
+                self._vectors = self._mapped = None
+            self._conn.close()
+
+class CachedEmbeddingFunction(EmbeddingFunction):
+    """Embedding function that only embeds texts missing from an EmbeddingCache."""
+
+    def __init__(self, function: EmbeddingFunction, cache: EmbeddingCache):
+        self.function = function
+        self.cache = cache
+
+    def __call__(self, input: Sequence[str]) -> List[np.ndarray]:
+        texts = list(input)
+        vectors = self.cache.get(texts)
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+        if missing:
+            computed = dict(zip(missing, (
+                np.asarray(vector, dtype=np.float32) for vector in self.function(missing)
+            )))
+            self.cache.put(missing, list(computed.values()))
+            vectors = [computed[text] if vector is None else vector for text, vector in zip(texts, vectors)]
+        return vectors
@@ -0,0 +1,64 @@
+import os
+import json
+import time
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger("smolit")
+
+class IngestManifest:
+    """Record of which documents each ingested source produced.
+
+    Kept as JSON next to the knowledge base. When a source is ingested
+    again, the documents it no longer produces (its old, changed content)
+    can be found and removed.
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.sources: Dict[str, Dict[str, Any]] = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    self.sources = json.load(f).get("sources", {})
+            except (OSError, ValueError) as e:
+                logger.error(f"Error loading ingest manifest {path}: {e}")
+
+    def ids(self, source: str) -> List[str]:
+        """Get the document IDs a source produced when last ingested."""
+        return self.sources.get(source, {}).get("ids", [])
+
+    def get(self, source: str) -> Optional[Dict[str, Any]]:
+        """Get everything recorded about a source."""
+        return self.sources.get(source)
+
+    def record(self, source: str, ids: Iterable[str], **info: Any) -> None:
+        """Record the documents a source produced, with optional extra info."""
+        self.sources[source] = {"ids": list(dict.fromkeys(ids)), "updated": time.time(), **info}
+
+    def referenced(self, exclude: Iterable[str] = ()) -> Set[str]:
+        """Get the IDs produced by any source other than `exclude`."""
+        excluded = set(exclude)
+        return {
+            doc_id
+            for source, entry in self.sources.items() if source not in excluded
+            for doc_id in entry.get("ids", [])
+        }
+
+    def save(self) -> None:
+        """Write the manifest, replacing the old file atomically."""
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"sources": self.sources}, f)
+        os.replace(temp_path, self.path)
+
+    def __contains__(self, source: str) -> bool:
+        return source in self.sources
+
+    def __len__(self) -> int:
+        return len(self.sources)
@@ -1,54 +1,328 @@
 import os
-from typing import List, Dict, Any, Optional
+import time
+import asyncio
+import hashlib
+import logging
+import unicodedata
+from typing import List, Dict, Any, Optional, Callable, Iterable, AsyncIterable, AsyncIterator, Set, Tuple, Union
 from chromadb import Client, Settings
 from chromadb.utils import embedding_functions
 import json
+from concurrent.futures import ProcessPoolExecutor
+from .chunking import file_fingerprint, iter_file_chunks
+from .embeddings import CachedEmbeddingFunction, create_embedding_function
+from .ingest_manifest import IngestManifest
+
+logger = logging.getLogger("smolit")
+
+async def _aiter(items: Iterable[Any]) -> AsyncIterator[Any]:
+    for item in items:
+        yield item
+
+# A document is its text, optionally with metadata
+DocumentInput = Union[str, Tuple[str, Dict[str, Any]]]
 
 class KnowledgeBase:
-    def __init__(self, persist_directory: str = "./knowledge"):
+    def __init__(
+        self,
+        persist_directory: str = "./knowledge",
+        embedding_function: Optional[embedding_functions.EmbeddingFunction] = None,
+        batch_size: int = 64,
+        collection_name: str = "smolit_knowledge",
+        embedding_backend: str = "openai",
+        embedding_options: Optional[Dict[str, Any]] = None,
+        embedding_cache: bool = True
+    ):
+        """Initialize the knowledge base.
+
+        Without an `embedding_function`, one is created for
+        `embedding_backend` ("openai", "local" or "hashing", see
+        create_embedding_function) with `embedding_options`. Its vectors are
+        cached under persist_directory/embeddings unless `embedding_cache` is
+        False, so re-ingested documents and repeated queries are not embedded
+        again. A collection keeps the dimensions of its first embeddings;
+        changing backend needs a new collection_name.
+        """
         self.persist_directory = persist_directory
+        # Documents embedded and written per call when ingesting
+        self.batch_size = batch_size
         os.makedirs(persist_directory, exist_ok=True)
         
-        # Initialize ChromaDB client
+        # Initialize ChromaDB client; persistent so that stored documents
+        # (and their stable IDs) survive a restart
         self.client = Client(Settings(
-            persist_directory=persist_directory,
+            persist_directory=os.path.abspath(persist_directory),
+            is_persistent=True,
             anonymized_telemetry=False
         ))
         
-        # Use OpenAI embeddings
-        self.embedding_function = embedding_functions.OpenAIEmbeddingFunction(
-            api_key="lm_studio",  # Using LM Studio
-            api_base="http://localhost:1234/v1"
+        self.embedding_function = embedding_function or create_embedding_function(
+            embedding_backend,
+            cache_directory=os.path.join(persist_directory, "embeddings") if embedding_cache else None,
+            **(embedding_options or {})
         )
         
         # Create or get collection
         self.collection = self.client.get_or_create_collection(
-            name="smolit_knowledge",
+            name=collection_name,
             embedding_function=self.embedding_function
         )
 
+        # Which documents each ingested source produced
+        self.manifest = IngestManifest(os.path.join(persist_directory, f"{collection_name}.manifest.json"))
+
+        # Bumped on every change so dependent caches can invalidate
+        self.version = 0
+        self._change_listeners: List[Callable[[], None]] = []
+
+    def add_change_listener(self, callback: Callable[[], None]) -> None:
+        """Register a callback to run whenever the knowledge base changes."""
+        self._change_listeners.append(callback)
+
+    def _notify_change(self) -> None:
+        """Record a change and notify listeners."""
+        self.version += 1
+        for callback in self._change_listeners:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Error in knowledge base change listener: {e}")
+
+    @staticmethod
+    def _document_id(content: str) -> str:
+        """Generate a stable, content-addressed ID for a document."""
+        # Normalize so re-extracted text with different whitespace matches
+        normalized = " ".join(unicodedata.normalize("NFC", content).split())
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
     async def add_document(self, content: str, metadata: Optional[Dict[str, Any]] = None) -> str:
         """Add a document to the knowledge base."""
+        return (await self.add_documents([(content, metadata or {})]))[0]
+
+    async def add_documents(
+        self,
+        documents: Union[Iterable[DocumentInput], AsyncIterable[DocumentInput]],
+        batch_size: Optional[int] = None
+    ) -> List[str]:
+        """Add documents in batches; failed ones get an error message instead of an ID."""
+        return (await self.ingest(documents, batch_size))["ids"]
+
+    async def _batches(
+        self,
+        documents: Union[Iterable[DocumentInput], AsyncIterable[DocumentInput]],
+        batch_size: int
+    ) -> AsyncIterator[List[Tuple[str, Dict[str, Any]]]]:
+        """Group documents, from a plain or an async iterable, into batches."""
+        if not isinstance(documents, AsyncIterable):
+            documents = _aiter(documents)
+        batch: List[Tuple[str, Dict[str, Any]]] = []
+        async for document in documents:
+            content, metadata = (document, None) if isinstance(document, str) else document
+            batch.append((content, metadata or {}))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _new_documents(self, ids: List[str], scheduled: Set[str]) -> List[int]:
+        """Get the positions of documents neither stored nor already being added."""
+        first: Dict[str, int] = {}
+        for i, doc_id in enumerate(ids):
+            if doc_id not in scheduled:
+                first.setdefault(doc_id, i)
+        if not first:
+            return []
+        existing = set(self.collection.get(ids=list(first), include=[])["ids"])
+        return [i for doc_id, i in first.items() if doc_id not in existing]
+
+    def _write_batch(
+        self,
+        ids: List[str],
+        contents: List[str],
+        metadatas: List[Dict[str, Any]],
+        embeddings: Any
+    ) -> None:
+        """Insert an embedded batch into the collection."""
+        self.collection.add(
+            ids=ids,
+            documents=contents,
+            # Chroma rejects empty metadata dicts
+            metadatas=[metadata or None for metadata in metadatas],
+            embeddings=embeddings
+        )
+
+    async def _finish_write(self, write: Tuple[asyncio.Future, List[int], int], stats: Dict[str, Any]) -> None:
+        """Wait for a batch write, marking its documents as failed if it fails."""
+        task, positions, count = write
         try:
-            # Generate a unique ID
-            doc_id = str(hash(content))
-            
-            # Add document to collection
-            self.collection.add(
-                documents=[content],
-                metadatas=[metadata or {}],
-                ids=[doc_id]
-            )
-            
-            return doc_id
-            
+            await task
+            stats["documents"] += count
         except Exception as e:
-            return f"Error adding document: {str(e)}"
+            self._mark_failed(stats, positions, e)
+
+    @staticmethod
+    def _mark_failed(stats: Dict[str, Any], positions: List[int], error: Exception) -> None:
+        for position in positions:
+            stats["ids"][position] = f"Error adding document: {str(error)}"
+        stats["failed"] += len(positions)
+
+    async def ingest(
+        self,
+        documents: Union[Iterable[DocumentInput], AsyncIterable[DocumentInput]],
+        batch_size: Optional[int] = None,
+        source_info: Optional[Dict[str, Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """Embed and store documents in batches, overlapping the two stages.
+
+        Documents get content-addressed IDs; those already stored are
+        skipped without being embedded. Each batch of new documents is
+        embedded in one request, then written to the collection in one call;
+        the next batch is embedded while the previous one is being written.
+        Documents whose metadata names a "source" are recorded in the ingest
+        manifest, along with its `source_info`, and documents a source no
+        longer produces are removed. Returns the IDs in input order and throughput stats.
+        """
+        batch_size = batch_size or self.batch_size
+        stats: Dict[str, Any] = {"ids": [], "documents": 0, "skipped": 0, "failed": 0, "removed": 0, "batches": 0}
+        sources: Dict[str, List[int]] = {}
+        scheduled: Set[str] = set()
+        start = time.perf_counter()
+        write: Optional[Tuple[asyncio.Future, List[int], int]] = None
+        try:
+            async for batch in self._batches(documents, batch_size):
+                stats["batches"] += 1
+                offset = len(stats["ids"])
+                ids = [self._document_id(content) for content, _ in batch]
+                stats["ids"].extend(ids)
+                for i, (_, metadata) in enumerate(batch):
+                    if "source" in metadata:
+                        sources.setdefault(str(metadata["source"]), []).append(offset + i)
+
+                try:
+                    new = await asyncio.to_thread(self._new_documents, ids, scheduled)
+                    stats["skipped"] += len(batch) - len(new)
+                    embeddings = await asyncio.to_thread(
+                        self.embedding_function, [batch[i][0] for i in new]
+                    ) if new else []
+                except Exception as e:
+                    new, embeddings = [i for i in range(len(batch)) if ids[i] not in scheduled], e
+                # Repeats of a new document share its fate
+                new_ids = {ids[i] for i in new}
+                positions = [offset + i for i in range(len(batch)) if ids[i] in new_ids]
+                # The previous batch was written while this one was embedded
+                if write is not None:
+                    await self._finish_write(write, stats)
+                    write = None
+                if isinstance(embeddings, Exception):
+                    self._mark_failed(stats, positions, embeddings)
+                    continue
+                if not new:
+                    continue
+                scheduled.update(new_ids)
+                write = (
+                    asyncio.ensure_future(asyncio.to_thread(
+                        self._write_batch,
+                        [ids[i] for i in new],
+                        [batch[i][0] for i in new],
+                        [batch[i][1] for i in new],
+                        embeddings
+                    )),
+                    positions,
+                    len(new)
+                )
+            if write is not None:
+                await self._finish_write(write, stats)
+                write = None
+            if sources:
+                stats["removed"] = await asyncio.to_thread(
+                    self._update_manifest, sources, stats["ids"], source_info or {}
+                )
+        finally:
+            if write is not None:
+                write[0].cancel()
+            if stats["documents"] or stats["removed"]:
+                self._notify_change()
+
+        elapsed = time.perf_counter() - start
+        stats["elapsed"] = elapsed
+        stats["docs_per_second"] = stats["documents"] / elapsed if elapsed else 0.0
+        if stats["batches"]:
+            logger.info(
+                f"Ingested {stats['documents']} documents ({stats['skipped']} already stored, "
+                f"{stats['failed']} failed) in {stats['batches']} batches: "
+                f"{stats['docs_per_second']:.1f} docs/s"
+            )
+        return stats
+
+    def _update_manifest(
+        self,
+        sources: Dict[str, List[int]],
+        ids: List[str],
+        source_info: Dict[str, Dict[str, Any]]
+    ) -> int:
+        """Record each fully ingested source and remove the documents it no longer produces."""
+        removed: Set[str] = set()
+        for source, positions in sources.items():
+            source_ids = [ids[i] for i in positions]
+            if any(doc_id.startswith("Error") for doc_id in source_ids):
+                # Keep the old record so the source is retried and cleaned up later
+                continue
+            removed.update(set(self.manifest.ids(source)) - set(source_ids))
+            self.manifest.record(source, source_ids, **source_info.get(source, {}))
+        # Identical content may also belong to another source
+        removed -= self.manifest.referenced()
+        if removed:
+            self.collection.delete(ids=list(removed))
+        self.manifest.save()
+        return len(removed)
+
+    async def ingest_files(
+        self,
+        paths: Iterable[str],
+        chunk_size: int = 1000,
+        chunk_overlap: int = 200,
+        batch_size: Optional[int] = None,
+        workers: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Stream text files into the knowledge base as overlapping chunks.
+
+        Files are read a segment at a time and split in a pool of `workers`
+        processes while earlier chunks are embedded and stored, so memory
+        stays bounded however large the files are. Each chunk's metadata
+        records its source file and character offset. Files unchanged since
+        they were last ingested (same size and modification time) are
+        skipped without being read.
+        """
+        source_info: Dict[str, Dict[str, Any]] = {}
+        changed: List[str] = []
+        unchanged = 0
+        for path in paths:
+            fingerprint = file_fingerprint(path)
+            entry = self.manifest.get(path)
+            if entry is not None and entry.get("fingerprint") == fingerprint:
+                unchanged += 1
+                continue
+            source_info[path] = {"fingerprint": fingerprint}
+            changed.append(path)
+
+        if not changed:
+            # Nothing to read, so no worker processes to start
+            stats = await self.ingest([], batch_size)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                chunks = iter_file_chunks(changed, chunk_size, chunk_overlap, executor)
+                stats = await self.ingest(chunks, batch_size, source_info)
+        stats["files"] = len(changed)
+        stats["files_unchanged"] = unchanged
+        return stats
 
     async def query(self, query: str, n_results: int = 3) -> List[Dict[str, Any]]:
         """Query the knowledge base."""
         try:
-            results = self.collection.query(
+            # Run off the event loop so other work can overlap the lookup
+            results = await asyncio.to_thread(
+                self.collection.query,
                 query_texts=[query],
                 n_results=n_results
             )
@@ -58,7 +332,7 @@ class KnowledgeBase:
             for i, doc in enumerate(results['documents'][0]):
                 documents.append({
                     'content': doc,
-                    'metadata': results['metadatas'][0][i] if results['metadatas'] else {},
+                    'metadata': (results['metadatas'][0][i] or {}) if results['metadatas'] else {},
                     'distance': results['distances'][0][i] if results['distances'] else None
                 })
                 
@@ -71,6 +345,7 @@ class KnowledgeBase:
         """Delete a document from the knowledge base."""
         try:
             self.collection.delete(ids=[doc_id])
+            self._notify_change()
             return True
         except Exception:
             return False
@@ -81,8 +356,9 @@ class KnowledgeBase:
             self.collection.update(
                 ids=[doc_id],
                 documents=[content],
-                metadatas=[metadata or {}]
+                metadatas=[metadata or None]
             )
+            self._notify_change()
             return True
         except Exception:
             return False
@@ -91,10 +367,13 @@ class KnowledgeBase:
         """Get statistics about the knowledge base."""
         try:
             count = self.collection.count()
-            return {
+            stats = {
                 'document_count': count,
                 'collection_name': self.collection.name,
                 'persist_directory': self.persist_directory
             }
+            if isinstance(self.embedding_function, CachedEmbeddingFunction):
+                stats['embedding_cache'] = self.embedding_function.cache.get_stats()
+            return stats
         except Exception as e:
             return {'error': f"Error getting stats: {str(e)}"}
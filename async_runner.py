@@ -0,0 +1,92 @@
+import asyncio
+import threading
+import concurrent.futures
+from typing import Any, Awaitable, Callable, Optional
+
+
+class AsyncRunner:
+    """Run a single long-lived asyncio event loop on a worker thread."""
+
+    def __init__(self, name: str = "smolit-async"):
+        self.name = name
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+
+    @property
+    def is_running(self) -> bool:
+        """Check whether the worker loop is running."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start the worker thread and wait until its loop is ready."""
+        if self.is_running:
+            return
+        self._ready.clear()
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run(self) -> None:
+        """Thread target: run the loop until stop() is called."""
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(self._ready.set)
+        try:
+            self.loop.run_forever()
+        finally:
+            # Cancel whatever is still in flight and close the loop cleanly
+            pending = asyncio.all_tasks(self.loop)
+            for task in pending:
+                task.cancel()
+            if pending:
+                self.loop.run_until_complete(
+                    asyncio.gather(*pending, return_exceptions=True)
+                )
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+            self.loop.close()
+
+    def submit(
+        self,
+        coro: Awaitable[Any],
+        on_result: Optional[Callable[[Any], None]] = None,
+        on_error: Optional[Callable[[BaseException], None]] = None,
+    ) -> concurrent.futures.Future:
+        """Schedule a coroutine on the worker loop from any thread.
+
+        Callbacks run on the worker thread; callers that touch the UI must
+        marshal them back to their own thread.
+        """
+        if not self.is_running:
+            if asyncio.iscoroutine(coro):
+                coro.close()
+            raise RuntimeError("AsyncRunner is not running")
+
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+        if on_result or on_error:
+            def _done(fut: concurrent.futures.Future) -> None:
+                if fut.cancelled():
+                    return
+                error = fut.exception()
+                if error is not None:
+                    if on_error:
+                        on_error(error)
+                elif on_result:
+                    on_result(fut.result())
+
+            future.add_done_callback(_done)
+
+        return future
+
+    def run(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the worker loop and block for its result."""
+        return self.submit(coro).result(timeout)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the worker loop and join its thread."""
+        if not self.is_running:
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+        self._thread = None
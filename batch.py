@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""Run a batch of prompts from a JSONL file through the multi-agent system.
+
+Each input line is a JSON object with an id ("id" or "request_id") and a
+prompt ("input", "prompt" or "body"). Results are appended to the output
+JSONL as they complete, so an interrupted run picks up where it stopped
+when started again with the same output file.
+
+    python batch.py requests.jsonl -o results.jsonl --concurrency 4
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+
+from agents.core.logging_config import setup_logger
+from agents.core.scheduler import Priority
+from agents.core.tokens import count_tokens
+
+logger = setup_logger()
+
+ID_FIELDS = ("id", "request_id")
+INPUT_FIELDS = ("input", "prompt", "body")
+
+
+def load_checkpoint(output_path: str) -> Set[str]:
+    """Get the ids already answered in the output file.
+
+    A line cut off by an interrupted write is truncated away, and items that
+    failed are not counted, so they are retried.
+    """
+    done: Set[str] = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "rb+") as f:
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            f.truncate(end)
+    for line in data[:end].splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if "error" in record:
+            done.discard(record["id"])
+        else:
+            done.add(record["id"])
+    return done
+
+
+def read_items(input_path: str, skip: Set[str]) -> Iterator[Tuple[str, str]]:
+    """Stream (id, prompt) pairs from the input JSONL, skipping finished ids."""
+    with open(input_path, "r") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError as e:
+                logger.error(f"Skipping malformed line {line_number}: {e}")
+                continue
+            item_id = str(next((item[key] for key in ID_FIELDS if key in item), f"line-{line_number}"))
+            prompt = next((item[key] for key in INPUT_FIELDS if key in item), None)
+            if prompt is None:
+                logger.error(f"Skipping line {line_number}: no {'/'.join(INPUT_FIELDS)} field")
+                continue
+            if item_id not in skip:
+                yield item_id, str(prompt)
+
+
+async def run_batch(
+    system: Any,
+    input_path: str,
+    output_path: str,
+    concurrency: int = 4,
+    priority: Priority = Priority.BACKGROUND
+) -> Dict[str, Any]:
+    """Process every unfinished item with at most `concurrency` in flight."""
+    done = load_checkpoint(output_path)
+    if done:
+        logger.info(f"Resuming: {len(done)} items already done")
+
+    # A small queue keeps memory bounded however large the input is
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    stats = {"completed": 0, "failed": 0, "tokens": 0, "skipped": len(done)}
+    start = time.perf_counter()
+
+    with open(output_path, "a") as output:
+        async def worker() -> None:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                item_id, prompt = item
+                item_start = time.perf_counter()
+                # Each item gets a conversation of its own, so results don't
+                # depend on which items ran before or alongside it
+                session_id = f"batch-{item_id}"
+                try:
+                    response = await system.process_input(prompt, priority=priority, session_id=session_id)
+                except Exception as e:
+                    response = f"Error processing request: {str(e)}"
+                finally:
+                    system.drop_session(session_id)
+                record = {
+                    "id": item_id,
+                    "output": response,
+                    "latency": round(time.perf_counter() - item_start, 3)
+                }
+                if response.startswith("Error"):
+                    record["error"] = response
+                    stats["failed"] += 1
+                else:
+                    record["tokens"] = count_tokens(response)
+                    stats["tokens"] += record["tokens"]
+                    stats["completed"] += 1
+                output.write(json.dumps(record) + "\n")
+                output.flush()
+
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        try:
+            for item in read_items(input_path, done):
+                await queue.put(item)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+
+    elapsed = time.perf_counter() - start
+    processed = stats["completed"] + stats["failed"]
+    stats.update({
+        "elapsed": elapsed,
+        "requests_per_second": processed / elapsed if elapsed else 0.0,
+        "tokens_per_second": stats["tokens"] / elapsed if elapsed else 0.0
+    })
+    return stats
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="input JSONL file")
+    parser.add_argument("-o", "--output", help="output JSONL file (default: <input>.results.jsonl)")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="items in flight at once")
+    parser.add_argument("--config", default="config.json", help="endpoint configuration file")
+    args = parser.parse_args(argv)
+    output = args.output or f"{os.path.splitext(args.input)[0]}.results.jsonl"
+
+    from agents.core.config import Config
+    from agents.core.multi_agent_system import MultiAgentSystem
+    system = MultiAgentSystem.from_config(Config(config_path=args.config))
+
+    try:
+        stats = asyncio.run(run_batch(system, args.input, output, args.concurrency))
+    except KeyboardInterrupt:
+        print(f"Interrupted; rerun with the same output file to resume ({output})", file=sys.stderr)
+        return 130
+
+    print(f"completed: {stats['completed']}, failed: {stats['failed']}, "
+          f"skipped (already done): {stats['skipped']}")
+    print(f"elapsed: {stats['elapsed']:.1f} s, {stats['requests_per_second']:.2f} requests/s, "
+          f"{stats['tokens_per_second']:.1f} tokens/s")
+    print(f"results: {output}")
+    return 0 if stats["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
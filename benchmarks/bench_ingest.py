@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Compare one-document-at-a-time and batched knowledge base ingestion.
+
+Starts a local stand-in for an OpenAI-compatible /v1/embeddings server
+(a fixed cost per request plus a cost per input, like a small embedding
+model) and ingests the same synthetic corpus with batch size 1 (what
+add_documents used to do) and with batching.
+
+    python benchmarks/bench_ingest.py --documents 500 --batch-size 64
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import zlib
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from chromadb.utils import embedding_functions
+from agents.tools.knowledge_base import KnowledgeBase
+
+DIMENSIONS = 64
+
+
+async def start_stand_in_server(request_ms: float, item_ms: float) -> web.AppRunner:
+    """Start a local server that answers /v1/embeddings with deterministic vectors."""
+    async def embeddings(request: web.Request) -> web.Response:
+        payload = await request.json()
+        texts = payload["input"] if isinstance(payload["input"], list) else [payload["input"]]
+        await asyncio.sleep((request_ms + item_ms * len(texts)) / 1000)
+        data = []
+        for i, text in enumerate(texts):
+            seed = zlib.crc32(str(text).encode())
+            vector = [((seed >> (j % 24)) & 0xFF) / 255.0 for j in range(DIMENSIONS)]
+            data.append({"object": "embedding", "index": i, "embedding": vector})
+        return web.json_response({
+            "object": "list",
+            "data": data,
+            "model": payload.get("model", "stand-in"),
+            "usage": {"prompt_tokens": 0, "total_tokens": 0}
+        })
+
+    app = web.Application()
+    app.router.add_post("/v1/embeddings", embeddings)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    return runner
+
+
+async def run(directory: str, api_base: str, label: str, corpus: list, batch_size: int) -> dict:
+    """Ingest the corpus into a fresh collection and return the ingest stats."""
+    knowledge_base = KnowledgeBase(
+        directory,
+        embedding_function=embedding_functions.OpenAIEmbeddingFunction(
+            api_key="stand-in", api_base=api_base
+        ),
+        collection_name=f"bench_{label}"
+    )
+    stats = await knowledge_base.ingest(corpus, batch_size)
+    print(f"{label:10} batch size {batch_size:4d}: {stats['documents']} documents in "
+          f"{stats['elapsed']:6.2f} s, {stats['docs_per_second']:8.1f} docs/s")
+    return stats
+
+
+async def main(count: int, batch_size: int, request_ms: float, item_ms: float) -> None:
+    runner = await start_stand_in_server(request_ms, item_ms)
+    api_base = f"http://127.0.0.1:{runner.addresses[0][1]}/v1"
+    corpus = [f"Document {i}: " + "lorem ipsum dolor sit amet " * 20 for i in range(count)]
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            before = await run(directory, api_base, "unbatched", corpus, 1)
+            after = await run(directory, api_base, "batched", corpus, batch_size)
+    finally:
+        await runner.cleanup()
+    print(f"speedup: {after['docs_per_second'] / before['docs_per_second']:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--request-ms", type=float, default=20.0,
+                        help="stand-in server cost per embedding request")
+    parser.add_argument("--item-ms", type=float, default=1.0,
+                        help="stand-in server cost per embedded document")
+    args = parser.parse_args()
+    asyncio.run(main(args.documents, args.batch_size, args.request_ms, args.item_ms))
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Compare per-request sessions with the pooled OpenHandsClient session.
+
+Starts a local stand-in for the supervisor's /v1/chat endpoint and sends the
+same sequence of messages both ways.
+
+    python benchmarks/bench_openhands_client.py --requests 200
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import aiohttp
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from openhands_client import OpenHandsClient
+
+
+async def start_stand_in_server() -> web.AppRunner:
+    """Start a local server that answers /v1/chat like the supervisor."""
+    async def chat(request: web.Request) -> web.Response:
+        payload = await request.json()
+        return web.json_response({"response": payload["message"]})
+
+    app = web.Application()
+    app.router.add_post("/v1/chat", chat)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "localhost", 0).start()
+    return runner
+
+
+async def per_request_sessions(url: str, count: int) -> float:
+    """Send messages opening a new session each time (the old behaviour)."""
+    start = time.perf_counter()
+    for i in range(count):
+        async with aiohttp.ClientSession() as session:
+            async with session.post(f"{url}/v1/chat", json={"message": str(i)}) as response:
+                await response.json()
+    return time.perf_counter() - start
+
+
+async def pooled_session(url: str, count: int) -> float:
+    """Send messages through the pooled OpenHandsClient session."""
+    async with OpenHandsClient(supervisor_url=url) as client:
+        start = time.perf_counter()
+        for i in range(count):
+            await client.send_to_supervisor(str(i))
+        return time.perf_counter() - start
+
+
+async def main(count: int) -> None:
+    runner = await start_stand_in_server()
+    port = runner.addresses[0][1]
+    url = f"http://localhost:{port}"
+    try:
+        # Warm up both paths once so imports and the server are hot
+        await per_request_sessions(url, 5)
+        await pooled_session(url, 5)
+
+        baseline = await per_request_sessions(url, count)
+        pooled = await pooled_session(url, count)
+    finally:
+        await runner.cleanup()
+
+    print(f"requests:             {count}")
+    print(f"per-request session:  {baseline / count * 1000:.3f} ms/request")
+    print(f"pooled session:       {pooled / count * 1000:.3f} ms/request")
+    print(f"speedup:              {baseline / pooled:.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""Compare prompt-eval cost of the old and the prefix-stable prompt layouts.
+
+Plays the same multi-turn web-expert session with the old history-first
+template and the current one (static instructions, history, then volatile
+content). Without --api-base a llama.cpp slot is simulated: only the tokens
+after the longest prefix shared with the previous prompt are evaluated.
+With --api-base the prompts go to a real llama.cpp server with
+cache_prompt enabled and its reported prompt timings are used.
+
+    python benchmarks/bench_prompt_cache.py --turns 20
+    python benchmarks/bench_prompt_cache.py --api-base http://localhost:8080/v1
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Optional
+
+import aiohttp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from langchain_core.language_models import FakeListLLM
+from langchain.prompts import PromptTemplate
+from agents.core.token_memory import TokenBudgetMemory
+from agents.core.tokens import count_tokens
+from agents.experts.web_agent import WebAgent
+
+# The web expert's template before prompts were reordered
+OLD_TEMPLATE = PromptTemplate(
+    input_variables=["input", "history", "web_content"],
+    template="""
+            Based on the conversation history:
+            {history}
+
+            And the following web content:
+            {web_content}
+
+            Human: {input}
+            Assistant: Let me help you with that web content.
+
+            1. Content Analysis:
+            - Extract key information
+            - Identify main points
+            - Note any relevant links
+
+            2. Response:
+            - Provide clear summary
+            - Answer specific questions
+            - Suggest related information
+            """
+)
+
+
+class SimulatedSlot:
+    """Tracks a llama.cpp slot's cached prompt to count re-evaluated tokens."""
+
+    def __init__(self):
+        self.cached = ""
+
+    def evaluate(self, prompt: str) -> int:
+        shared = 0
+        for a, b in zip(self.cached, prompt):
+            if a != b:
+                break
+            shared += 1
+        self.cached = prompt
+        return count_tokens(prompt) - count_tokens(prompt[:shared])
+
+
+async def evaluate_on_server(session: aiohttp.ClientSession, api_base: str, prompt: str) -> tuple:
+    """Send a prompt to llama.cpp and return (prompt tokens evaluated, prompt ms)."""
+    payload = {
+        "messages": [{"role": "user", "content": prompt}],
+        "max_tokens": 16,
+        "cache_prompt": True,
+        "id_slot": 0
+    }
+    async with session.post(f"{api_base}/chat/completions", json=payload) as response:
+        result = await response.json()
+    timings = result.get("timings", {})
+    return timings.get("prompt_n", 0), timings.get("prompt_ms", 0.0)
+
+
+async def run_session(template: PromptTemplate, turns: int, budget: int,
+                      api_base: Optional[str]) -> tuple:
+    """Play a session and return (prompt tokens evaluated, prompt ms, total tokens)."""
+    memory = TokenBudgetMemory(max_token_limit=budget)
+    slot = SimulatedSlot()
+    evaluated = total = 0
+    prompt_ms = 0.0
+    async with aiohttp.ClientSession() as session:
+        for turn in range(turns):
+            user_input = f"What does page {turn} say about topic {turn % 5}?"
+            prompt = template.format(
+                history=memory.load_memory_variables({})["history"],
+                web_content=f"Page {turn}: " + "lorem ipsum dolor sit amet " * 40,
+                input=user_input
+            )
+            total += count_tokens(prompt)
+            if api_base:
+                tokens, ms = await evaluate_on_server(session, api_base, prompt)
+                evaluated += tokens
+                prompt_ms += ms
+            else:
+                evaluated += slot.evaluate(prompt)
+            memory.save_context({"input": user_input}, {"text": f"Page {turn} covers topic {turn % 5} in detail."})
+    return evaluated, prompt_ms, total
+
+
+async def main(turns: int, budget: int, api_base: Optional[str], tokens_per_second: float) -> None:
+    new_template = WebAgent(FakeListLLM(responses=["unused"])).chain.prompt
+    results = {}
+    for name, template in (("history-first (old)", OLD_TEMPLATE), ("prefix-stable (new)", new_template)):
+        start = time.perf_counter()
+        results[name] = await run_session(template, turns, budget, api_base)
+        results[name] += (time.perf_counter() - start,)
+
+    print(f"turns: {turns}, history budget: {budget} tokens")
+    for name, (evaluated, prompt_ms, total, _) in results.items():
+        if not api_base:
+            # Simulated: estimate CPU prompt-eval time from the token count
+            prompt_ms = evaluated / tokens_per_second * 1000
+        print(f"{name:22} evaluated {evaluated:6d} of {total:6d} prompt tokens, "
+              f"prompt eval {prompt_ms / 1000:7.2f} s")
+    old, new = results.values()
+    print(f"prompt tokens evaluated: {new[0] / old[0]:.0%} of before")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--budget", type=int, default=1000, help="conversation memory token budget")
+    parser.add_argument("--api-base", help="llama.cpp server to measure against (simulated if omitted)")
+    parser.add_argument("--tokens-per-second", type=float, default=100.0,
+                        help="prompt-eval speed assumed for simulated timings")
+    args = parser.parse_args()
+    asyncio.run(main(args.turns, args.budget, args.api_base, args.tokens_per_second))
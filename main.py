@@ -11,24 +11,39 @@
 
 import tkinter as tk
 import asyncio
+import logging
 from tkinter import Toplevel, Text, Button, END, Frame, Label, ttk, messagebox, filedialog
 from agents.core.multi_agent_system import MultiAgentSystem
 from agents.core.config import Config, LLMEndpoint
 import subprocess
 import sys
+import queue
 import aiohttp
 from openhands_client import OpenHandsClient
+from async_runner import AsyncRunner
+
+logger = logging.getLogger("smolit")
 
 # Ensure Python 3
 if sys.version_info[0] < 3:
     raise Exception("Python 3 or a more recent version is required.")
 
+# Streamed tokens are flushed into the chat window at most once per frame
+STREAM_FRAME_MS = 16
+
+# Per-instance deadline (seconds) for broadcasts to OpenHands instances
+INSTANCE_TIMEOUT = 120
+
 class SimpleAssistantApp:
     def __init__(self):
         # Initialize configuration
         self.config = Config()
         self.openhands_client = OpenHandsClient()
         self.instance_responses = {}
+
+        # Long-lived event loop for all async work, kept off the Tk thread
+        self.async_runner = AsyncRunner()
+        self.async_runner.start()
         
         # Initialize main icon window
         self.root = tk.Tk()
@@ -37,9 +52,7 @@ class SimpleAssistantApp:
         self.root.overrideredirect(True)
         self.root.wm_attributes("-topmost", True)
         self.root.title("Smolit Desktop-Icon")
-
-        # Initialize multi-agent system with active endpoint
-        self._initialize_agent_system()
+        self.agent_system = None
 
         # Create icon button
         self.icon_button = tk.Button(
@@ -64,17 +77,53 @@ class SimpleAssistantApp:
         self.root.bind("<Button-1>", self.start_move)
         self.root.bind("<B1-Motion>", self.do_move)
 
+        # Initialize multi-agent system once the icon is on screen
+        self.root.after(0, self._initialize_agent_system)
+
     def _initialize_agent_system(self):
         """Initialize the multi-agent system with current endpoint."""
         endpoint = self.config.get_active_endpoint()
-        if endpoint.type == "llama" and not self.config.start_llama_server():
-            messagebox.showerror("Error", "Failed to start Llama server")
-            sys.exit(1)
-            
-        self.agent_system = MultiAgentSystem(
-            api_key=endpoint.api_key,
-            api_base=endpoint.api_base
-        )
+        self.agent_system = MultiAgentSystem.from_config(self.config)
+
+        # Keep the endpoint pool's health view current in the background
+        if getattr(self, 'health_future', None):
+            self.health_future.cancel()
+            self.health_future = None
+        if self.agent_system.endpoint_pool is not None:
+            self.health_future = self.run_async(
+                self.agent_system.endpoint_pool.run_health_checks()
+            )
+
+        # Bring the local server up in the background; other endpoints
+        # stay usable while the model downloads and loads
+        if endpoint.type == "llama":
+            self.server_future = self.run_async(
+                self.config.start_llama_server_async(
+                    on_progress=lambda status: self.root.after(0, self.show_server_status, status)
+                ),
+                on_error=lambda e: self.display_system_message(f"Error starting Llama server: {e}")
+            )
+
+    def show_server_status(self, status):
+        """Show Llama server bring-up progress."""
+        if status.stage == "failed":
+            messagebox.showerror("Error", f"Failed to start Llama server: {status.message}")
+            return
+
+        text = status.message
+        if status.progress is not None and status.stage == "downloading":
+            text = f"{text} {int(status.progress * 100)}%"
+        if hasattr(self, 'chat_window') and self.chat_window.winfo_exists():
+            self.chat_window.title("Smolit" if status.stage == "ready" else f"Smolit - {text}")
+        # Only announce stage changes in the chat, not every poll
+        if status.stage != getattr(self, 'server_stage', None):
+            self.server_stage = status.stage
+            self.display_system_message(text)
+
+    def display_system_message(self, message):
+        """Display a system message if the chat window is open."""
+        if hasattr(self, 'response_area') and self.response_area.winfo_exists():
+            self.display_message("System", message)
 
     def start_move(self, event):
         self.root.x = event.x
@@ -169,6 +218,8 @@ class SimpleAssistantApp:
         if selected != self.config.config["active_endpoint"]:
             # Stop current Llama server if running
             if self.config.config["endpoints"][self.config.config["active_endpoint"]]["type"] == "llama":
+                if getattr(self, 'server_future', None):
+                    self.server_future.cancel()
                 self.config.stop_llama_server()
             
             # Set new endpoint
@@ -215,10 +266,34 @@ class SimpleAssistantApp:
         window_height = self.chat_window.winfo_height()
         self.menu_frame.place(x=0, y=50, height=window_height - 50, width=200)
 
+    def run_async(self, coro, on_result=None, on_error=None):
+        """Run a coroutine on the background loop and hand results back to Tk."""
+        def result_callback(result):
+            if on_result:
+                self.root.after(0, lambda: on_result(result))
+
+        def error_callback(error):
+            if on_error:
+                self.root.after(0, lambda: on_error(error))
+
+        return self.async_runner.submit(coro, result_callback, error_callback)
+
     async def process_message(self, user_input):
         """Process message using multi-agent system."""
         return await self.agent_system.process_input(user_input)
 
+    async def stream_message(self, user_input, chunks):
+        """Stream the multi-agent response into a chunk queue."""
+        try:
+            if self.agent_system is None:
+                chunks.put("Still starting up, please try again in a moment.")
+                return
+            async for chunk in self.agent_system.process_input_stream(user_input):
+                chunks.put(chunk)
+        finally:
+            # Sentinel tells the UI the stream is complete
+            chunks.put(None)
+
     def send_message(self):
         user_input = self.user_input.get("1.0", END).strip()
         if not user_input:
@@ -227,12 +302,11 @@ class SimpleAssistantApp:
         self.display_message("You", user_input)
         self.user_input.delete("1.0", END)
 
-        # Create and run asyncio event loop for processing
-        async def process():
-            response = await self.process_message(user_input)
-            self.root.after(0, lambda: self.display_message("Assistant", response))
-
-        asyncio.run(process())
+        chunks = self.display_stream("Assistant")
+        self.run_async(
+            self.stream_message(user_input, chunks),
+            on_error=lambda e: self.display_message("System", f"Error: {str(e)}")
+        )
 
     def display_message(self, sender, message):
         """Display message in response area."""
@@ -241,6 +315,52 @@ class SimpleAssistantApp:
         self.response_area.config(state=tk.DISABLED)
         self.response_area.see(END)
 
+    def display_stream(self, sender):
+        """Start a streamed message and return the queue its chunks are read from."""
+        if not hasattr(self, 'stream_count'):
+            self.stream_count = 0
+        self.stream_count += 1
+        mark = f"stream{self.stream_count}"
+
+        self.response_area.config(state=tk.NORMAL)
+        self.response_area.insert(END, f"{sender}: \n\n")
+        # Each stream writes at its own mark so concurrent replies don't interleave
+        self.response_area.mark_set(mark, "end-3c")
+        self.response_area.config(state=tk.DISABLED)
+        self.response_area.see(END)
+
+        chunks = queue.Queue()
+        self.root.after(STREAM_FRAME_MS, self._flush_stream, mark, chunks)
+        return chunks
+
+    def _flush_stream(self, mark, chunks):
+        """Insert all chunks received since the last frame in one go."""
+        parts = []
+        done = False
+        while True:
+            try:
+                chunk = chunks.get_nowait()
+            except queue.Empty:
+                break
+            if chunk is None:
+                done = True
+                break
+            parts.append(chunk)
+
+        if not self.response_area.winfo_exists():
+            return
+
+        if parts:
+            self.response_area.config(state=tk.NORMAL)
+            self.response_area.insert(mark, "".join(parts))
+            self.response_area.config(state=tk.DISABLED)
+            self.response_area.see(mark)
+
+        if done:
+            self.response_area.mark_unset(mark)
+        else:
+            self.root.after(STREAM_FRAME_MS, self._flush_stream, mark, chunks)
+
     def show_smolit_hands_page(self):
         """Show the Smolit-Hands Framework page."""
         if hasattr(self, 'smolit_hands_window') and self.smolit_hands_window.winfo_exists():
@@ -279,8 +399,14 @@ class SimpleAssistantApp:
         buttons_frame = Frame(bottom_frame)
         buttons_frame.pack(side=tk.RIGHT)
 
+        # Upload progress
+        self.upload_progress = Label(bottom_frame, text="", width=12)
+        self.upload_progress.pack(side=tk.RIGHT)
+
         Button(buttons_frame, text="Send", command=self.send_to_supervisor,
                bg='#15aaff', fg='white').pack(side=tk.TOP, pady=2)
+        Button(buttons_frame, text="All", command=self.broadcast_to_instances,
+               bg='#15aaff', fg='white').pack(side=tk.TOP, pady=2)
         Button(buttons_frame, text="📎", command=self.attach_file,
                bg='#15aaff', fg='white').pack(side=tk.TOP, pady=2)
         Button(buttons_frame, text="+", command=self.add_openhands_instance,
@@ -330,15 +456,42 @@ class SimpleAssistantApp:
         self.supervisor_text.config(state=tk.DISABLED)
         self.hands_input.delete("1.0", tk.END)
         
-        # Process message asynchronously
-        async def process():
-            try:
-                response = await self.openhands_client.send_to_supervisor(message)
-                self.root.after(0, lambda: self.handle_supervisor_response(response))
-            except Exception as e:
-                self.root.after(0, lambda: self.display_error(f"Error: {str(e)}"))
+        # Process message on the background loop
+        self.run_async(
+            self.openhands_client.send_to_supervisor(message),
+            on_result=self.handle_supervisor_response,
+            on_error=lambda e: self.display_error(f"Error: {str(e)}")
+        )
+
+    def broadcast_to_instances(self):
+        """Send the current message to all OpenHands instances at once."""
+        message = self.hands_input.get("1.0", tk.END).strip()
+        if not message:
+            return
 
-        asyncio.run(process())
+        self.supervisor_text.config(state=tk.NORMAL)
+        self.supervisor_text.insert(tk.END, f"You (all instances): {message}\n")
+        self.supervisor_text.config(state=tk.DISABLED)
+        self.hands_input.delete("1.0", tk.END)
+
+        # Tiles update as each instance answers, not when the slowest one does
+        self.run_async(
+            self.openhands_client.broadcast(
+                message,
+                timeout=INSTANCE_TIMEOUT,
+                on_result=lambda instance_id, response: self.root.after(
+                    0, self.handle_instance_response, instance_id, response
+                )
+            ),
+            on_error=lambda e: self.display_error(f"Broadcast error: {str(e)}")
+        )
+
+    def handle_instance_response(self, instance_id: int, response: dict):
+        """Handle the response from a single OpenHands instance."""
+        if 'error' in response:
+            self.update_instance_response(instance_id, f"Error: {response['error']}")
+            return
+        self.update_instance_response(instance_id, response.get('response', ''))
 
     def handle_supervisor_response(self, response: dict):
         """Handle the response from the Supervisor Agent."""
@@ -373,14 +526,23 @@ class SimpleAssistantApp:
         if not file_path:
             return
             
-        async def upload():
-            try:
-                file_id = await self.openhands_client.upload_file(file_path)
-                self.root.after(0, lambda: self.handle_file_upload(file_id))
-            except Exception as e:
-                self.root.after(0, lambda: self.display_error(f"Upload error: {str(e)}"))
+        self.run_async(
+            self.openhands_client.upload_file(
+                file_path,
+                on_progress=lambda sent, total: self.root.after(
+                    0, self.update_upload_progress, sent, total
+                )
+            ),
+            on_result=self.handle_file_upload,
+            on_error=lambda e: self.display_error(f"Upload error: {str(e)}")
+        )
 
-        asyncio.run(upload())
+    def update_upload_progress(self, sent: int, total: int):
+        """Show how much of the current upload has been sent."""
+        if not self.upload_progress.winfo_exists():
+            return
+        percent = 100 if total == 0 else int(sent * 100 / total)
+        self.upload_progress.config(text=f"Upload {percent}%")
 
     def handle_file_upload(self, file_id: str):
         """Handle successful file upload."""
@@ -567,6 +729,11 @@ class SimpleAssistantApp:
     def close_application(self):
         """Close the application completely."""
         self.config.stop_llama_server()
+        try:
+            self.async_runner.run(self.openhands_client.close(), timeout=5)
+        except Exception as e:
+            logger.error(f"Error closing OpenHands client: {e}")
+        self.async_runner.stop()
         self.root.destroy()
 
     def run(self):
@@ -1,43 +1,226 @@
 import aiohttp
+import asyncio
+import hashlib
 import json
-from typing import Dict, List, Optional
+import os
+from typing import Awaitable, Callable, Dict, List, Optional
+
+# Uploads are streamed in chunks of this size, so memory use stays bounded
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 
 class OpenHandsClient:
-    def __init__(self, supervisor_url: str = "http://localhost:8000", instance_urls: List[str] = None):
+    def __init__(
+        self,
+        supervisor_url: str = "http://localhost:8000",
+        instance_urls: List[str] = None,
+        limit_per_host: int = 4,
+        keepalive_timeout: float = 60.0,
+        timeout: float = 300.0,
+        connect_timeout: float = 10.0
+    ):
         self.supervisor_url = supervisor_url
         self.instance_urls = instance_urls or ["http://localhost:8001", "http://localhost:8002"]
-        
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=connect_timeout)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self) -> "OpenHandsClient":
+        """Enter the client context."""
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        """Close the shared session when leaving the client context."""
+        await self.close()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Get the shared session, creating it on first use."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout
+            )
+        return self._session
+
+    async def close(self) -> None:
+        """Close the shared session and its pooled connections."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
     async def send_to_supervisor(self, message: str) -> Dict:
         """Send a message to the Supervisor Agent."""
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                f"{self.supervisor_url}/v1/chat",
-                json={"message": message}
-            ) as response:
-                return await response.json()
+        session = self._get_session()
+        async with session.post(
+            f"{self.supervisor_url}/v1/chat",
+            json={"message": message}
+        ) as response:
+            return await response.json()
 
     async def send_to_instance(self, instance_id: int, message: str) -> Dict:
         """Send a message to a specific OpenHands instance."""
         if instance_id >= len(self.instance_urls):
             raise ValueError(f"Invalid instance ID: {instance_id}")
-            
+
         url = self.instance_urls[instance_id]
-        async with aiohttp.ClientSession() as session:
+        session = self._get_session()
+        async with session.post(
+            f"{url}/v1/chat",
+            json={"message": message}
+        ) as response:
+            return await response.json()
+
+    async def map_instances(
+        self,
+        func: Callable[[int], Awaitable[Dict]],
+        instance_ids: Optional[List[int]] = None,
+        timeout: Optional[float] = None,
+        on_result: Optional[Callable[[int, Dict], None]] = None
+    ) -> Dict[int, Dict]:
+        """Run a request against several instances concurrently.
+
+        Each instance gets its own deadline. Failures and timeouts are
+        reported as {"error": ...} results instead of aborting the others,
+        and on_result is called for each instance as soon as it finishes.
+        """
+        if instance_ids is None:
+            instance_ids = list(range(len(self.instance_urls)))
+
+        async def run(instance_id: int):
+            try:
+                result = await asyncio.wait_for(func(instance_id), timeout)
+            except asyncio.TimeoutError:
+                result = {"error": f"Instance {instance_id} timed out after {timeout} seconds"}
+            except Exception as e:
+                result = {"error": f"Error contacting instance {instance_id}: {str(e)}"}
+            if on_result:
+                on_result(instance_id, result)
+            return instance_id, result
+
+        results = await asyncio.gather(*(run(i) for i in instance_ids))
+        return dict(results)
+
+    async def broadcast(
+        self,
+        message: str,
+        timeout: Optional[float] = None,
+        on_result: Optional[Callable[[int, Dict], None]] = None
+    ) -> Dict[int, Dict]:
+        """Send a message to all OpenHands instances at once."""
+        return await self.map_instances(
+            lambda instance_id: self.send_to_instance(instance_id, message),
+            timeout=timeout,
+            on_result=on_result
+        )
+
+    async def _hash_file(self, file_path: str, chunk_size: int) -> str:
+        """Compute the sha256 of a file by streaming it in chunks."""
+        def digest() -> str:
+            sha = hashlib.sha256()
+            with open(file_path, 'rb') as f:
+                for block in iter(lambda: f.read(chunk_size), b''):
+                    sha.update(block)
+            return sha.hexdigest()
+
+        return await asyncio.to_thread(digest)
+
+    async def _upload_status(self, digest: str) -> Dict:
+        """Ask the supervisor how much of an upload it already has."""
+        session = self._get_session()
+        async with session.get(f"{self.supervisor_url}/v1/uploads/{digest}") as response:
+            if response.status == 404:
+                return {"offset": 0}
+            response.raise_for_status()
+            return await response.json()
+
+    async def _upload_chunk(self, digest: str, name: str, chunk: bytes,
+                            offset: int, total: int) -> Optional[Dict]:
+        """Send one chunk; returns None if the server has no chunked uploads."""
+        session = self._get_session()
+        async with session.put(
+            f"{self.supervisor_url}/v1/uploads/{digest}",
+            data=chunk,
+            headers={
+                "Upload-Offset": str(offset),
+                "Upload-Length": str(total),
+                "Upload-Name": name,
+                "Content-Type": "application/octet-stream"
+            }
+        ) as response:
+            if response.status in (404, 405):
+                return None
+            response.raise_for_status()
+            return await response.json()
+
+    async def _upload_multipart(self, file_path: str) -> str:
+        """Upload a whole file through the legacy multipart endpoint."""
+        session = self._get_session()
+        with open(file_path, 'rb') as f:
+            data = aiohttp.FormData()
+            data.add_field('file', f)
             async with session.post(
-                f"{url}/v1/chat",
-                json={"message": message}
+                f"{self.supervisor_url}/v1/upload",
+                data=data
             ) as response:
-                return await response.json()
+                result = await response.json()
+                return result.get('file_id', '')
 
-    async def upload_file(self, file_path: str) -> str:
-        """Upload a file to the Supervisor Agent."""
-        async with aiohttp.ClientSession() as session:
-            with open(file_path, 'rb') as f:
-                data = aiohttp.FormData()
-                data.add_field('file', f)
-                async with session.post(
-                    f"{self.supervisor_url}/v1/upload",
-                    data=data
-                ) as response:
-                    result = await response.json()
-                    return result.get('file_id', '')
+    async def upload_file(
+        self,
+        file_path: str,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+        chunk_size: int = UPLOAD_CHUNK_SIZE,
+        max_retries: int = 3
+    ) -> str:
+        """Upload a file to the Supervisor Agent.
+
+        The file is streamed in chunks addressed by its sha256. Content the
+        supervisor already has is not sent again, and an interrupted transfer
+        resumes from the offset the supervisor reports.
+        """
+        total = os.path.getsize(file_path)
+        name = os.path.basename(file_path)
+        digest = await self._hash_file(file_path, chunk_size)
+
+        status = await self._upload_status(digest)
+        if status.get('file_id'):
+            if on_progress:
+                on_progress(total, total)
+            return status['file_id']
+
+        offset = status.get('offset', 0)
+        retries = 0
+        with open(file_path, 'rb') as f:
+            while True:
+                try:
+                    f.seek(offset)
+                    chunk = await asyncio.to_thread(f.read, chunk_size)
+                    result = await self._upload_chunk(digest, name, chunk, offset, total)
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    retries += 1
+                    if retries > max_retries:
+                        raise
+                    # Resume from whatever the supervisor managed to store
+                    offset = (await self._upload_status(digest)).get('offset', 0)
+                    continue
+
+                if result is None:
+                    return await self._upload_multipart(file_path)
+
+                retries = 0
+                if result.get('file_id'):
+                    if on_progress:
+                        on_progress(total, total)
+                    return result['file_id']
+                if not chunk:
+                    # Nothing left to send but the supervisor did not finalize
+                    return ''
+
+                offset = result.get('offset', offset + len(chunk))
+                if on_progress:
+                    on_progress(offset, total)
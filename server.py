@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""Serve the multi-agent system over HTTP for headless and remote clients.
+
+    python server.py --port 8000
+
+The server listens on 127.0.0.1 by default. With an API token (--api-token
+or SMOLIT_API_TOKEN) every /v1 request needs "Authorization: Bearer
+<token>"; binding to any other address requires one. /v1/execute runs
+shell commands and is only served with --enable-execute.
+
+Endpoints (JSON in, JSON out):
+    POST /v1/chat       {"message", "stream"?, "session_id"?}
+                                                -> {"response"} or SSE chunks
+    POST /v1/knowledge  {"documents": [...]}    -> {"ids": [...]}
+    POST /v1/browse     {"url"}                 -> browse result
+    POST /v1/execute    {"command"}             -> command result
+    GET  /v1/stats                              -> cache, routing and queue stats
+    GET  /health                                -> {"status": "ok"}
+
+/v1/chat matches what OpenHandsClient.send_to_supervisor sends, so the
+desktop app can point at a shared server. Each session_id gets its own
+conversation memory; requests without one share the default session.
+"""
+import os
+import sys
+import hmac
+import json
+import argparse
+import ipaddress
+from contextlib import aclosing
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiohttp import web
+
+from agents.core.logging_config import setup_logger
+
+logger = setup_logger()
+
+SYSTEM_KEY = web.AppKey("system", object)
+API_TOKEN_KEY = web.AppKey("api_token", str)
+
+Handler = Callable[[web.Request], Awaitable[web.StreamResponse]]
+
+
+@web.middleware
+async def _require_token(request: web.Request, handler: Handler) -> web.StreamResponse:
+    """Reject /v1 requests without the configured bearer token."""
+    token = request.app.get(API_TOKEN_KEY)
+    if token and request.path.startswith("/v1/"):
+        scheme, _, given = request.headers.get("Authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not hmac.compare_digest(given.strip().encode(), token.encode()):
+            return web.json_response(
+                {"error": "Missing or invalid API token"},
+                status=401,
+                headers={"WWW-Authenticate": "Bearer"}
+            )
+    return await handler(request)
+
+
+async def _read_json(request: web.Request, *fields: str) -> Dict[str, Any]:
+    """Parse the request body and check required fields, or raise 400."""
+    try:
+        payload = await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(
+            text=json.dumps({"error": "Request body must be JSON"}), content_type="application/json"
+        )
+    if not isinstance(payload, dict):
+        payload = {}
+    missing = [field for field in fields if field not in payload]
+    if missing:
+        raise web.HTTPBadRequest(
+            text=json.dumps({"error": f"Missing field(s): {', '.join(missing)}"}),
+            content_type="application/json"
+        )
+    return payload
+
+
+async def chat(request: web.Request) -> web.StreamResponse:
+    """Answer a message, streaming it as server-sent events if asked to."""
+    payload = await _read_json(request, "message")
+    system = request.app[SYSTEM_KEY]
+    stream = payload.get("stream") or "text/event-stream" in request.headers.get("Accept", "")
+    session_id = payload.get("session_id")
+    if not stream:
+        response = await system.process_input(payload["message"], session_id=session_id)
+        return web.json_response({"response": response})
+
+    response = web.StreamResponse(headers={
+        "Content-Type": "text/event-stream",
+        "Cache-Control": "no-cache"
+    })
+    await response.prepare(request)
+    # aclosing releases the request's queue slot even if the client leaves
+    chunks = system.process_input_stream(payload["message"], session_id=session_id)
+    async with aclosing(chunks):
+        async for chunk in chunks:
+            await response.write(f"data: {json.dumps({'chunk': chunk})}\n\n".encode())
+    await response.write(b"event: done\ndata: {}\n\n")
+    await response.write_eof()
+    return response
+
+
+async def add_knowledge(request: web.Request) -> web.Response:
+    """Add documents to the knowledge base."""
+    payload = await _read_json(request, "documents")
+    ids = await request.app[SYSTEM_KEY].add_knowledge(list(payload["documents"]))
+    return web.json_response({"ids": ids})
+
+
+async def browse(request: web.Request) -> web.Response:
+    """Fetch a web page through the web expert."""
+    payload = await _read_json(request, "url")
+    return web.json_response(await request.app[SYSTEM_KEY].browse_url(payload["url"]))
+
+
+async def execute(request: web.Request) -> web.Response:
+    """Run an allowed command through the command expert."""
+    payload = await _read_json(request, "command")
+    return web.json_response(await request.app[SYSTEM_KEY].execute_command(payload["command"]))
+
+
+async def stats(request: web.Request) -> web.Response:
+    """Report cache, routing and admission-queue statistics."""
+    system = request.app[SYSTEM_KEY]
+    return web.json_response({
+        "cache": system.get_cache_stats(),
+        "routing": system.get_routing_stats(),
+        "scheduler": system.get_scheduler_stats(),
+        "sessions": system.get_session_stats()
+    })
+
+
+async def health(request: web.Request) -> web.Response:
+    return web.json_response({"status": "ok"})
+
+
+async def _on_startup(app: web.Application) -> None:
+    pool = getattr(app[SYSTEM_KEY], "endpoint_pool", None)
+    if pool is not None:
+        pool.start_health_checks()
+
+
+async def _on_cleanup(app: web.Application) -> None:
+    system = app[SYSTEM_KEY]
+    pool = getattr(system, "endpoint_pool", None)
+    if pool is not None:
+        pool.stop_health_checks()
+    for store in (getattr(system, "response_cache", None), getattr(system, "sessions", None)):
+        if store is not None and hasattr(store, "close"):
+            store.close()
+    logger.info("Server stopped")
+
+
+def create_app(
+    system: Any,
+    api_token: Optional[str] = None,
+    enable_execute: bool = False
+) -> web.Application:
+    """Build the aiohttp application around a MultiAgentSystem.
+
+    With an `api_token`, /v1 requests must carry it as a bearer token.
+    /v1/execute is only routed if `enable_execute` is set.
+    """
+    app = web.Application(client_max_size=32 * 1024 * 1024, middlewares=[_require_token])
+    app[SYSTEM_KEY] = system
+    if api_token:
+        app[API_TOKEN_KEY] = api_token
+    app.router.add_post("/v1/chat", chat)
+    app.router.add_post("/v1/knowledge", add_knowledge)
+    app.router.add_post("/v1/browse", browse)
+    if enable_execute:
+        app.router.add_post("/v1/execute", execute)
+    app.router.add_get("/v1/stats", stats)
+    app.router.add_get("/health", health)
+    app.on_startup.append(_on_startup)
+    app.on_cleanup.append(_on_cleanup)
+    return app
+
+
+def _is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--config", default="config.json", help="endpoint configuration file")
+    parser.add_argument("--session-store", default="./cache/sessions.sqlite",
+                        help="where idle sessions are kept when evicted from memory")
+    parser.add_argument("--shutdown-timeout", type=float, default=30.0,
+                        help="seconds to let in-flight requests finish on shutdown")
+    parser.add_argument("--api-token", default=os.environ.get("SMOLIT_API_TOKEN"),
+                        help="bearer token required on /v1 requests (default: $SMOLIT_API_TOKEN)")
+    parser.add_argument("--enable-execute", action="store_true",
+                        help="serve /v1/execute, which runs shell commands")
+    args = parser.parse_args(argv)
+    if not args.api_token and not _is_loopback(args.host):
+        parser.error(f"--api-token (or SMOLIT_API_TOKEN) is required to listen on {args.host}")
+
+    from agents.core.config import Config
+    from agents.core.multi_agent_system import MultiAgentSystem
+    system = MultiAgentSystem.from_config(Config(config_path=args.config), session_store=args.session_store)
+
+    logger.info(f"Serving on http://{args.host}:{args.port}")
+    # run_app stops on SIGINT/SIGTERM, letting in-flight requests finish
+    app = create_app(system, api_token=args.api_token, enable_execute=args.enable_execute)
+    web.run_app(app, host=args.host, port=args.port,
+                shutdown_timeout=args.shutdown_timeout, print=None)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
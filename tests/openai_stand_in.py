@@ -0,0 +1,70 @@
+import json
+import asyncio
+from aiohttp import web
+
+class OpenAIStandIn:
+    """Minimal OpenAI-compatible chat server for tests."""
+
+    def __init__(self, reply: str = "Stand-in reply", delay: float = 0.0):
+        self.reply = reply
+        self.delay = delay
+        self.healthy = True
+        self.failing = False
+        self.requests = []
+        self.runner = None
+        self.url = None
+
+    async def start(self) -> "OpenAIStandIn":
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.chat_completions)
+        app.router.add_get("/health", self.health)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, "127.0.0.1", 0).start()
+        self.url = f"http://127.0.0.1:{self.runner.addresses[0][1]}/v1"
+        return self
+
+    async def stop(self) -> None:
+        await self.runner.cleanup()
+
+    async def health(self, request):
+        if self.healthy:
+            return web.json_response({"status": "ok"})
+        return web.json_response({"status": "loading model"}, status=503)
+
+    async def chat_completions(self, request):
+        body = await request.json()
+        self.requests.append(body)
+        if self.failing:
+            return web.json_response({"error": {"message": "overloaded"}}, status=500)
+        await asyncio.sleep(self.delay)
+        model = body.get("model", "stand-in")
+
+        if not body.get("stream"):
+            return web.json_response({
+                "id": "chatcmpl-stand-in",
+                "object": "chat.completion",
+                "created": 0,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": self.reply},
+                    "finish_reason": "stop"
+                }],
+                "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+            })
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for token in self.reply.split(" "):
+            chunk = {
+                "id": "chatcmpl-stand-in",
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": token + " "}, "finish_reason": None}]
+            }
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
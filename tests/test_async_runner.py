@@ -0,0 +1,60 @@
+import pytest
+import asyncio
+import threading
+from async_runner import AsyncRunner
+
+@pytest.fixture
+def runner():
+    runner = AsyncRunner()
+    runner.start()
+    yield runner
+    runner.stop()
+
+def test_runner_reuses_single_loop(runner):
+    async def current_loop():
+        return asyncio.get_running_loop()
+
+    first = runner.run(current_loop(), timeout=5)
+    second = runner.run(current_loop(), timeout=5)
+    assert first is second is runner.loop
+
+def test_runner_runs_off_calling_thread(runner):
+    async def current_thread():
+        return threading.current_thread()
+
+    assert runner.run(current_thread(), timeout=5) is not threading.current_thread()
+
+def test_runner_requests_overlap(runner):
+    async def sleeper():
+        await asyncio.sleep(0.2)
+        return "done"
+
+    futures = [runner.submit(sleeper()) for _ in range(5)]
+    results = [f.result(timeout=0.9) for f in futures]
+    assert results == ["done"] * 5
+
+def test_runner_callbacks(runner):
+    results, errors = [], []
+    done = threading.Event()
+
+    async def ok():
+        return 42
+
+    async def fail():
+        raise ValueError("Test error")
+
+    runner.submit(ok(), on_result=results.append).result(timeout=5)
+    runner.submit(fail(), on_error=lambda e: (errors.append(e), done.set()))
+    done.wait(5)
+    assert results == [42]
+    assert isinstance(errors[0], ValueError)
+
+def test_runner_stop_cancels_pending():
+    runner = AsyncRunner()
+    runner.start()
+    future = runner.submit(asyncio.sleep(60))
+    runner.stop()
+    assert not runner.is_running
+    assert future.cancelled()
+    with pytest.raises(RuntimeError):
+        runner.submit(asyncio.sleep(0))
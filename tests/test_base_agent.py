@@ -62,3 +62,18 @@ async def test_base_agent_error_handling(base_agent):
         response = await base_agent.process("Test input")
         assert "Error" in response
 
+
+@pytest.mark.asyncio
+async def test_base_agent_process_stream():
+    from langchain_core.language_models import FakeStreamingListLLM
+    agent = BaseAgent(FakeStreamingListLLM(responses=["Streamed reply"]))
+    chunks = [chunk async for chunk in agent.process_stream("Test input")]
+    assert len(chunks) > 1
+    assert "".join(chunks) == "Streamed reply"
+    assert "Streamed reply" in agent.get_memory()["history"]
+
+@pytest.mark.asyncio
+async def test_base_agent_process_stream_error_handling(base_agent):
+    with patch.object(base_agent.llm.__class__, 'astream', side_effect=Exception("Test error")):
+        chunks = [chunk async for chunk in base_agent.process_stream("Test input")]
+        assert "Error" in chunks[-1]
@@ -0,0 +1,74 @@
+import json
+import pytest
+import asyncio
+from batch import load_checkpoint, run_batch
+
+class FakeSystem:
+    """Stands in for MultiAgentSystem, tracking concurrency."""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.seen = []
+        self.sessions = {}
+        self.dropped = []
+        self.active = 0
+        self.peak = 0
+
+    async def process_input(self, user_input, priority=None, session_id=None):
+        self.seen.append(user_input)
+        self.sessions[user_input] = session_id
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        if user_input in self.fail:
+            return "Error processing request: boom"
+        return f"answer to {user_input}"
+
+    def drop_session(self, session_id):
+        self.dropped.append(session_id)
+
+def write_input(path, count):
+    with open(path, "w") as f:
+        for i in range(count):
+            f.write(json.dumps({"request_id": f"r{i}", "title": "t", "body": f"prompt {i}"}) + "\n")
+
+def read_output(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+@pytest.mark.asyncio
+async def test_batch_runs_with_bounded_concurrency(tmp_path):
+    write_input(tmp_path / "in.jsonl", 10)
+    system = FakeSystem(fail={"prompt 3"})
+    stats = await run_batch(system, str(tmp_path / "in.jsonl"), str(tmp_path / "out.jsonl"), concurrency=3)
+    assert system.peak == 3
+    assert (stats["completed"], stats["failed"]) == (9, 1)
+    assert stats["requests_per_second"] > 0 and stats["tokens_per_second"] > 0
+    records = {record["id"]: record for record in read_output(tmp_path / "out.jsonl")}
+    assert records["r0"]["output"] == "answer to prompt 0"
+    assert "error" in records["r3"]
+    # Every item ran in its own session, which was dropped afterwards
+    assert system.sessions["prompt 0"] == "batch-r0"
+    assert sorted(system.dropped) == sorted(system.sessions.values())
+    assert len(system.dropped) == 10
+
+@pytest.mark.asyncio
+async def test_batch_resumes_from_checkpoint(tmp_path):
+    write_input(tmp_path / "in.jsonl", 5)
+    output = tmp_path / "out.jsonl"
+    # An interrupted run: two done, one failed, one line cut off mid-write
+    output.write_text(
+        json.dumps({"id": "r0", "output": "a"}) + "\n"
+        + json.dumps({"id": "r1", "output": "b"}) + "\n"
+        + json.dumps({"id": "r2", "output": "Error", "error": "Error"}) + "\n"
+        + '{"id": "r3", "outp'
+    )
+    assert load_checkpoint(str(output)) == {"r0", "r1"}
+    system = FakeSystem()
+    stats = await run_batch(system, str(tmp_path / "in.jsonl"), str(output), concurrency=2)
+    assert sorted(system.seen) == ["prompt 2", "prompt 3", "prompt 4"]
+    assert stats["skipped"] == 2
+    # Every line of the output is valid JSON again
+    assert load_checkpoint(str(output)) == {"r0", "r1", "r2", "r3", "r4"}
+    assert len(read_output(output)) == 6
@@ -0,0 +1,85 @@
+import os
+import uuid
+import pytest
+from agents.tools.chunking import iter_file_chunks, read_segments
+from agents.tools.knowledge_base import KnowledgeBase
+from tests.test_ingest import RecordingEmbeddings
+
+def write_corpus(path, lines=400):
+    text = "".join(f"Paragraph {i} talks about topic {i % 7}.\n" + ("\n" if i % 5 == 4 else "")
+                   for i in range(lines))
+    with open(path, "w", newline="") as f:
+        f.write(text)
+    return text
+
+def test_segments_cover_the_file_with_overlap(tmp_path):
+    text = write_corpus(tmp_path / "notes.txt")
+    segments = list(read_segments(str(tmp_path / "notes.txt"), segment_size=1000, overlap=50))
+    assert len(segments) > 10
+    for offset, segment in segments:
+        assert text[offset:offset + len(segment)] == segment
+    ends = [offset + len(segment) for offset, segment in segments]
+    assert ends[-1] == len(text)
+    # Consecutive segments overlap and leave no gaps
+    assert all(offset < end for (offset, _), end in zip(segments[1:], ends))
+
+@pytest.mark.asyncio
+async def test_chunks_record_their_provenance(tmp_path):
+    path = str(tmp_path / "notes.txt")
+    text = write_corpus(path)
+    chunks = [chunk async for chunk in iter_file_chunks([path], chunk_size=200, chunk_overlap=40,
+                                                        segment_size=1000)]
+    assert all(len(content) <= 200 for content, _ in chunks)
+    for content, metadata in chunks:
+        assert metadata["source"] == path
+        assert text[metadata["offset"]:metadata["offset"] + len(content)] == content
+    assert [metadata["chunk"] for _, metadata in chunks] == list(range(len(chunks)))
+    assert "Paragraph 399" in chunks[-1][0]
+
+@pytest.mark.asyncio
+async def test_ingest_files_in_process_pool_and_skip_unchanged(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    embeddings = RecordingEmbeddings()
+    knowledge_base = KnowledgeBase(
+        embedding_function=embeddings,
+        batch_size=16,
+        collection_name=f"test_{uuid.uuid4().hex}"
+    )
+    paths = [str(tmp_path / "a.txt"), str(tmp_path / "b.txt")]
+    write_corpus(paths[0])
+    write_corpus(paths[1], lines=50)
+
+    stats = await knowledge_base.ingest_files(paths, chunk_size=300, chunk_overlap=50, workers=2)
+    assert stats["files"] == 2 and stats["failed"] == 0
+    assert knowledge_base.collection.count() == stats["documents"] > 0
+    stored = knowledge_base.collection.get(limit=1, include=["metadatas"])["metadatas"][0]
+    assert set(stored) == {"source", "offset", "chunk"}
+
+    # Unchanged files are not read again; an edited one only embeds new chunks
+    with open(paths[1], "a") as f:
+        f.write("A new closing paragraph.\n")
+    os.utime(paths[1], ns=(0, 10**9))
+    embeddings.calls.clear()
+    stats = await knowledge_base.ingest_files(paths, chunk_size=300, chunk_overlap=50, workers=2)
+    assert (stats["files"], stats["files_unchanged"]) == (1, 1)
+    embedded = [text for texts, _ in embeddings.calls for text in texts]
+    assert any("A new closing paragraph." in text for text in embedded)
+    assert len(embedded) < 3
+
+@pytest.mark.asyncio
+async def test_unchanged_files_start_no_worker_processes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    knowledge_base = KnowledgeBase(
+        embedding_function=RecordingEmbeddings(),
+        collection_name=f"test_{uuid.uuid4().hex}"
+    )
+    path = str(tmp_path / "notes.txt")
+    write_corpus(path, lines=20)
+    await knowledge_base.ingest_files([path], workers=1)
+
+    def no_pool(*args, **kwargs):
+        raise AssertionError("process pool started for unchanged files")
+
+    monkeypatch.setattr("agents.tools.knowledge_base.ProcessPoolExecutor", no_pool)
+    stats = await knowledge_base.ingest_files([path], workers=1)
+    assert (stats["files"], stats["files_unchanged"], stats["documents"]) == (0, 1, 0)
@@ -0,0 +1,110 @@
+import pytest
+import asyncio
+from aiohttp import web
+from agents.core.config import Config, LogTail, probe_server
+
+@pytest.fixture
+def config(tmp_path):
+    return Config(config_path=str(tmp_path / "config.json"))
+
+@pytest.fixture
+async def warming_server():
+    state = {"health_calls": 0, "ready_after": 3}
+
+    async def health(request):
+        state["health_calls"] += 1
+        if state["health_calls"] < state["ready_after"]:
+            return web.json_response({"status": "loading model"}, status=503)
+        return web.json_response({"status": "ok"})
+
+    app = web.Application()
+    app.router.add_get("/health", health)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    yield f"http://127.0.0.1:{runner.addresses[0][1]}/v1", state
+    await runner.cleanup()
+
+def test_log_tail_reads_only_new_output(tmp_path):
+    log_path = tmp_path / "server.log"
+    tail = LogTail(str(log_path))
+    assert tail.read_new() == ""
+    log_path.write_text("first line\n")
+    assert tail.read_new() == "first line\n"
+    with open(log_path, "a") as f:
+        f.write("second line\n")
+    assert tail.read_new() == "second line\n"
+    assert tail.read_new() == ""
+
+@pytest.mark.asyncio
+async def test_wait_for_server_ready_with_backoff(config, warming_server):
+    api_base, state = warming_server
+    events = []
+    ready = await config.wait_for_server_ready(
+        api_base,
+        on_progress=events.append,
+        timeout=5,
+        initial_delay=0.01
+    )
+    assert ready
+    assert state["health_calls"] == 3
+    assert [event.stage for event in events] == ["loading", "loading"]
+
+@pytest.mark.asyncio
+async def test_wait_for_server_ready_detects_log_errors(config, tmp_path):
+    log_path = tmp_path / "llama_server.log"
+    log_path.write_text("Starting LlamaFile server...\n")
+    events = []
+
+    async def write_error():
+        await asyncio.sleep(0.05)
+        with open(log_path, "a") as f:
+            f.write("error: failed to load model\n")
+
+    writer = asyncio.create_task(write_error())
+    ready = await config.wait_for_server_ready(
+        "http://127.0.0.1:1/v1",
+        log_path=str(log_path),
+        on_progress=events.append,
+        timeout=5,
+        initial_delay=0.02,
+        max_delay=0.05
+    )
+    await writer
+    assert not ready
+    assert events[-1].stage == "failed"
+    assert "failed to load model" in events[-1].details["log"]
+
+@pytest.mark.asyncio
+async def test_wait_for_server_ready_timeout(config):
+    ready = await config.wait_for_server_ready("http://127.0.0.1:1/v1", timeout=0.1, initial_delay=0.02)
+    assert not ready
+
+@pytest.mark.asyncio
+async def test_probe_server_unreachable():
+    import aiohttp
+    async with aiohttp.ClientSession() as session:
+        assert not await probe_server("http://127.0.0.1:1/v1", session)
+
+@pytest.mark.asyncio
+async def test_probe_server_sends_key_and_accepts_auth_errors():
+    import aiohttp
+    seen = []
+
+    async def models(request):
+        seen.append(request.headers.get("Authorization"))
+        return web.json_response({"error": "invalid key"}, status=401)
+
+    app = web.Application()
+    app.router.add_get("/v1/models", models)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    try:
+        api_base = f"http://127.0.0.1:{runner.addresses[0][1]}/v1"
+        async with aiohttp.ClientSession() as session:
+            # No /health route (404) and a rejected key still mean reachable
+            assert await probe_server(api_base, session, api_key="sk-test")
+    finally:
+        await runner.cleanup()
+    assert seen == ["Bearer sk-test"]
@@ -0,0 +1,65 @@
+import logging
+import pytest
+from langchain_core.language_models import FakeListLLM
+from agents.core.context_budget import ContextBudget
+from agents.core.tokens import count_tokens, encoding_for_model, truncate_tokens
+from agents.experts.rag_agent import RAGAgent
+from agents.experts.web_agent import WebAgent
+
+def test_tokens_per_model_and_truncation():
+    assert encoding_for_model("gpt-4o") == "o200k_base"
+    assert encoding_for_model("TinyLlama-1.1B-Chat") == "cl100k_base"
+    text = "word " * 100
+    assert count_tokens(truncate_tokens(text, 10)) <= 10
+    assert truncate_tokens("short", 10) == "short"
+
+def test_allocation_leaves_the_rest_for_context():
+    budget = ContextBudget(context_window=1000, max_output_tokens=200, safety_margin=0.0)
+    allocation = budget.allocate({"instructions": "x" * 400, "input": "y" * 40})
+    assert allocation["instructions"] == budget.count("x" * 400)
+    assert allocation["context"] == 800 - allocation["instructions"] - allocation["input"]
+    # A full prompt still leaves the minimum for context
+    assert budget.allocate({"history": "z" * 10000})["context"] == budget.min_context_tokens
+
+def test_select_keeps_most_relevant_chunks_in_order():
+    budget = ContextBudget()
+    chunks = ["Navigation menu home about", "Cats sleep sixteen hours a day", "Footer copyright",
+              "Most cats sleep in the afternoon"]
+    size = budget.count(chunks[1]) + budget.count(chunks[3]) + 2
+    selected = budget.select(chunks, size, query="How long do cats sleep?")
+    assert selected == "Cats sleep sixteen hours a day\nMost cats sleep in the afternoon"
+
+def test_fit_logs_tokens_saved(caplog):
+    budget = ContextBudget(context_window=300, max_output_tokens=100, min_context_tokens=20)
+    with caplog.at_level(logging.INFO, logger="smolit"):
+        context = budget.fit("web", {"input": "cats"}, ["filler " * 200, "cats purr"], query="cats")
+    assert context.endswith("\ncats purr")
+    assert "saved" in caplog.text
+    stats = budget.get_stats()
+    assert stats["trimmed"] == 1 and stats["tokens_saved"] > 0
+
+@pytest.mark.asyncio
+async def test_experts_fit_content_into_context_window(tmp_path, monkeypatch):
+    agent = WebAgent(FakeListLLM(responses=["unused"]))
+    agent.context_budget = ContextBudget(context_window=600, max_output_tokens=100)
+    page = {
+        "url": "https://example.com", "title": "Cats", "status": 200,
+        "content": "\n".join(["Unrelated filler text about other things."] * 200 + ["Cats sleep a lot."]),
+        "links": [{"text": "More", "url": "https://example.com/more"}]
+    }
+    content = agent._fit_web_content("Do cats sleep?", page)
+    assert content.startswith("Title: Cats\nURL: https://example.com")
+    assert "Cats sleep a lot." in content
+    assert agent.context_budget.count(content) < 600
+
+    monkeypatch.chdir(tmp_path)
+    rag = RAGAgent(FakeListLLM(responses=["unused"]))
+    rag.context_budget = ContextBudget(context_window=400, max_output_tokens=100)
+
+    async def query(user_input, n_results=3):
+        return [{"content": "best match"}, {"content": "filler " * 1000}]
+
+    rag.knowledge_base.query = query
+    inputs = await rag._prepare_inputs("question")
+    assert inputs["context"].startswith("Document 1:\nbest match\nDocument 2:")
+    assert rag.context_budget.count(inputs["context"]) < 400
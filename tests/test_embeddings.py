@@ -0,0 +1,85 @@
+import uuid
+import numpy as np
+import pytest
+from agents.tools.embeddings import (
+    CachedEmbeddingFunction,
+    EmbeddingCache,
+    HashingEmbeddingFunction,
+    create_embedding_function
+)
+from agents.tools.knowledge_base import KnowledgeBase
+from tests.test_ingest import RecordingEmbeddings
+
+def test_hashing_embeddings_are_normalized_and_deterministic():
+    embed = HashingEmbeddingFunction(dimensions=64)
+    cats, cats_again, stocks = embed(["Cats sleep a lot", "cats SLEEP a lot", "Stock prices fell"])
+    assert cats.shape == (64,)
+    assert np.isclose(np.linalg.norm(cats), 1.0)
+    assert np.allclose(cats, cats_again)
+    assert float(cats @ stocks) < 0.5
+
+def test_cache_only_embeds_misses_and_survives_reopening(tmp_path):
+    embeddings = RecordingEmbeddings()
+    cached = CachedEmbeddingFunction(embeddings, EmbeddingCache(str(tmp_path), "recording"))
+    first = cached(["a", "bb", "a"])
+    assert [texts for texts, _ in embeddings.calls] == [["a", "bb"]]
+    assert np.allclose(first[0], first[2])
+
+    cached.cache.close()
+    reopened = CachedEmbeddingFunction(embeddings, EmbeddingCache(str(tmp_path), "recording"))
+    again = reopened(["bb", "ccc"])
+    assert [texts for texts, _ in embeddings.calls] == [["a", "bb"], ["ccc"]]
+    assert np.allclose(again[0], first[1])
+    assert reopened.cache.get_stats()["hits"] == 1
+
+    # Another model has its own vectors
+    other = EmbeddingCache(str(tmp_path), "other")
+    assert other.get(["a"]) == [None]
+
+def test_cache_file_grows_when_full(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "hashing:8", initial_capacity=2)
+    texts = [f"text {i}" for i in range(5)]
+    vectors = HashingEmbeddingFunction(dimensions=8)(texts)
+    cache.put(texts[:2], vectors[:2])
+    cache.put(texts[2:], vectors[2:])
+    assert np.load(cache.path, mmap_mode="r").shape == (8, 8)
+    assert all(np.allclose(a, b) for a, b in zip(cache.get(texts), vectors))
+    with pytest.raises(ValueError):
+        cache.put(["wrong size"], [np.ones(4)])
+
+def test_caches_sharing_a_directory_do_not_overwrite_each_other(tmp_path):
+    embed = HashingEmbeddingFunction(dimensions=8)
+    first = EmbeddingCache(str(tmp_path), "hashing:8", initial_capacity=2)
+    second = EmbeddingCache(str(tmp_path), "hashing:8", initial_capacity=2)
+    first.put(["from-a"], embed(["from-a"]))
+    second.put(["from-b"], embed(["from-b"]))
+    # The second cache grows (replaces) the file the first one has mapped
+    texts = [f"text {i}" for i in range(5)]
+    second.put(texts, embed(texts))
+    first.put(["late"], embed(["late"]))
+
+    expected = embed(["from-a", "from-b", "late", *texts])
+    for cache in (first, second):
+        found = cache.get(["from-a", "from-b", "late", *texts])
+        assert all(np.allclose(a, b) for a, b in zip(found, expected))
+    assert first.size == second.size == 8
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        create_embedding_function("nonexistent")
+
+@pytest.mark.asyncio
+async def test_knowledge_base_with_cached_hashing_backend(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    knowledge_base = KnowledgeBase(
+        embedding_backend="hashing",
+        collection_name=f"test_{uuid.uuid4().hex}"
+    )
+    await knowledge_base.add_documents(["Cats sleep a lot.", "Stock prices fell today."])
+    results = await knowledge_base.query("how much do cats sleep", n_results=1)
+    assert results[0]["content"] == "Cats sleep a lot."
+
+    await knowledge_base.query("how much do cats sleep", n_results=1)
+    stats = knowledge_base.get_stats()["embedding_cache"]
+    assert stats["model"] == "hashing:384"
+    assert (stats["vectors"], stats["hits"]) == (3, 1)
@@ -0,0 +1,114 @@
+import pytest
+import asyncio
+from langchain_community.chat_models import ChatOpenAI
+from langchain_core.messages import HumanMessage
+from agents.core.config import LLMEndpoint
+from agents.core.endpoint_pool import EndpointPool, PooledChatModel, NoHealthyEndpointError
+from tests.openai_stand_in import OpenAIStandIn
+
+def make_endpoint(name, api_base, weight=1):
+    return LLMEndpoint(name=name, api_base=api_base, api_key="", model="stand-in",
+                       type="openai", weight=weight)
+
+def make_client(endpoint):
+    return ChatOpenAI(model=endpoint.model, openai_api_key="sk-dummy-key",
+                      openai_api_base=endpoint.api_base, max_retries=0)
+
+@pytest.fixture
+async def servers():
+    servers = [await OpenAIStandIn(reply=f"from {i}", delay=0.05).start() for i in range(2)]
+    yield servers
+    for server in servers:
+        await server.stop()
+
+@pytest.mark.asyncio
+async def test_pool_balances_concurrent_requests(servers):
+    pool = EndpointPool([make_endpoint(f"s{i}", s.url) for i, s in enumerate(servers)], make_client)
+    llm = PooledChatModel(pool=pool)
+    replies = await asyncio.gather(*(llm.ainvoke("hi") for _ in range(6)))
+    assert {reply.content for reply in replies} == {"from 0", "from 1"}
+    assert [len(s.requests) for s in servers] == [3, 3]
+
+@pytest.mark.asyncio
+async def test_pool_fails_over_and_ejects(servers):
+    endpoints = [make_endpoint("dead", "http://127.0.0.1:1/v1"), make_endpoint("live", servers[0].url)]
+    pool = EndpointPool(endpoints, make_client, failure_threshold=2, reset_timeout=60)
+    llm = PooledChatModel(pool=pool)
+    for _ in range(4):
+        assert (await llm.ainvoke("hi")).content == "from 0"
+    stats = pool.get_stats()
+    assert stats["dead"]["ejected"] is True
+    # Once ejected, the dead endpoint is no longer tried at all
+    assert stats["dead"]["requests"] == 2
+
+@pytest.mark.asyncio
+async def test_pool_stream_failover(servers):
+    servers[1].failing = True
+    pool = EndpointPool([make_endpoint("failing", servers[1].url), make_endpoint("live", servers[0].url)],
+                        make_client)
+    llm = PooledChatModel(pool=pool)
+    chunks = [chunk.content async for chunk in llm.astream([HumanMessage(content="hi")])]
+    assert "".join(chunks).strip() == "from 0"
+
+@pytest.mark.asyncio
+async def test_pool_health_checks_restore_endpoints(servers):
+    pool = EndpointPool([make_endpoint(f"s{i}", s.url) for i, s in enumerate(servers)], make_client,
+                        failure_threshold=1, reset_timeout=60)
+    servers[1].healthy = False
+    assert await pool.check_health() == {"s0": True, "s1": False}
+    assert pool.get_stats()["s1"]["ejected"] is True
+
+    servers[1].healthy = True
+    await pool.check_health()
+    assert pool.get_stats()["s1"]["ejected"] is False
+
+@pytest.mark.asyncio
+async def test_failed_probes_do_not_postpone_trial_request(servers, monkeypatch):
+    pool = EndpointPool([make_endpoint(f"s{i}", s.url) for i, s in enumerate(servers)], make_client,
+                        failure_threshold=1, reset_timeout=30)
+    clock = [1000.0]
+    monkeypatch.setattr("agents.core.endpoint_pool.time.monotonic", lambda: clock[0])
+    servers[1].healthy = False
+    await pool.check_health()
+    # Probes every 15 s keep failing, but the circuit was opened at t=1000
+    for _ in range(3):
+        clock[0] += 15
+        await pool.check_health()
+    state = pool.states[1]
+    assert state.opened_at == 1000.0
+    assert pool._is_available(state, clock[0])
+
+@pytest.mark.asyncio
+async def test_pool_all_endpoints_down():
+    pool = EndpointPool([make_endpoint("dead", "http://127.0.0.1:1/v1")], make_client,
+                        failure_threshold=1, reset_timeout=60)
+    llm = PooledChatModel(pool=pool)
+    with pytest.raises(Exception):
+        await llm.ainvoke("hi")
+    with pytest.raises(NoHealthyEndpointError):
+        await llm.ainvoke("hi")
+
+def test_pool_cache_key_includes_generation_settings():
+    from agents.core.admitted_model import AdmittedChatModel
+    from agents.core.scheduler import AdmissionController
+    endpoints = [make_endpoint("a", "http://127.0.0.1:1/v1")]
+
+    def llm_string(temperature):
+        pool = EndpointPool(endpoints, lambda endpoint: ChatOpenAI(
+            model=endpoint.model, openai_api_key="sk-dummy-key",
+            openai_api_base=endpoint.api_base, temperature=temperature
+        ))
+        llm = AdmittedChatModel(llm=PooledChatModel(pool=pool), scheduler=AdmissionController())
+        return llm._get_llm_string()
+
+    assert llm_string(0.0) == llm_string(0.0)
+    assert llm_string(0.0) != llm_string(0.9)
+
+@pytest.mark.asyncio
+async def test_multi_agent_system_uses_pool(servers, tmp_path, monkeypatch):
+    from agents.core.multi_agent_system import MultiAgentSystem
+    monkeypatch.chdir(tmp_path)
+    system = MultiAgentSystem(endpoints=[make_endpoint(f"s{i}", s.url) for i, s in enumerate(servers)])
+    assert system.endpoint_pool is not None
+    response = await system.process_input("Hello")
+    assert response in ("from 0", "from 1")
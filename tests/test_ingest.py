@@ -0,0 +1,127 @@
+import time
+import uuid
+import pytest
+from chromadb.api.types import EmbeddingFunction
+from agents.tools.ingest_manifest import IngestManifest
+from agents.tools.knowledge_base import KnowledgeBase
+
+class RecordingEmbeddings(EmbeddingFunction):
+    """Deterministic embeddings that record each request and can be made slow."""
+
+    def __init__(self, delay=0.0, fail_on=None):
+        self.delay = delay
+        self.fail_on = fail_on
+        self.calls = []
+
+    def __call__(self, input):
+        self.calls.append((list(input), time.perf_counter()))
+        if self.fail_on in input:
+            raise RuntimeError("embedding server down")
+        time.sleep(self.delay)
+        return [[float(len(text)), 1.0, 0.0] for text in input]
+
+def make_knowledge_base(tmp_path, monkeypatch, embeddings, batch_size=2):
+    monkeypatch.chdir(tmp_path)
+    return KnowledgeBase(
+        embedding_function=embeddings,
+        batch_size=batch_size,
+        collection_name=f"test_{uuid.uuid4().hex}"
+    )
+
+@pytest.mark.asyncio
+async def test_ingest_batches_embedding_and_insertion(tmp_path, monkeypatch):
+    embeddings = RecordingEmbeddings()
+    knowledge_base = make_knowledge_base(tmp_path, monkeypatch, embeddings)
+    changes = []
+    knowledge_base.add_change_listener(lambda: changes.append(1))
+
+    documents = ["a", "bb", "a", ("ccc", {"source": "notes.txt"}), "dddd"]
+    stats = await knowledge_base.ingest(documents)
+    # The repeated "a" is embedded and stored once
+    assert [texts for texts, _ in embeddings.calls] == [["a", "bb"], ["ccc"], ["dddd"]]
+    assert (stats["documents"], stats["skipped"], stats["failed"], stats["batches"]) == (4, 1, 0, 3)
+    assert stats["docs_per_second"] > 0
+    assert stats["ids"][0] == stats["ids"][2]
+    assert knowledge_base.collection.count() == 4
+    assert changes == [1]
+
+    results = await knowledge_base.query("ccc", n_results=1)
+    assert results[0]["metadata"] == {"source": "notes.txt"}
+
+@pytest.mark.asyncio
+async def test_ingest_embeds_next_batch_while_writing(tmp_path, monkeypatch):
+    embeddings = RecordingEmbeddings(delay=0.05)
+    knowledge_base = make_knowledge_base(tmp_path, monkeypatch, embeddings)
+    writes = []
+    write_batch = knowledge_base._write_batch
+
+    def slow_write(*args):
+        start = time.perf_counter()
+        time.sleep(0.05)
+        writes.append((start, time.perf_counter()))
+        return write_batch(*args)
+
+    knowledge_base._write_batch = slow_write
+
+    async def documents():
+        for i in range(6):
+            yield f"document {i}"
+
+    await knowledge_base.ingest(documents())
+    # The second batch was embedded while the first one was being written
+    assert embeddings.calls[1][1] < writes[0][1]
+
+@pytest.mark.asyncio
+async def test_ingest_reports_failed_batches(tmp_path, monkeypatch):
+    knowledge_base = make_knowledge_base(tmp_path, monkeypatch, RecordingEmbeddings(fail_on="bad"))
+    ids = await knowledge_base.add_documents(["ok", "bad", "fine"])
+    assert len(ids) == 3
+    assert ids[0].startswith("Error adding document") and ids[1].startswith("Error adding document")
+    assert not ids[2].startswith("Error")
+    assert knowledge_base.collection.count() == 1
+
+@pytest.mark.asyncio
+async def test_ids_are_stable_and_reingest_skips_stored_documents(tmp_path, monkeypatch):
+    embeddings = RecordingEmbeddings()
+    knowledge_base = make_knowledge_base(tmp_path, monkeypatch, embeddings)
+    ids = await knowledge_base.add_documents(["Cats sleep a lot.", "Dogs bark."])
+    # sha256 of the whitespace-normalized text, the same in every process
+    assert ids[0] == KnowledgeBase._document_id("  Cats sleep\na lot. ")
+    assert len(ids[0]) == 64
+
+    # A restarted process sees the same collection and re-embeds nothing
+    restarted = KnowledgeBase(
+        embedding_function=embeddings,
+        collection_name=knowledge_base.collection.name
+    )
+    stats = await restarted.ingest(["Cats sleep a lot.", "Dogs bark.", "Birds sing."])
+    assert stats["ids"][:2] == ids
+    assert (stats["documents"], stats["skipped"]) == (1, 2)
+    assert embeddings.calls[-1][0] == ["Birds sing."]
+    assert restarted.collection.count() == 3
+
+@pytest.mark.asyncio
+async def test_manifest_replaces_changed_source_content(tmp_path, monkeypatch):
+    embeddings = RecordingEmbeddings()
+    knowledge_base = make_knowledge_base(tmp_path, monkeypatch, embeddings)
+    shared = ("Shared boilerplate", {"source": "b.txt"})
+    await knowledge_base.ingest([
+        ("Intro", {"source": "a.txt"}), ("Old section", {"source": "a.txt"}),
+        ("Shared boilerplate", {"source": "a.txt"}), shared
+    ])
+    assert knowledge_base.collection.count() == 3
+
+    embeddings.calls.clear()
+    stats = await knowledge_base.ingest([
+        ("Intro", {"source": "a.txt"}), ("New section", {"source": "a.txt"})
+    ])
+    # Only the changed content is embedded; what a.txt no longer has is removed,
+    # except content another source still uses
+    assert [texts for texts, _ in embeddings.calls] == [["New section"]]
+    assert stats["removed"] == 1
+    stored = set(knowledge_base.collection.get()["documents"])
+    assert stored == {"Intro", "New section", "Shared boilerplate"}
+
+    manifest = IngestManifest(knowledge_base.manifest.path)
+    assert manifest.ids("a.txt") == stats["ids"]
+    assert "b.txt" in manifest
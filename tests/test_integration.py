@@ -78,3 +78,58 @@ async def test_error_handling(multi_agent_system):
         response = await multi_agent_system.process_input("Test input")
         assert "Error" in response
 
+
+@pytest.mark.asyncio
+async def test_process_input_stream(multi_agent_system):
+    async def fake_stream(user_input, decision=None):
+        for chunk in ["Hel", "lo"]:
+            yield chunk
+
+    with patch.object(multi_agent_system.supervisor, 'process_stream', side_effect=fake_stream):
+        chunks = [chunk async for chunk in multi_agent_system.process_input_stream("Hi")]
+        assert chunks == ["Hel", "lo"]
+
+    with patch.object(multi_agent_system.supervisor, 'process_stream',
+                     side_effect=Exception("Test error")):
+        chunks = [chunk async for chunk in multi_agent_system.process_input_stream("Hi")]
+        assert "Error" in chunks[-1]
+
+
+@pytest.mark.asyncio
+async def test_speculative_retrieval(tmp_path, monkeypatch):
+    from agents.core.router import RouteDecision
+    monkeypatch.chdir(tmp_path)
+    system = MultiAgentSystem(api_key="test_key")
+    queries = []
+
+    async def slow_query(query, n_results=3):
+        queries.append(query)
+        await asyncio.sleep(0.1)
+        return [{"content": "Cats sleep a lot"}]
+
+    async def slow_route(user_input):
+        await asyncio.sleep(0.1)
+        return RouteDecision("knowledge", "llm", 1.0)
+
+    async def answer(**inputs):
+        return inputs["context"]
+
+    system.rag_agent.knowledge_base.query = slow_query
+    system.rag_agent.chain = Mock(arun=answer, prompt=system.rag_agent.chain.prompt)
+    with patch.object(system.supervisor, 'route', side_effect=slow_route):
+        start = asyncio.get_running_loop().time()
+        response = await system.process_input("Do cats sleep?")
+        elapsed = asyncio.get_running_loop().time() - start
+    assert "Cats sleep a lot" in response
+    # Retrieval overlapped with routing and was not repeated
+    assert elapsed < 0.18
+    assert queries == ["Do cats sleep?"]
+
+    async def list_files(user_input):
+        return "file.txt"
+
+    system.command_agent.process = list_files
+    assert await system.process_input("ls -l") == "file.txt"
+    # The rules routed the command before any retrieval was started
+    assert queries == ["Do cats sleep?"]
+    assert system.get_speculation_stats() == {"started": 1, "used": 1, "discarded": 0, "use_rate": 1.0}
@@ -0,0 +1,223 @@
+import pytest
+import asyncio
+import hashlib
+import os
+from aiohttp import web
+from openhands_client import OpenHandsClient
+
+@pytest.fixture
+async def stand_in_server():
+    peers = []
+
+    async def chat(request):
+        peers.append(request.transport.get_extra_info('peername'))
+        payload = await request.json()
+        return web.json_response({"response": payload["message"]})
+
+    app = web.Application()
+    app.router.add_post("/v1/chat", chat)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    url = f"http://127.0.0.1:{runner.addresses[0][1]}"
+    yield url, peers
+    await runner.cleanup()
+
+@pytest.mark.asyncio
+async def test_client_reuses_connection(stand_in_server):
+    url, peers = stand_in_server
+    async with OpenHandsClient(supervisor_url=url, instance_urls=[url]) as client:
+        for i in range(5):
+            response = await client.send_to_supervisor(f"message {i}")
+            assert response == {"response": f"message {i}"}
+        await client.send_to_instance(0, "instance message")
+    assert len(peers) == 6
+    assert len(set(peers)) == 1
+
+@pytest.mark.asyncio
+async def test_client_close(stand_in_server):
+    url, _ = stand_in_server
+    client = OpenHandsClient(supervisor_url=url)
+    await client.send_to_supervisor("hello")
+    session = client._get_session()
+    await client.close()
+    assert session.closed
+    # A closed client transparently reopens on the next call
+    response = await client.send_to_supervisor("again")
+    assert response == {"response": "again"}
+    await client.close()
+
+@pytest.mark.asyncio
+async def test_client_invalid_instance():
+    async with OpenHandsClient() as client:
+        with pytest.raises(ValueError):
+            await client.send_to_instance(5, "message")
+
+@pytest.fixture
+async def slow_instances():
+    runners, urls = [], []
+    for delay in (0.3, 0.3, 0.3, 2.0):
+        async def chat(request, delay=delay):
+            await asyncio.sleep(delay)
+            payload = await request.json()
+            return web.json_response({"response": f"{payload['message']} after {delay}"})
+
+        app = web.Application()
+        app.router.add_post("/v1/chat", chat)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", 0).start()
+        runners.append(runner)
+        urls.append(f"http://127.0.0.1:{runner.addresses[0][1]}")
+    yield urls
+    for runner in runners:
+        await runner.cleanup()
+
+@pytest.mark.asyncio
+async def test_broadcast_runs_concurrently(slow_instances):
+    urls = slow_instances[:3]
+    async with OpenHandsClient(instance_urls=urls) as client:
+        start = asyncio.get_running_loop().time()
+        results = await client.broadcast("hi", timeout=5)
+        elapsed = asyncio.get_running_loop().time() - start
+    assert sorted(results) == [0, 1, 2]
+    assert all(r["response"] == "hi after 0.3" for r in results.values())
+    # Bounded by the slowest instance, not the sum of all three
+    assert elapsed < 0.8
+
+@pytest.mark.asyncio
+async def test_broadcast_partial_failures(slow_instances):
+    # A slow instance, a healthy one and one that refuses connections
+    urls = [slow_instances[3], slow_instances[0], "http://127.0.0.1:1"]
+    completed = []
+    async with OpenHandsClient(instance_urls=urls) as client:
+        results = await client.broadcast(
+            "hi",
+            timeout=1.0,
+            on_result=lambda instance_id, result: completed.append(instance_id)
+        )
+    assert results[1] == {"response": "hi after 0.3"}
+    assert "timed out" in results[0]["error"]
+    assert "error" in results[2]
+    # Results are delivered as they complete, the timed-out instance last
+    assert completed[-1] == 0
+    assert set(completed) == {0, 1, 2}
+
+class StandInUploadServer:
+    """In-memory stand-in for the supervisor's chunked upload endpoints."""
+
+    def __init__(self, fail_at_offset=None):
+        self.uploads = {}
+        self.completed = {}
+        self.chunk_sizes = []
+        self.fail_at_offset = fail_at_offset
+
+    async def status(self, request):
+        digest = request.match_info['digest']
+        if digest in self.completed:
+            return web.json_response({"file_id": self.completed[digest]})
+        if digest in self.uploads:
+            return web.json_response({"offset": len(self.uploads[digest])})
+        return web.json_response({"error": "unknown upload"}, status=404)
+
+    async def put_chunk(self, request):
+        digest = request.match_info['digest']
+        offset = int(request.headers['Upload-Offset'])
+        total = int(request.headers['Upload-Length'])
+        data = self.uploads.setdefault(digest, bytearray())
+        chunk = await request.read()
+        if offset != len(data):
+            return web.json_response({"offset": len(data)}, status=409)
+        self.chunk_sizes.append(len(chunk))
+        if self.fail_at_offset is not None and offset >= self.fail_at_offset:
+            # Keep half the chunk, then drop the connection mid-transfer
+            self.fail_at_offset = None
+            data.extend(chunk[:len(chunk) // 2])
+            request.transport.close()
+            return web.Response(status=500)
+        data.extend(chunk)
+        if len(data) == total:
+            assert hashlib.sha256(data).hexdigest() == digest
+            self.completed[digest] = f"file-{digest[:8]}"
+            return web.json_response({"file_id": self.completed[digest]})
+        return web.json_response({"offset": len(data)})
+
+async def start_upload_server(handler):
+    app = web.Application(client_max_size=1024 ** 3)
+    if handler is not None:
+        app.router.add_get("/v1/uploads/{digest}", handler.status)
+        app.router.add_put("/v1/uploads/{digest}", handler.put_chunk)
+
+    async def legacy_upload(request):
+        reader = await request.multipart()
+        part = await reader.next()
+        await part.read()
+        return web.json_response({"file_id": "legacy-file"})
+
+    app.router.add_post("/v1/upload", legacy_upload)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    return runner, f"http://127.0.0.1:{runner.addresses[0][1]}"
+
+@pytest.fixture
+def upload_file_path(tmp_path):
+    path = tmp_path / "attachment.bin"
+    path.write_bytes(os.urandom(200_000))
+    return str(path)
+
+@pytest.mark.asyncio
+async def test_upload_file_chunked_with_progress(upload_file_path):
+    handler = StandInUploadServer()
+    runner, url = await start_upload_server(handler)
+    progress = []
+    try:
+        async with OpenHandsClient(supervisor_url=url) as client:
+            file_id = await client.upload_file(
+                upload_file_path,
+                on_progress=lambda sent, total: progress.append((sent, total)),
+                chunk_size=64 * 1024
+            )
+    finally:
+        await runner.cleanup()
+    assert file_id.startswith("file-")
+    assert max(handler.chunk_sizes) <= 64 * 1024
+    assert progress[-1] == (200_000, 200_000)
+    assert [sent for sent, _ in progress] == sorted(sent for sent, _ in progress)
+
+@pytest.mark.asyncio
+async def test_upload_file_skips_known_content(upload_file_path):
+    handler = StandInUploadServer()
+    runner, url = await start_upload_server(handler)
+    try:
+        async with OpenHandsClient(supervisor_url=url) as client:
+            first = await client.upload_file(upload_file_path, chunk_size=64 * 1024)
+            sent_chunks = len(handler.chunk_sizes)
+            second = await client.upload_file(upload_file_path, chunk_size=64 * 1024)
+    finally:
+        await runner.cleanup()
+    assert first == second
+    assert len(handler.chunk_sizes) == sent_chunks
+
+@pytest.mark.asyncio
+async def test_upload_file_resumes_after_failure(upload_file_path):
+    handler = StandInUploadServer(fail_at_offset=100_000)
+    runner, url = await start_upload_server(handler)
+    try:
+        async with OpenHandsClient(supervisor_url=url) as client:
+            file_id = await client.upload_file(upload_file_path, chunk_size=64 * 1024)
+    finally:
+        await runner.cleanup()
+    assert file_id.startswith("file-")
+    # Only the lost half-chunk is re-sent, not the whole file
+    assert sum(handler.chunk_sizes) < 200_000 + 64 * 1024
+
+@pytest.mark.asyncio
+async def test_upload_file_falls_back_to_multipart(upload_file_path):
+    runner, url = await start_upload_server(None)
+    try:
+        async with OpenHandsClient(supervisor_url=url) as client:
+            file_id = await client.upload_file(upload_file_path)
+    finally:
+        await runner.cleanup()
+    assert file_id == "legacy-file"
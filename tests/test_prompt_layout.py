@@ -0,0 +1,51 @@
+import pytest
+from langchain_core.language_models import FakeListLLM
+from agents.core.base_agent import BaseAgent
+from agents.experts.command_agent import CommandExecutionAgent
+from agents.experts.web_agent import WebAgent
+from tests.openai_stand_in import OpenAIStandIn
+
+HISTORY = "Human: first question\nAI: first answer"
+
+@pytest.mark.parametrize("agent_class, volatile", [
+    (BaseAgent, {}),
+    (CommandExecutionAgent, {"allowed_commands": "ls, pwd"}),
+    (WebAgent, {"web_content": "page text"}),
+])
+def test_prompt_prefix_is_stable_across_turns(agent_class, volatile):
+    prompt = agent_class(FakeListLLM(responses=["reply"])).chain.prompt
+    turn1 = prompt.format(history=HISTORY, input="second question", **volatile)
+    turn2 = prompt.format(
+        history=f"{HISTORY}\nHuman: second question\nAI: second answer",
+        input="third question",
+        **{key: f"{value} (changed)" if key != "allowed_commands" else value for key, value in volatile.items()}
+    )
+    # Everything up to and including the history is reused on the next turn
+    prefix = turn1[:turn1.index(HISTORY) + len(HISTORY)]
+    assert turn2.startswith(prefix)
+    assert turn1.index(HISTORY) > 0
+
+@pytest.fixture
+async def server():
+    server = await OpenAIStandIn().start()
+    yield server
+    await server.stop()
+
+@pytest.mark.asyncio
+async def test_server_options_reach_llama_server(server, tmp_path, monkeypatch):
+    from agents.core.multi_agent_system import MultiAgentSystem
+    monkeypatch.chdir(tmp_path)
+    system = MultiAgentSystem(
+        api_base=server.url,
+        server_options={"cache_prompt": True},
+        agent_slots={"supervisor": 0, "command": 1}
+    )
+    assert await system.process_input("hello") == "Stand-in reply"
+    assert server.requests[-1]["cache_prompt"] is True
+    assert server.requests[-1]["id_slot"] == 0
+
+    chunks = [chunk async for chunk in system.process_input_stream("ls -l")]
+    assert "".join(chunks).strip() == "Stand-in reply"
+    assert server.requests[-1]["stream"] is True
+    assert server.requests[-1]["cache_prompt"] is True
+    assert server.requests[-1]["id_slot"] == 1
@@ -0,0 +1,76 @@
+import pytest
+import time
+from langchain_core.language_models import FakeListLLM, FakeStreamingListLLM
+from langchain_core.outputs import Generation
+from agents.core.base_agent import BaseAgent
+from agents.core.response_cache import ResponseCache
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "responses.sqlite")
+
+def test_cache_hit_and_miss(cache_path):
+    cache = ResponseCache(path=cache_path)
+    assert cache.lookup("prompt", "llm") is None
+    cache.update("prompt", "llm", [Generation(text="cached")])
+    assert cache.lookup("prompt", "llm")[0].text == "cached"
+    # Different sampling parameters or endpoints are different entries
+    assert cache.lookup("prompt", "llm temperature=0.5") is None
+    assert ResponseCache(path=None, namespace="other").lookup("prompt", "llm") is None
+    stats = cache.get_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+
+def test_cache_persists_to_disk(cache_path):
+    cache = ResponseCache(path=cache_path)
+    cache.update("prompt", "llm", [Generation(text="persisted")])
+    cache.close()
+
+    reopened = ResponseCache(path=cache_path)
+    assert reopened.lookup("prompt", "llm")[0].text == "persisted"
+
+def test_cache_ttl(cache_path):
+    cache = ResponseCache(path=cache_path, ttl=0.05)
+    cache.update("prompt", "llm", [Generation(text="short lived")])
+    time.sleep(0.1)
+    assert cache.lookup("prompt", "llm") is None
+    assert cache.get_stats()["disk_entries"] == 0
+
+def test_cache_size_eviction(cache_path):
+    cache = ResponseCache(path=cache_path, max_entries=2, max_bytes=2000)
+    for i in range(10):
+        cache.update(f"prompt {i}", "llm", [Generation(text="x" * 200)])
+    stats = cache.get_stats()
+    assert stats["memory_entries"] == 2
+    assert stats["disk_bytes"] <= 2000
+    assert cache.lookup("prompt 9", "llm") is not None
+    assert cache.lookup("prompt 0", "llm") is None
+
+@pytest.mark.asyncio
+async def test_agent_uses_llm_cache(cache_path):
+    cache = ResponseCache(path=cache_path)
+    llm = FakeListLLM(responses=["first", "second"], cache=cache)
+    agent = BaseAgent(llm)
+    assert await agent.process("Same question") == "first"
+    await agent.clear_memory()
+    assert await agent.process("Same question") == "first"
+    assert cache.hits == 1
+
+@pytest.mark.asyncio
+async def test_agent_stream_uses_llm_cache(cache_path):
+    cache = ResponseCache(path=cache_path)
+    llm = FakeStreamingListLLM(responses=["streamed", "other"], cache=cache)
+    agent = BaseAgent(llm)
+    assert "".join([c async for c in agent.process_stream("Same question")]) == "streamed"
+    await agent.clear_memory()
+    # Streamed and non-streamed calls share cache entries
+    assert await agent.process("Same question") == "streamed"
+    assert cache.hits == 1
+
+def test_multi_agent_system_cache_defaults(tmp_path, monkeypatch):
+    from agents.core.multi_agent_system import MultiAgentSystem
+    monkeypatch.chdir(tmp_path)
+    assert MultiAgentSystem(api_key="test_key").get_cache_stats() == {"enabled": False}
+    system = MultiAgentSystem(api_key="test_key", temperature=0)
+    assert system.get_cache_stats()["enabled"] is True
+    assert system.llm.cache is system.response_cache
@@ -0,0 +1,111 @@
+import pytest
+from unittest.mock import Mock
+from langchain_core.language_models import FakeListLLM, FakeStreamingListLLM
+from agents.core.router import ExpertRouter
+from agents.core.supervisor import SupervisorAgent
+
+DESCRIPTIONS = {
+    "command": "run shell commands on the system",
+    "knowledge": "answer questions from stored documents",
+    "web": "browse web pages and search the internet"
+}
+
+def bag_of_words(texts):
+    vocabulary = sorted({word for text in DESCRIPTIONS.values() for word in text.split()})
+    return [[float(word in text.lower().split()) for word in vocabulary] for text in texts]
+
+def make_expert(reply):
+    expert = Mock(spec=["process", "get_memory"])
+    async def process(user_input):
+        return reply
+    expert.process = process
+    return expert
+
+@pytest.fixture
+def experts():
+    return {name: make_expert(f"{name} reply") for name in DESCRIPTIONS}
+
+@pytest.mark.asyncio
+async def test_router_rules_tier():
+    router = ExpertRouter(DESCRIPTIONS, shell_commands=["ls", "pwd"])
+    decision = await router.route("summarize https://example.com/page", DESCRIPTIONS)
+    assert (decision.expert, decision.tier) == ("web", "rules")
+    decision = await router.route("ls -l", DESCRIPTIONS)
+    assert (decision.expert, decision.tier) == ("command", "rules")
+    # Rules only target experts that exist
+    assert await router.route("ls -l", ["knowledge"]) is None
+
+@pytest.mark.asyncio
+async def test_router_rules_ignore_plain_language():
+    from agents.tools.command_executor import CommandExecutor
+    executor = CommandExecutor()
+    router = ExpertRouter(DESCRIPTIONS, shell_commands=executor.allowed_commands,
+                          command_validator=executor.is_safe_command)
+    assert (await router.route("find . -name *.py", DESCRIPTIONS)).expert == "command"
+    assert (await router.route("cat notes.txt", DESCRIPTIONS)).expert == "command"
+    assert await router.route("find me a recipe", DESCRIPTIONS) is None
+    assert await router.route("cat videos are funny?", DESCRIPTIONS) is None
+    # Commands the executor would refuse are left to the LLM
+    assert await router.route("ls -l; rm -rf /", DESCRIPTIONS) is None
+
+@pytest.mark.asyncio
+async def test_web_agent_browses_url_inside_request():
+    from agents.experts.web_agent import WebAgent
+    agent = WebAgent(FakeListLLM(responses=["unused"]))
+    browsed = []
+
+    async def browse(url):
+        browsed.append(url)
+        return {"url": url, "title": "Page", "content": "Page text"}
+
+    agent.browser.browse = browse
+    inputs = await agent._prepare_inputs("summarize https://example.com/page.")
+    assert browsed == ["https://example.com/page"]
+    assert "Page text" in inputs["web_content"]
+
+@pytest.mark.asyncio
+async def test_router_embedding_tier():
+    embed = Mock(side_effect=bag_of_words)
+    router = ExpertRouter(DESCRIPTIONS, embedding_function=embed, threshold=0.3)
+    decision = await router.route("search the internet for news", DESCRIPTIONS)
+    assert (decision.expert, decision.tier) == ("web", "embedding")
+    # Ambiguous or unrelated requests are left to the LLM
+    assert await router.route("hello there", DESCRIPTIONS) is None
+    # Expert descriptions are embedded only once
+    assert embed.call_count == 3
+
+@pytest.mark.asyncio
+async def test_router_embedding_errors_back_off():
+    embed = Mock(side_effect=Exception("Embedding server down"))
+    router = ExpertRouter(DESCRIPTIONS, embedding_function=embed)
+    assert await router.route("search the internet", DESCRIPTIONS) is None
+    assert await router.route("search the internet", DESCRIPTIONS) is None
+    assert embed.call_count == 1
+
+@pytest.mark.asyncio
+async def test_supervisor_skips_llm_for_confident_routes(experts):
+    llm = FakeListLLM(responses=["EXPERT: knowledge", "unused"])
+    supervisor = SupervisorAgent(llm, experts, DESCRIPTIONS, embedding_function=bag_of_words)
+    supervisor.router.threshold = 0.3
+    assert await supervisor.process("pwd") == "command reply"
+    assert await supervisor.process("browse web pages") == "web reply"
+    assert llm.i == 0
+
+    # Low confidence falls back to the LLM, which delegates
+    assert await supervisor.process("what did we store about cats") == "knowledge reply"
+    assert llm.i == 1
+
+    stats = supervisor.get_routing_stats()
+    assert stats["total"] == 3
+    assert {tier: s["hits"] for tier, s in stats["tiers"].items()} == {"rules": 1, "embedding": 1, "llm": 1}
+
+@pytest.mark.asyncio
+async def test_supervisor_stream_llm_tier(experts):
+    llm = FakeStreamingListLLM(responses=["EXPERT: web", "Hi! How can I help?"])
+    supervisor = SupervisorAgent(llm, experts, DESCRIPTIONS)
+    chunks = [chunk async for chunk in supervisor.process_stream("what's new today")]
+    assert "".join(chunks) == "web reply"
+    # Replies that aren't delegations stream straight through
+    chunks = [chunk async for chunk in supervisor.process_stream("hello")]
+    assert "".join(chunks) == "Hi! How can I help?"
+    assert len(chunks) > 1
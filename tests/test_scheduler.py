@@ -0,0 +1,113 @@
+import pytest
+import asyncio
+from unittest.mock import AsyncMock
+from langchain_core.language_models import FakeListChatModel
+from agents.core.scheduler import AdmissionController, AdmissionRejected, Priority
+
+async def hold(controller, order, name, priority=Priority.INTERACTIVE, duration=0.05, timeout=None):
+    async with controller.slot(priority, timeout):
+        order.append(name)
+        await asyncio.sleep(duration)
+
+@pytest.mark.asyncio
+async def test_concurrency_is_bounded():
+    controller = AdmissionController(max_concurrent=2)
+    peak = 0
+
+    async def work():
+        nonlocal peak
+        async with controller.slot():
+            peak = max(peak, controller.active)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(work() for _ in range(10)))
+    assert peak == 2
+    stats = controller.get_stats()
+    assert stats["active"] == 0
+    assert stats["priorities"]["interactive"]["admitted"] == 10
+    assert stats["priorities"]["interactive"]["max_wait_ms"] > 0
+
+@pytest.mark.asyncio
+async def test_interactive_requests_jump_the_queue():
+    controller = AdmissionController(max_concurrent=1)
+    order = []
+    running = asyncio.create_task(hold(controller, order, "first"))
+    await asyncio.sleep(0)
+    background = [
+        asyncio.create_task(hold(controller, order, f"background {i}", Priority.BACKGROUND, 0.01))
+        for i in range(2)
+    ]
+    await asyncio.sleep(0)
+    interactive = asyncio.create_task(hold(controller, order, "interactive", duration=0.01))
+    await asyncio.sleep(0)
+    assert controller.get_stats()["queue_depth"] == 3
+    await asyncio.gather(running, interactive, *background)
+    assert order == ["first", "interactive", "background 0", "background 1"]
+
+@pytest.mark.asyncio
+async def test_full_queue_sheds_load():
+    controller = AdmissionController(max_concurrent=1, max_queue=1)
+    order = []
+    running = asyncio.create_task(hold(controller, order, "first"))
+    await asyncio.sleep(0)
+    queued = asyncio.create_task(hold(controller, order, "background", Priority.BACKGROUND))
+    await asyncio.sleep(0)
+    # A higher-priority request displaces the queued background one
+    interactive = asyncio.create_task(hold(controller, order, "interactive"))
+    await asyncio.sleep(0)
+    with pytest.raises(AdmissionRejected):
+        await queued
+    # With only interactive work queued, new requests are rejected
+    with pytest.raises(AdmissionRejected):
+        await hold(controller, order, "rejected")
+    await asyncio.gather(running, interactive)
+    assert order == ["first", "interactive"]
+    assert controller.get_stats()["priorities"]["background"]["shed"] == 1
+
+@pytest.mark.asyncio
+async def test_queue_deadline():
+    controller = AdmissionController(max_concurrent=1)
+    order = []
+    running = asyncio.create_task(hold(controller, order, "first", duration=0.2))
+    await asyncio.sleep(0)
+    with pytest.raises(AdmissionRejected):
+        await hold(controller, order, "late", timeout=0.05)
+    await running
+    # The timed-out waiter doesn't hold on to a slot
+    await asyncio.wait_for(hold(controller, order, "next", duration=0), 1)
+    assert order == ["first", "next"]
+    assert controller.get_stats()["priorities"]["interactive"]["timed_out"] == 1
+
+@pytest.mark.asyncio
+async def test_multi_agent_system_sheds_when_full(tmp_path, monkeypatch):
+    from agents.core.multi_agent_system import MultiAgentSystem
+    monkeypatch.chdir(tmp_path)
+    system = MultiAgentSystem(api_key="test_key", max_concurrent=1, max_queue=0)
+    system.llm.llm = FakeListChatModel(responses=["Done"], sleep=0.1)
+
+    responses = await asyncio.gather(
+        system.process_input("ls -l"),
+        system.process_input("pwd")
+    )
+    assert responses[0] == "Done"
+    assert responses[1].startswith("Error")
+    assert system.get_scheduler_stats()["priorities"]["interactive"]["shed"] == 1
+
+@pytest.mark.asyncio
+async def test_slots_are_held_per_llm_call(tmp_path, monkeypatch):
+    from agents.core.multi_agent_system import MultiAgentSystem
+    monkeypatch.chdir(tmp_path)
+    system = MultiAgentSystem(api_key="test_key", max_concurrent=1, max_queue=0)
+    system.supervisor.router.embedding_function = None
+    system.llm.llm = FakeListChatModel(responses=["EXPERT: command", "file.txt"])
+
+    # Routing and the expert's answer are two calls, each admitted on its own
+    assert await system.process_input("please show me the files here", priority=Priority.BACKGROUND) == "file.txt"
+    stats = system.get_scheduler_stats()
+    assert stats["active"] == 0
+    assert stats["priorities"]["background"]["admitted"] == 2
+
+    # Ingesting makes no LLM calls, so it doesn't wait for (or hold) a slot
+    system.rag_agent.knowledge_base.ingest = AsyncMock(return_value={"ids": ["doc"]})
+    async with system.scheduler.slot():
+        assert await asyncio.wait_for(system.add_knowledge(["It rains today"]), 1) == ["doc"]
@@ -0,0 +1,110 @@
+import pytest
+from unittest.mock import Mock, patch
+from agents.core.semantic_cache import SemanticCache
+
+VOCABULARY = ["weather", "today", "tomorrow", "python", "install", "how", "is", "the"]
+
+def bag_of_words(texts):
+    """Tiny deterministic embedding for tests."""
+    return [
+        [text.lower().count(word) for word in VOCABULARY]
+        for text in texts
+    ]
+
+@pytest.fixture
+def semantic_cache():
+    return SemanticCache(bag_of_words, threshold=0.9)
+
+@pytest.mark.asyncio
+async def test_semantic_cache_near_duplicates(semantic_cache):
+    await semantic_cache.update("How is the weather today?", "Sunny", scope="web")
+    assert await semantic_cache.lookup("how is the weather today", scope="web") == "Sunny"
+    assert await semantic_cache.lookup("How to install python", scope="web") is None
+    stats = semantic_cache.get_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+@pytest.mark.asyncio
+async def test_semantic_cache_scopes(semantic_cache):
+    await semantic_cache.update("How is the weather today?", "Sunny", scope="web")
+    assert await semantic_cache.lookup("How is the weather today?", scope="knowledge") is None
+    semantic_cache.invalidate("web")
+    assert await semantic_cache.lookup("How is the weather today?", scope="web") is None
+
+@pytest.mark.asyncio
+async def test_semantic_cache_invalidate_suffix(semantic_cache):
+    await semantic_cache.update("How is the weather today?", "Sunny", scope="alice/knowledge")
+    await semantic_cache.update("How is the weather today?", "Cloudy", scope="bob/knowledge")
+    await semantic_cache.update("How is the weather today?", "Rainy", scope="alice/web")
+    semantic_cache.invalidate_suffix("/knowledge")
+    assert await semantic_cache.lookup("How is the weather today?", scope="alice/knowledge") is None
+    assert await semantic_cache.lookup("How is the weather today?", scope="bob/knowledge") is None
+    assert await semantic_cache.lookup("How is the weather today?", scope="alice/web") == "Rainy"
+
+@pytest.mark.asyncio
+async def test_semantic_cache_max_entries():
+    cache = SemanticCache(bag_of_words, threshold=0.99, max_entries=2)
+    await cache.update("weather today", "a")
+    await cache.update("python install", "b")
+    await cache.update("weather tomorrow", "c")
+    assert cache.get_stats()["entries"]["default"] == 2
+    assert await cache.lookup("weather today") is None
+
+@pytest.mark.asyncio
+async def test_semantic_cache_embedding_errors():
+    cache = SemanticCache(Mock(side_effect=Exception("Embedding server down")))
+    await cache.update("weather today", "a")
+    assert await cache.lookup("weather today") is None
+
+@pytest.mark.asyncio
+async def test_multi_agent_system_semantic_cache(tmp_path, monkeypatch):
+    from agents.core.multi_agent_system import MultiAgentSystem
+    monkeypatch.chdir(tmp_path)
+    system = MultiAgentSystem(
+        api_key="test_key",
+        semantic_cache=SemanticCache(bag_of_words, threshold=0.9)
+    )
+    supervisor_process = Mock(side_effect=["Sunny", "Rainy"])
+
+    async def process(user_input, decision=None):
+        return supervisor_process(user_input)
+
+    with patch.object(system.supervisor, 'process', side_effect=process):
+        assert await system.process_input("How is the weather today?") == "Sunny"
+        assert await system.process_input("how is the weather today") == "Sunny"
+        assert supervisor_process.call_count == 1
+
+        # Changing the knowledge base invalidates cached answers
+        system.rag_agent.knowledge_base.collection = Mock(**{"get.return_value": {"ids": []}})
+        system.rag_agent.knowledge_base.embedding_function = Mock(return_value=[[0.0]])
+        await system.add_knowledge(["It rains today"])
+        assert await system.process_input("how is the weather today") == "Rainy"
+        assert supervisor_process.call_count == 2
+
+@pytest.mark.asyncio
+async def test_semantic_cache_is_per_session(tmp_path, monkeypatch):
+    from agents.core.multi_agent_system import MultiAgentSystem
+    monkeypatch.chdir(tmp_path)
+    system = MultiAgentSystem(
+        api_key="test_key",
+        semantic_cache=SemanticCache(bag_of_words, threshold=0.9)
+    )
+    answers = {"alice": "Your name is Alice", "bob": "Your name is Bob"}
+
+    async def process(user_input, decision=None):
+        return answers[system.sessions.current().session_id]
+
+    with patch.object(system.supervisor, 'process', side_effect=process):
+        assert await system.process_input("What's my name?", session_id="alice") == "Your name is Alice"
+        # Another session's history-dependent answer is not reused
+        assert await system.process_input("What's my name?", session_id="bob") == "Your name is Bob"
+        assert system.semantic_cache.hits == 0
+
+        system.drop_session("alice")
+        assert not any(scope.startswith("alice/") for scope in system.get_cache_stats()["semantic"]["entries"])
+
+        # Evicted sessions take their cached answers with them
+        assert "bob/supervisor" in system.get_cache_stats()["semantic"]["entries"]
+        system.sessions.max_sessions = 1
+        system.sessions.get("carol")
+        assert not any(scope.startswith("bob/") for scope in system.get_cache_stats()["semantic"]["entries"])
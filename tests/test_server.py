@@ -0,0 +1,130 @@
+import json
+import pytest
+import asyncio
+from aiohttp.test_utils import TestClient, TestServer
+from openhands_client import OpenHandsClient
+from server import create_app
+
+class FakeSystem:
+    """Stands in for MultiAgentSystem, tracking concurrency and closed streams."""
+
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self.streams_closed = 0
+
+    async def process_input(self, user_input, priority=None, session_id=None):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.05)
+        self.active -= 1
+        return f"answer to {user_input}"
+
+    async def process_input_stream(self, user_input, priority=None, session_id=None):
+        try:
+            for word in ("streamed", " answer"):
+                await asyncio.sleep(0)
+                yield word
+        finally:
+            self.streams_closed += 1
+
+    async def add_knowledge(self, documents):
+        return [str(i) for i, _ in enumerate(documents)]
+
+    async def browse_url(self, url):
+        return {"url": url, "content": "page"}
+
+    async def execute_command(self, command):
+        return {"command": command, "output": "ok"}
+
+    def get_cache_stats(self):
+        return {"enabled": False}
+
+    def get_routing_stats(self):
+        return {"total": 0}
+
+    def get_scheduler_stats(self):
+        return {"active": self.active}
+
+    def get_session_stats(self):
+        return {"resident": 1}
+
+@pytest.fixture
+async def client():
+    system = FakeSystem()
+    client = TestClient(TestServer(create_app(system, enable_execute=True)))
+    await client.start_server()
+    client.system = system
+    yield client
+    await client.close()
+
+async def test_chat_serves_concurrent_clients(client):
+    responses = await asyncio.gather(*(
+        client.post("/v1/chat", json={"message": f"q{i}"}) for i in range(4)
+    ))
+    bodies = [await response.json() for response in responses]
+    assert bodies == [{"response": f"answer to q{i}"} for i in range(4)]
+    assert client.system.peak == 4
+
+async def test_chat_streams_server_sent_events(client):
+    response = await client.post("/v1/chat", json={"message": "hi", "stream": True})
+    assert response.headers["Content-Type"] == "text/event-stream"
+    events = (await response.text()).strip().split("\n\n")
+    chunks = [json.loads(event[len("data: "):])["chunk"] for event in events[:-1]]
+    assert "".join(chunks) == "streamed answer"
+    assert events[-1].startswith("event: done")
+    assert client.system.streams_closed == 1
+
+async def test_tool_endpoints_and_validation(client):
+    response = await client.post("/v1/knowledge", json={"documents": ["a", "b"]})
+    assert await response.json() == {"ids": ["0", "1"]}
+    response = await client.post("/v1/browse", json={"url": "https://example.com"})
+    assert (await response.json())["content"] == "page"
+    response = await client.post("/v1/execute", json={"command": "ls"})
+    assert (await response.json())["output"] == "ok"
+
+    response = await client.post("/v1/chat", json={})
+    assert response.status == 400
+    assert "message" in (await response.json())["error"]
+    response = await client.post("/v1/chat", data="not json")
+    assert response.status == 400
+
+    response = await client.get("/v1/stats")
+    assert set(await response.json()) == {"cache", "routing", "scheduler", "sessions"}
+    response = await client.get("/health")
+    assert await response.json() == {"status": "ok"}
+
+async def test_api_token_and_disabled_execute():
+    client = TestClient(TestServer(create_app(FakeSystem(), api_token="secret")))
+    await client.start_server()
+    try:
+        response = await client.post("/v1/browse", json={"url": "https://example.com"})
+        assert response.status == 401
+        assert "error" in await response.json()
+        response = await client.post("/v1/chat", json={"message": "hi"},
+                                     headers={"Authorization": "Bearer wrong"})
+        assert response.status == 401
+        response = await client.post("/v1/chat", json={"message": "hi"},
+                                     headers={"Authorization": "Bearer secret"})
+        assert await response.json() == {"response": "answer to hi"}
+        # Shell commands are off unless enabled
+        response = await client.post("/v1/execute", json={"command": "ls"},
+                                     headers={"Authorization": "Bearer secret"})
+        assert response.status == 404
+        response = await client.get("/health")
+        assert response.status == 200
+    finally:
+        await client.close()
+
+def test_remote_host_needs_api_token(monkeypatch):
+    from server import main
+    monkeypatch.delenv("SMOLIT_API_TOKEN", raising=False)
+    with pytest.raises(SystemExit):
+        main(["--host", "0.0.0.0"])
+
+async def test_openhands_client_talks_to_server(client):
+    openhands = OpenHandsClient(supervisor_url=str(client.make_url("")).rstrip("/"), instance_urls=[])
+    try:
+        assert await openhands.send_to_supervisor("hello") == {"response": "answer to hello"}
+    finally:
+        await openhands.close()
@@ -0,0 +1,77 @@
+import pytest
+import asyncio
+from langchain_core.language_models import FakeStreamingListLLM
+from agents.core.sessions import DEFAULT_SESSION, SessionManager
+from agents.core.token_memory import TokenBudgetMemory
+
+def build_memory(agent, max_token_limit, turn_store):
+    return TokenBudgetMemory(max_token_limit=max_token_limit, chat_memory=turn_store.view(agent))
+
+def chat(sessions, session_id, message):
+    with sessions.use(session_id):
+        sessions.memory("agent", 1000).save_context({"input": message}, {"text": f"re: {message}"})
+
+def history(sessions, session_id):
+    with sessions.use(session_id):
+        return sessions.memory("agent", 1000).load_memory_variables({})["history"]
+
+def test_sessions_keep_separate_memory():
+    sessions = SessionManager(build_memory)
+    chat(sessions, "alice", "hi from alice")
+    chat(sessions, "bob", "hi from bob")
+    assert "alice" in history(sessions, "alice") and "bob" not in history(sessions, "alice")
+    assert "bob" in history(sessions, "bob") and "alice" not in history(sessions, "bob")
+    assert history(sessions, DEFAULT_SESSION) == ""
+
+def test_lru_sessions_spill_to_disk_and_restore(tmp_path):
+    sessions = SessionManager(build_memory, max_sessions=2, path=str(tmp_path / "sessions.sqlite"))
+    for name in ("a", "b", "c"):
+        chat(sessions, name, f"message {name}")
+    assert "a" not in sessions and "c" in sessions
+    assert sessions.get_stats()["spilled"] == 1
+
+    assert history(sessions, "a") == "Human: message a\nAI: re: message a"
+    assert sessions.get_stats()["restored"] == 1
+
+def test_token_cap_and_idle_timeout_drop_sessions():
+    sessions = SessionManager(build_memory, max_tokens=40)
+    chat(sessions, "a", "word " * 20)
+    chat(sessions, "b", "word " * 20)
+    assert "a" not in sessions and "b" in sessions
+    # Without a store, evicted sessions start over
+    assert history(sessions, "a") == ""
+
+    sessions = SessionManager(build_memory, idle_timeout=0)
+    chat(sessions, "a", "hello")
+    with sessions.use("b"):
+        # A session with a request in flight is not evicted
+        with sessions.use("c"):
+            assert "b" in sessions and "a" not in sessions
+
+def test_eviction_listener_sees_evicted_and_dropped_sessions():
+    released = []
+    sessions = SessionManager(build_memory, max_sessions=2, on_evict=released.append)
+    for name in ("a", "b", "c"):
+        chat(sessions, name, f"message {name}")
+    sessions.drop("c")
+    assert released == ["a", "c"]
+
+@pytest.mark.asyncio
+async def test_multi_agent_system_sessions_share_agents(tmp_path, monkeypatch):
+    from agents.core.multi_agent_system import MultiAgentSystem
+    monkeypatch.chdir(tmp_path)
+    system = MultiAgentSystem(api_key="test_key")
+    agent = system.command_agent
+    agent.llm = FakeStreamingListLLM(responses=["one", "two", "unused"])
+    agent.chain.llm = agent.llm
+
+    await asyncio.gather(
+        system.process_input("ls alice", session_id="alice"),
+        system.process_input("ls bob", session_id="bob")
+    )
+    assert system.command_agent is agent
+    with system.sessions.use("alice"):
+        alice = agent.get_memory()["history"]
+    assert "ls alice" in alice and "ls bob" not in alice
+    assert len(system.turn_store) == 0
+    assert system.get_session_stats()["resident"] == 3
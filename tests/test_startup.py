@@ -0,0 +1,74 @@
+import os
+import sys
+import subprocess
+import pytest
+from unittest.mock import Mock
+from agents.core.expert_registry import ExpertRegistry
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cold-start budget for importing the multi-agent system, in microseconds
+IMPORT_BUDGET_US = 300_000
+
+HEAVY_MODULES = ["chromadb", "langchain_community", "langchain", "bs4", "requests", "numpy"]
+
+def run_python(*args):
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        timeout=120
+    )
+
+def test_import_time_budget():
+    result = run_python("-X", "importtime", "-c", "import agents.core.multi_agent_system")
+    assert result.returncode == 0, result.stderr
+    lines = [line for line in result.stderr.splitlines() if line.startswith("import time:")]
+    cumulative = {
+        line.split("|")[2].strip(): int(line.split("|")[1])
+        for line in lines[1:]
+    }
+    assert cumulative["agents.core.multi_agent_system"] < IMPORT_BUDGET_US
+    for module in HEAVY_MODULES:
+        assert module not in cumulative, f"{module} imported eagerly"
+
+def test_experts_built_on_first_use():
+    script = "\n".join([
+        "import sys",
+        "from agents.core.multi_agent_system import MultiAgentSystem",
+        "system = MultiAgentSystem(api_key='test_key')",
+        "assert 'chromadb' not in sys.modules",
+        "assert 'bs4' not in sys.modules",
+        "assert sorted(system.experts) == ['command', 'knowledge', 'web']",
+        "assert not system.experts.is_loaded('knowledge')",
+        "system.web_agent",
+        "assert 'bs4' in sys.modules",
+        "assert 'chromadb' not in sys.modules",
+    ])
+    result = run_python("-c", script)
+    assert result.returncode == 0, result.stderr
+
+def test_expert_registry_lazy_factories():
+    factory = Mock(return_value="agent")
+    registry = ExpertRegistry()
+    registry.register("expert", factory)
+    assert "expert" in registry
+    assert len(registry) == 1
+    assert not registry.is_loaded("expert")
+    factory.assert_not_called()
+
+    assert registry["expert"] == "agent"
+    assert registry["expert"] == "agent"
+    factory.assert_called_once()
+    assert registry.loaded() == {"expert": "agent"}
+
+def test_expert_registry_direct_assignment():
+    registry = ExpertRegistry()
+    registry.register("lazy", Mock())
+    registry["direct"] = "agent"
+    assert list(registry) == ["lazy", "direct"]
+    del registry["lazy"]
+    assert list(registry) == ["direct"]
+    with pytest.raises(KeyError):
+        registry["lazy"]
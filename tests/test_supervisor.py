@@ -62,3 +62,93 @@ async def test_supervisor_error_handling(supervisor_agent):
         response = await supervisor_agent.process("Test input")
         assert "Error" in response
 
+
+@pytest.mark.asyncio
+async def test_supervisor_process_stream(mock_expert):
+    from langchain_core.language_models import FakeStreamingListLLM
+    llm = FakeStreamingListLLM(responses=["  Routed reply</s>"])
+    supervisor = SupervisorAgent(llm, {"test_expert": mock_expert})
+    chunks = [chunk async for chunk in supervisor.process_stream("Test input")]
+    assert "".join(chunks) == "Routed reply"
+
+
+def make_slow_expert(reply, delay, events=None):
+    expert = Mock(spec=["process", "get_memory"])
+    async def process(user_input):
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            if events is not None:
+                events.append(f"{reply} cancelled")
+            raise
+        return reply
+    expert.process = process
+    return expert
+
+@pytest.mark.asyncio
+async def test_dispatch_merges_concurrent_experts():
+    from langchain_core.language_models import FakeListLLM
+    llm = FakeListLLM(responses=["Merged answer"])
+    experts = {
+        "knowledge": make_slow_expert("From the docs", 0.2),
+        "web": make_slow_expert("From the web", 0.2)
+    }
+    supervisor = SupervisorAgent(llm, experts)
+    start = asyncio.get_running_loop().time()
+    response = await supervisor.dispatch("Question", ["knowledge", "web"])
+    elapsed = asyncio.get_running_loop().time() - start
+    assert response == "Merged answer"
+    # Experts ran concurrently, not one after another
+    assert elapsed < 0.35
+
+@pytest.mark.asyncio
+async def test_dispatch_deadline_drops_slow_experts():
+    events = []
+    experts = {
+        "knowledge": make_slow_expert("From the docs", 0.01),
+        "web": make_slow_expert("From the web", 5, events)
+    }
+    supervisor = SupervisorAgent(MockLLM(), experts)
+    # A single surviving answer needs no synthesis call
+    assert await supervisor.dispatch("Question", ["knowledge", "web"], timeout=0.1) == "From the docs"
+    await asyncio.sleep(0)
+    assert events == ["From the web cancelled"]
+
+@pytest.mark.asyncio
+async def test_dispatch_first_good_answer_wins():
+    events = []
+    experts = {
+        "broken": make_slow_expert("Error processing request: down", 0.01),
+        "knowledge": make_slow_expert("From the docs", 0.05),
+        "web": make_slow_expert("From the web", 5, events)
+    }
+    supervisor = SupervisorAgent(MockLLM(), experts)
+    response = await supervisor.dispatch("Question", ["broken", "knowledge", "web"], mode="first")
+    assert response == "From the docs"
+    await asyncio.sleep(0)
+    assert events == ["From the web cancelled"]
+
+@pytest.mark.asyncio
+async def test_supervisor_delegates_to_several_experts():
+    from langchain_core.language_models import FakeListLLM
+    llm = FakeListLLM(responses=["EXPERT: knowledge, web", "Merged answer"])
+    experts = {
+        "knowledge": make_slow_expert("From the docs", 0.01),
+        "web": make_slow_expert("From the web", 0.01)
+    }
+    supervisor = SupervisorAgent(llm, experts)
+    assert await supervisor.process("Compare the docs with the web") == "Merged answer"
+
+@pytest.mark.asyncio
+async def test_supervisor_dispatch_mode_first():
+    from langchain_core.language_models import FakeListLLM
+    llm = FakeListLLM(responses=["EXPERT: knowledge, web"])
+    experts = {
+        "knowledge": make_slow_expert("From the docs", 0.01),
+        "web": make_slow_expert("From the web", 5)
+    }
+    supervisor = SupervisorAgent(llm, experts, dispatch_mode="first")
+    # No synthesis call: the first good answer is returned as is
+    assert await supervisor.process("Compare the docs with the web") == "From the docs"
+    with pytest.raises(ValueError):
+        SupervisorAgent(llm, experts, dispatch_mode="vote")
@@ -0,0 +1,101 @@
+import pytest
+import asyncio
+from langchain_core.language_models import FakeListLLM, FakeStreamingListLLM
+from agents.core.base_agent import BaseAgent
+from agents.core.token_memory import TokenBudgetMemory
+from agents.core.tokens import count_tokens
+from agents.core.turn_store import TurnStore
+
+class RecordingLLM(FakeListLLM):
+    """Fake LLM that records the prompts it is asked to complete."""
+
+    prompts: list = []
+
+    def _call(self, prompt, *args, **kwargs):
+        self.prompts.append(prompt)
+        return super()._call(prompt, *args, **kwargs)
+
+    async def _acall(self, prompt, *args, **kwargs):
+        self.prompts.append(prompt)
+        return await super()._acall(prompt, *args, **kwargs)
+
+def save_turns(memory, count):
+    for i in range(count):
+        memory.save_context({"input": f"question number {i}"}, {"text": f"answer number {i}"})
+
+def test_memory_keeps_window_within_budget():
+    memory = TokenBudgetMemory(max_token_limit=40)
+    save_turns(memory, 20)
+    history = memory.load_memory_variables({})["history"]
+    assert count_tokens(history) <= 40
+    assert "answer number 19" in history
+    assert "question number 0" not in history
+
+@pytest.mark.asyncio
+async def test_memory_summarizes_evicted_turns_in_background():
+    llm = FakeListLLM(responses=["The user asked numbered questions."])
+    memory = TokenBudgetMemory(llm=llm, max_token_limit=40)
+    save_turns(memory, 20)
+    # Saving doesn't wait for the summary
+    assert memory.summary == ""
+    await memory.wait_for_summary()
+    history = memory.load_memory_variables({})["history"]
+    assert history.startswith("Summary of earlier conversation: The user asked numbered questions.")
+    assert "answer number 19" in history
+
+    memory.clear()
+    assert memory.load_memory_variables({})["history"] == ""
+
+def test_idle_memory_is_trimmed_and_store_stays_bounded():
+    store = TurnStore()
+    idle = TokenBudgetMemory(max_token_limit=40, chat_memory=store.view("idle"))
+    busy = TokenBudgetMemory(max_token_limit=200, chat_memory=store.view("busy"))
+    save_turns(busy, 100)
+    # The idle memory never saved, but only loads what fits its budget
+    history = idle.load_memory_variables({})["history"]
+    assert count_tokens(history) <= 40
+    assert "answer number 99" in history
+    # Compaction moved past the idle view instead of keeping every turn for it
+    assert sum(turn.tokens for turn in store.since(store.first_seq)) <= 200
+    assert idle.chat_memory.start == store.first_seq > 0
+    # Without an llm nothing is kept for a summary
+    assert store.next_summary_batch() == []
+
+@pytest.mark.asyncio
+async def test_shared_store_summarizes_each_turn_once():
+    store = TurnStore()
+    llms = [RecordingLLM(responses=["Numbered questions."] * 100, prompts=[]) for _ in range(2)]
+    supervisor = TokenBudgetMemory(llm=llms[0], max_token_limit=60, chat_memory=store.view("supervisor"))
+    expert = TokenBudgetMemory(llm=llms[1], max_token_limit=120, chat_memory=store.view("expert"))
+    for i in range(30):
+        await supervisor.asave_context({"input": f"question number {i}"}, {"text": "EXPERT: expert"})
+        await expert.asave_context({"input": f"question number {i}"}, {"text": f"answer number {i}"})
+        await supervisor.wait_for_summary()
+        await expert.wait_for_summary()
+
+    prompts = "\n".join(llms[0].prompts + llms[1].prompts)
+    summarized = [i for i in range(30) if f"answer number {i}\n" in prompts]
+    assert summarized and all(prompts.count(f"Human: question number {i}\n") == 1 for i in summarized)
+    # Both agents see the one summary
+    for memory in (supervisor, expert):
+        assert memory.load_memory_variables({})["history"].startswith(
+            "Summary of earlier conversation: Numbered questions."
+        )
+
+@pytest.mark.asyncio
+async def test_memory_keeps_user_input_from_multi_input_chains():
+    memory = TokenBudgetMemory()
+    await memory.asave_context({"input": "What is RAG?", "context": "Document 1: ..."}, {"text": "Retrieval."})
+    assert memory.load_memory_variables({})["history"] == "Human: What is RAG?\nAI: Retrieval."
+
+@pytest.mark.asyncio
+async def test_memory_budget_per_agent(tmp_path, monkeypatch):
+    from agents.core.multi_agent_system import MultiAgentSystem
+    agent = BaseAgent(FakeStreamingListLLM(responses=["Reply"]), memory_token_limit=64)
+    assert agent.memory.max_token_limit == 64
+
+    monkeypatch.chdir(tmp_path)
+    system = MultiAgentSystem(api_key="test_key", memory_token_limits={"supervisor": 128, "command": 256})
+    assert system.supervisor.memory.max_token_limit == 128
+    assert system.command_agent.memory.max_token_limit == 256
+    assert system.web_agent.memory.max_token_limit == BaseAgent.memory_token_limit
@@ -0,0 +1,70 @@
+import pytest
+from langchain_core.language_models import FakeListLLM, FakeStreamingListLLM
+from agents.core.turn_store import Turn, TurnStore
+
+def test_turns_are_compact():
+    turn = Turn(0, "web", "human", "hello")
+    assert not hasattr(turn, "__dict__")
+
+def test_views_share_one_log():
+    store = TurnStore()
+    supervisor = store.view("supervisor")
+    web = store.view("web", hidden_agents=["supervisor"])
+    command = store.view("command", hidden_agents=["supervisor"])
+
+    supervisor.add_user_message("Find the docs")
+    supervisor.add_ai_message("EXPERT: web")
+    # The user's message handed on to the expert is stored only once
+    web.add_user_message("Find the docs")
+    web.add_ai_message("Here are the docs")
+    assert len(store) == 3
+
+    assert [m.content for m in supervisor.messages] == ["Find the docs", "EXPERT: web", "Here are the docs"]
+    # Experts see each other's context, but not the supervisor's routing
+    assert [m.content for m in command.messages] == ["Find the docs", "Here are the docs"]
+
+    # Asking the same thing again is a new turn
+    web.add_user_message("Find the docs")
+    assert len(store) == 4
+
+def test_truncation_compacts_shared_log():
+    store = TurnStore()
+    views = [store.view(name) for name in ("a", "b")]
+    for i in range(5):
+        views[0].add_user_message(f"question {i}")
+        views[0].add_ai_message(f"answer {i}")
+
+    views[0].clear()
+    # Still visible to the other view
+    assert len(store) == 10
+    views[1].drop_oldest(store.since(0)[:4])
+    assert len(store) == 6
+    assert views[1].messages[0].content == "question 2"
+    assert views[0].messages == []
+
+@pytest.mark.asyncio
+async def test_multi_agent_system_shares_turn_store(tmp_path, monkeypatch):
+    from agents.core.multi_agent_system import MultiAgentSystem
+    monkeypatch.chdir(tmp_path)
+    system = MultiAgentSystem(api_key="test_key")
+    system.command_agent.llm = FakeStreamingListLLM(responses=["file.txt"])
+    system.command_agent.chain.llm = system.command_agent.llm
+    chunks = [chunk async for chunk in system.process_input_stream("ls -l")]
+    assert "".join(chunks) == "file.txt"
+    assert "Human: ls -l\nAI: file.txt" in system.web_agent.get_memory()["history"]
+    assert len(system.turn_store) == 2
+
+@pytest.mark.asyncio
+async def test_llm_routed_request_records_one_human_turn(tmp_path, monkeypatch):
+    from agents.core.multi_agent_system import MultiAgentSystem
+    monkeypatch.chdir(tmp_path)
+    system = MultiAgentSystem(api_key="test_key")
+    # Leave the route to the supervisor LLM
+    system.supervisor.router.embedding_function = None
+    system.supervisor.chain.llm = FakeListLLM(responses=["EXPERT: command"])
+    system.command_agent.chain.llm = FakeListLLM(responses=["file.txt"])
+
+    assert await system.process_input("please show me the files here") == "file.txt"
+    human = [turn.content for turn in system.turn_store.since(0) if turn.role == "human"]
+    assert human == ["please show me the files here"]
+    assert "Available expert agents" not in system.command_agent.get_memory()["history"]